@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+    Compares the validation of compressed newline-delimited JSON with
+    :func:`cerberus.streaming.validate_ndjson`, which decompresses in a
+    background thread, to decompressing the whole file first and validating
+    the lines afterwards.
+
+    Usage: python benchmarks/compressed_ndjson.py [documents] [compression]
+"""
+
+import bz2
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from cerberus import Validator  # noqa
+from cerberus.streaming import validate_ndjson  # noqa
+
+
+clock = getattr(time, 'perf_counter', time.time)
+
+SCHEMA = {'id': {'type': 'integer', 'min': 0, 'required': True},
+          'name': {'type': 'string', 'maxlength': 64},
+          'price': {'type': 'float', 'min': 0},
+          'tags': {'type': 'list', 'schema': {'type': 'string'}},
+          'address': {'type': 'dict',
+                      'schema': {'street': {'type': 'string'},
+                                 'zip': {'type': 'string',
+                                         'regex': '[0-9]{5}'}}}}
+
+
+def document(i):
+    return {'id': i, 'name': 'item %d' % i, 'price': i * 0.25,
+            'tags': ['a', 'b', 'c'][:i % 4],
+            'address': {'street': 'Main Street %d' % i,
+                        'zip': '%05d' % (i % 100000)}}
+
+
+def write_archive(path, compression, count):
+    opener = {'gzip': gzip.open, 'bz2': bz2.BZ2File}
+    if compression == 'xz':
+        import lzma
+        opener['xz'] = lzma.open
+    with opener[compression](path, 'wb') as f:
+        for i in range(count):
+            f.write((json.dumps(document(i)) + '\n').encode('utf-8'))
+
+
+def sequential(validator, path, compression):
+    opener = {'gzip': gzip.open, 'bz2': bz2.BZ2File}
+    if compression == 'xz':
+        import lzma
+        opener['xz'] = lzma.open
+    with opener[compression](path, 'rb') as f:
+        data = f.read()
+    valid = 0
+    for line in data.splitlines():
+        if line.strip():
+            valid += validator.validate(json.loads(line.decode('utf-8')))
+    return valid
+
+
+def streaming(validator, path, compression):
+    with open(path, 'rb') as f:
+        return sum(x.valid for x in validate_ndjson(validator, f,
+                                                    compression=compression))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    compression = sys.argv[2] if len(sys.argv) > 2 else 'gzip'
+    validator = Validator(SCHEMA)
+    fd, path = tempfile.mkstemp(suffix='.ndjson.' + compression)
+    os.close(fd)
+    try:
+        write_archive(path, compression, count)
+        print('{0} documents, {1}, {2} bytes'
+              .format(count, compression, os.path.getsize(path)))
+        for name, function in (('sequential', sequential),
+                               ('streaming', streaming)):
+            start = clock()
+            valid = function(validator, path, compression)
+            duration = clock() - start
+            print('{0:>10}: {1:.2f}s, {2:.0f} documents/s, {3} valid'
+                  .format(name, duration, count / duration, valid))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
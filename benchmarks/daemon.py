@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+    Measures the throughput of a :class:`cerberus.daemon.ValidationDaemon`
+    with different batch sizes and compares it to preparing a validator for
+    each batch in the calling process, as short-lived scripts do.
+
+    Usage: python benchmarks/daemon.py [documents] [workers]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from cerberus import Validator  # noqa
+from cerberus.daemon import ValidationClient, ValidationDaemon  # noqa
+
+
+clock = getattr(time, 'perf_counter', time.time)
+
+SCHEMA = {'id': {'type': 'integer', 'min': 0, 'required': True},
+          'name': {'type': 'string', 'maxlength': 64},
+          'price': {'type': 'float', 'min': 0},
+          'tags': {'type': 'list', 'schema': {'type': 'string'}},
+          'address': {'type': 'dict',
+                      'schema': {'street': {'type': 'string'},
+                                 'zip': {'type': 'string',
+                                         'regex': '[0-9]{5}'}}}}
+
+
+def document(i):
+    return {'id': i, 'name': 'item %d' % i, 'price': i * 0.25,
+            'tags': ['a', 'b', 'c'][:i % 4],
+            'address': {'street': 'Main Street %d' % i,
+                        'zip': '%05d' % (i % 100000)}}
+
+
+def batches(documents, size):
+    for i in range(0, len(documents), size):
+        yield documents[i:i + size]
+
+
+def in_process(documents, size):
+    valid = 0
+    for batch in batches(documents, size):
+        validator = Validator(SCHEMA)
+        valid += sum(validator.validate(x) for x in batch)
+    return valid
+
+
+def with_daemon(path):
+    def run(documents, size):
+        with ValidationClient(path) as client:
+            return sum(x.valid for batch in batches(documents, size)
+                       for x in client.validate('items', batch))
+    return run
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    documents = [document(i) for i in range(count)]
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'cerberus.sock')
+    daemon = ValidationDaemon(path, {'items': SCHEMA}, workers=workers,
+                              chunk_size=250)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    try:
+        print('{0} documents'.format(count))
+        for size in (1, 100, 1000, 10000):
+            # single documents are measured on a part of the input
+            sample = documents[:2000] if size == 1 else documents
+            for name, function in (('in-process', in_process),
+                                   ('daemon', with_daemon(path))):
+                start = clock()
+                valid = function(sample, size)
+                duration = clock() - start
+                print('{0:>10}, batches of {1:>5}: {2:.2f}s, {3:.0f} '
+                      'documents/s, {4} valid'
+                      .format(name, size, duration,
+                              len(sample) / duration, valid))
+    finally:
+        daemon.shutdown()
+        thread.join()
+        daemon.close()
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,12 +8,13 @@
 
 """
 
-from .cerberus import Validator, DocumentError, SchemaError
+from .cerberus import Validator, DocumentError, SchemaError, TypeDefinition
 
 __version__ = "0.10"
 
 __all__ = [
     Validator.__name__,
     DocumentError.__name__,
-    SchemaError.__name__
+    SchemaError.__name__,
+    'TypeDefinition'
 ]
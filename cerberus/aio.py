@@ -0,0 +1,317 @@
+"""
+    Asynchronous processing of documents with :mod:`asyncio`.
+
+    This module requires Python 3.5 or later. It is imported on demand by
+    :meth:`~cerberus.Validator.validate_async` and
+    :meth:`~cerberus.Validator.normalized_async`.
+
+    A document is processed synchronously as often as necessary. Awaitables
+    that are returned from ``coerce``- and ``validator``-constraints during a
+    pass are collected and awaited concurrently afterwards; their outcomes are
+    then used in the next pass. The passes end when no new awaitables occur.
+    Values that are yet to be coerced by a pending awaitable aren't passed to
+    further constraints in the same pass, thus each one is called once.
+"""
+
+import asyncio
+from collections import deque, Mapping
+from functools import partial
+from inspect import isawaitable
+from time import perf_counter
+
+from . import errors
+from .batch import ValidatorPayload, validate_chunk
+from .cerberus import Validator
+
+
+class _Session(object):
+    """ Holds the awaitables of the current pass and the outcomes of the
+    previous ones.
+    Calls are identified by the document path, the schema path and the
+    constraint's callable, counted in order of their occurrence.
+    """
+
+    def __init__(self, max_concurrency=None):
+        self.start(max_concurrency)
+
+    def start(self, max_concurrency=None):
+        """ Discards the state of a previous processing. """
+        if max_concurrency:
+            self.semaphore = asyncio.Semaphore(max_concurrency)
+        else:
+            self.semaphore = None
+        self.outcomes = dict()
+        self.pending = dict()
+        self.reset()
+
+    def reset(self):
+        self.counters = dict()
+        self.pending_coercions = set()
+
+    def key(self, validator, field, function):
+        base = (validator.document_path + (field,), validator.schema_path,
+                id(function))
+        count = self.counters.get(base, 0)
+        self.counters[base] = count + 1
+        return base + (count,)
+
+    def depends_on_pending_coercion(self, path):
+        """ Values below or at a path that is yet to be coerced are still
+        subject to change. """
+        for i in range(1, len(path) + 1):
+            if path[:i] in self.pending_coercions:
+                return True
+        return False
+
+    def defer(self, key, awaitable):
+        self.pending[key] = awaitable
+
+    async def resolve(self):
+        keys = tuple(self.pending)
+        outcomes = await asyncio.gather(*(self.__bounded(self.pending[x])
+                                          for x in keys))
+        self.pending = dict()
+        self.outcomes.update(zip(keys, outcomes))
+
+    async def __bounded(self, awaitable):
+        if self.semaphore is None:
+            return await awaitable
+        async with self.semaphore:
+            return await awaitable
+
+
+async def _coercion(awaitable):
+    try:
+        return True, await awaitable
+    except (TypeError, ValueError):
+        return False, None
+
+
+async def _recorded_validation(awaitable, calls):
+    await awaitable
+    return calls
+
+
+class _AsyncRules(object):
+    """ Replacements for the rule-methods of :class:`~cerberus.Validator`
+    that can handle awaitables. """
+
+    def _normalize_coerce(self, mapping, schema):
+        session = self._async_session
+
+        def coerce_value(coercer):
+            path = self.document_path + (field,)
+            key = session.key(self, field, coercer)
+            if key in session.outcomes:
+                success, result = session.outcomes[key]
+            elif session.depends_on_pending_coercion(path):
+                # the value is still subject to change, it's coerced in a
+                # later pass
+                return
+            else:
+                try:
+                    result = coercer(mapping[field])
+                except (TypeError, ValueError):
+                    success = False
+                else:
+                    success = True
+                    if isawaitable(result):
+                        session.defer(key, _coercion(result))
+                        session.pending_coercions.add(path)
+                        return
+
+            if success:
+                mapping[field] = result
+            else:
+                self._error(field, errors.COERCION_FAILED)
+
+        for field in mapping:
+            if field in schema and 'coerce' in schema[field]:
+                coerce_value(schema[field]['coerce'])
+            elif isinstance(self.allow_unknown, Mapping) and \
+                    'coerce' in self.allow_unknown:
+                coerce_value(self.allow_unknown['coerce'])
+
+    def _validate_validator(self, validator, field, value):
+        session = self._async_session
+        key = session.key(self, field, validator)
+        if key in session.outcomes:
+            calls = session.outcomes[key]
+        elif session.pending_coercions:
+            # validations wait for all coercions to be resolved, the pass is
+            # repeated then
+            return
+        else:
+            calls = []
+            result = validator(field, value, lambda *args: calls.append(args))
+            if isawaitable(result):
+                session.defer(key, _recorded_validation(result, calls))
+                return
+        for args in calls:
+            self._error(*args)
+
+
+_async_classes = dict()
+
+
+def _async_class(cls):
+    """ Returns the subclass of ``cls`` with the rules that handle
+    awaitables; it's created once per class. It keeps the name and module of
+    ``cls`` since the hashes of validated schemas are derived from them.
+    Methods that are overridden by ``cls`` are left untouched. """
+    if cls not in _async_classes:
+        namespace = {'__module__': cls.__module__,
+                     '__qualname__': getattr(cls, '__qualname__',
+                                             cls.__name__)}
+        for name in ('_normalize_coerce', '_validate_validator'):
+            if getattr(cls, name) is getattr(Validator, name):
+                namespace[name] = getattr(_AsyncRules, name)
+
+        def _get_child_validator(self, *args, **kwargs):
+            child = cls._get_child_validator(self, *args, **kwargs)
+            # reused child validators share the session of their parent
+            child._async_session = self._async_session
+            return child
+        namespace['_get_child_validator'] = _get_child_validator
+
+        _async_classes[cls] = type(cls.__name__, (cls,), namespace)
+    return _async_classes[cls]
+
+
+async def _process(validator, method, args, max_concurrency,
+                   cooperation=None):
+    # the session is kept with the validator, so that its child validators
+    # can be reused by further processings
+    session = validator.__dict__.get('_async_session')
+    if session is None:
+        session = validator._async_session = _Session()
+    session.start(max_concurrency)
+    cls = validator.__class__
+    async_cls = _async_class(cls)
+    while True:
+        session.reset()
+        validator.__class__ = async_cls
+        try:
+            if cooperation is None:
+                result = getattr(validator, method)(*args)
+            else:
+                result = await cooperation.run(validator, *args)
+        finally:
+            validator.__class__ = cls
+        if not session.pending:
+            return result
+        await session.resolve()
+
+
+class _Cooperation(object):
+    """ Drives :meth:`~cerberus.Validator._iter_validate` and yields to the
+    event loop after a number of steps or an interval. """
+
+    def __init__(self, yield_every=None, yield_interval=None):
+        self.yield_every = yield_every
+        self.yield_interval = yield_interval
+
+    async def run(self, validator, *args):
+        steps = 0
+        deadline = None
+        if self.yield_interval is not None:
+            deadline = perf_counter() + self.yield_interval
+        for _ in validator._iter_validate(*args):
+            steps += 1
+            if (self.yield_every is not None and
+                steps >= self.yield_every) or \
+                    (deadline is not None and perf_counter() >= deadline):
+                await asyncio.sleep(0)
+                steps = 0
+                if deadline is not None:
+                    deadline = perf_counter() + self.yield_interval
+        return not bool(validator._errors)
+
+
+async def validate_async(validator, document, schema=None, update=False,
+                         normalize=True, max_concurrency=None,
+                         yield_every=None, yield_interval=None):
+    """ See :meth:`cerberus.Validator.validate_async`. """
+    if yield_every is None and yield_interval is None:
+        cooperation = None
+    else:
+        cooperation = _Cooperation(yield_every, yield_interval)
+    return await _process(validator, 'validate',
+                          (document, schema, update, normalize),
+                          max_concurrency, cooperation)
+
+
+async def normalized_async(validator, document, schema=None,
+                           max_concurrency=None):
+    """ See :meth:`cerberus.Validator.normalized_async`. """
+    return await _process(validator, 'normalized', (document, schema),
+                          max_concurrency)
+
+
+class _BatchResults(object):
+    """ An asynchronous iterator over the :class:`~cerberus.batch.
+    ValidationResult` s of documents that are validated in chunks by an
+    executor. """
+
+    def __init__(self, validator, documents, executor, max_in_flight,
+                 chunk_size, update, normalize):
+        self.payload = ValidatorPayload(validator)
+        if hasattr(documents, '__aiter__'):
+            self.documents = documents.__aiter__()
+            self.is_async = True
+        else:
+            self.documents = iter(documents)
+            self.is_async = False
+        self.exhausted = False
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.chunk_size = chunk_size
+        self.update = update
+        self.normalize = normalize
+        self.offset = 0
+        self.in_flight = deque()
+        self.results = deque()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.results:
+            await self.__submit()
+            if not self.in_flight:
+                raise StopAsyncIteration
+            self.results.extend(await self.in_flight.popleft())
+        return self.results.popleft()
+
+    async def __submit(self):
+        loop = asyncio.get_event_loop()
+        while not self.exhausted and len(self.in_flight) < self.max_in_flight:
+            chunk = await self.__next_chunk()
+            if not chunk:
+                self.exhausted = True
+                break
+            self.in_flight.append(loop.run_in_executor(
+                self.executor, partial(validate_chunk, self.payload,
+                                       self.offset, chunk, self.update,
+                                       self.normalize)))
+            self.offset += len(chunk)
+
+    async def __next_chunk(self):
+        chunk = []
+        try:
+            while len(chunk) < self.chunk_size:
+                if self.is_async:
+                    chunk.append(await self.documents.__anext__())
+                else:
+                    chunk.append(next(self.documents))
+        except (StopIteration, StopAsyncIteration):
+            pass
+        return chunk
+
+
+def validate_batch_async(validator, documents, executor=None,
+                         max_in_flight=4, chunk_size=100, update=False,
+                         normalize=True):
+    """ See :meth:`cerberus.Validator.validate_batch_async`. """
+    return _BatchResults(validator, documents, executor, max_in_flight,
+                         chunk_size, update, normalize)
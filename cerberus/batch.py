@@ -0,0 +1,446 @@
+"""
+    Helpers for the validation of many documents, possibly in worker threads
+    or processes.
+
+    Validators are shipped to workers as payloads that are identified by a
+    token. A worker obtains the validator of a payload only once and reuses it
+    with its prepared schema for all further chunks of documents. Validators
+    are only pickled for worker processes, worker threads use copies.
+"""
+
+from collections import deque, namedtuple
+import copy
+from itertools import islice
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+import uuid
+
+from .cerberus import DocumentError
+
+
+log = logging.getLogger('cerberus')
+_clock = getattr(time, 'perf_counter', time.time)
+# the errors that are raised when an object can't be pickled
+_pickling_errors = (pickle.PicklingError, AttributeError, TypeError)
+
+
+class ValidationResult(namedtuple('ValidationResult',
+                                  'index, valid, document, errors')):
+    """ The outcome of one document's validation.
+
+    - ``index``: The position of the document in the processed input.
+    - ``valid``: ``True`` if the document is valid.
+    - ``document``: The normalized document, or ``None`` if it is not a
+      mapping.
+    - ``errors``: The errors as formatted by the validator's error handler, or
+      a message if the document is not a mapping.
+    """
+    __slots__ = ()
+
+
+def validate_document(validator, index, document, update=False,
+                      normalize=True):
+    """ Validates a document and returns a :class:`ValidationResult`.
+    Documents that aren't mappings don't raise a
+    :class:`~cerberus.DocumentError`, but are reported as invalid.
+    """
+    try:
+        valid = validator.validate(document, update=update,
+                                   normalize=normalize)
+    except DocumentError as e:
+        return ValidationResult(index, False, None, str(e))
+    return ValidationResult(index, valid, validator.document,
+                            validator.errors)
+
+
+def validate_documents(validator, offset, documents, update=False,
+                       normalize=True):
+    """ Validates a list of documents and returns a list of
+    :class:`ValidationResult` s. Their indexes start at ``offset``.
+
+    The values of :class:`BatchedValidator` constraints are collected over
+    all documents and checked with one call per constraint; documents with
+    invalid values are validated again to attribute the errors.
+    """
+    collector = _Collector()
+    previous_collector = getattr(_batch_state, 'collector', None)
+    _batch_state.collector = collector
+    try:
+        results, lookups = [], []
+        for i, document in enumerate(documents, offset):
+            collector.lookups = []
+            results.append(validate_document(validator, i, document, update,
+                                             normalize))
+            lookups.append(collector.lookups)
+        if not collector.values:
+            return results
+
+        collector.resolve()
+        for i, document in enumerate(documents):
+            if collector.has_failures(lookups[i]):
+                results[i] = validate_document(validator, offset + i,
+                                               document, update, normalize)
+        return results
+    finally:
+        _batch_state.collector = previous_collector
+
+
+def chunks(iterable, size):
+    """ Yields lists with up to ``size`` items from ``iterable``. """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ValidatorPayload(object):
+    """ A validator that can be submitted to workers, identified by a unique
+    token. The validator is pickled once when the payload is first sent to a
+    worker process, thus its schema only needs to be picklable for those. """
+
+    def __init__(self, validator):
+        self.validator = validator
+        self.token = uuid.uuid4().hex
+        self.__data = None
+
+    @property
+    def data(self):
+        """ The pickled validator. """
+        if self.__data is None:
+            self.__data = pickle.dumps(self.validator,
+                                       pickle.HIGHEST_PROTOCOL)
+        return self.__data
+
+    def __getstate__(self):
+        return {'token': self.token, 'data': self.data}
+
+    def __setstate__(self, state):
+        self.validator = None
+        self.token = state['token']
+        self.__data = state['data']
+
+    def load(self):
+        """ Returns a new validator that equals the payload's one. Within the
+        process that created the payload it's a copy, otherwise it's
+        unpickled. """
+        if self.validator is None:
+            return pickle.loads(self.__data)
+        return copy.copy(self.validator)
+
+
+_batch_state = threading.local()
+
+
+class BatchedValidator(object):
+    """ A callable for ``validator``-constraints that checks many values with
+    one call of a function, e.g. to look them up in a store with one
+    round-trip.
+
+    When documents are validated with :func:`validate_documents` (and thus by
+    :class:`BatchExecutor` and :meth:`~cerberus.Validator.
+    validate_batch_async`), the values of all documents are collected and
+    passed to the function at once. Otherwise it is called for each value.
+
+    :param function: A callable that takes a list of values and returns a
+                     list of the same length with an error message for each
+                     invalid value and ``None`` for a valid one.
+
+    .. versionadded:: 0.10
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, field, value, error):
+        collector = getattr(_batch_state, 'collector', None)
+        if collector is None:
+            message = self.function([value])[0]
+        else:
+            message = collector.lookup(self, value)
+        if message is not None:
+            error(field, message)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self.function)
+
+
+class _Collector(object):
+    """ Collects the values of :class:`BatchedValidator` s and holds the
+    results after they are resolved. """
+
+    def __init__(self):
+        self.values = dict()
+        self.answers = None
+        self.lookups = []
+
+    def lookup(self, validator, value):
+        if self.answers is not None:
+            try:
+                return self.answers[validator][value]
+            except (KeyError, TypeError):
+                return validator.function([value])[0]
+        try:
+            self.values.setdefault(validator, set()).add(value)
+        except TypeError:  # unhashable values are checked right away
+            return validator.function([value])[0]
+        self.lookups.append((validator, value))
+
+    def resolve(self):
+        self.answers = dict()
+        for validator, values in self.values.items():
+            values = list(values)
+            self.answers[validator] = \
+                dict(zip(values, validator.function(values)))
+
+    def has_failures(self, lookups):
+        for validator, value in lookups:
+            if self.answers[validator][value] is not None:
+                return True
+        return False
+
+
+_worker_state = threading.local()
+_WORKER_CACHE_SIZE = 16
+
+
+def worker_validator(payload):
+    """ Returns the validator of a :class:`ValidatorPayload` from the cache of
+    the current worker thread, loading it if necessary. """
+    cache = getattr(_worker_state, 'validators', None)
+    if cache is None:
+        cache = _worker_state.validators = dict()
+    validator = cache.get(payload.token)
+    if validator is None:
+        if len(cache) >= _WORKER_CACHE_SIZE:
+            cache.clear()
+        validator = cache[payload.token] = payload.load()
+    return validator
+
+
+def validate_chunk(payload, offset, documents, update=False, normalize=True):
+    """ Validates a list of documents in a worker and returns a list of
+    :class:`ValidationResult` s. Their indexes start at ``offset``. """
+    return validate_documents(worker_validator(payload), offset, documents,
+                              update, normalize)
+
+
+def validate_sequence_chunk(payload, document_path, schema_path, rules,
+                            offset, items):
+    """ Validates a chunk of a sequence's items against the rules of a
+    ``schema``-constraint in a worker and returns the errors. The payload's
+    validator is used like a child-validator with the given paths. """
+    validator = worker_validator(payload)
+    validator.document_path = document_path
+    validator.schema_path = schema_path
+    validator.root_document = validator.root_schema = None
+    indexes = range(offset, offset + len(items))
+    validator.validate(dict(zip(indexes, items)),
+                       schema=dict((i, rules) for i in indexes),
+                       normalize=False)
+    return validator._errors
+
+
+class BatchExecutor(object):
+    """ Validates documents serially, in worker threads or in worker processes,
+    whichever is estimated to be the fastest for the documents at hand.
+
+    The costs are measured on a sample from the input: the time to validate a
+    document serially, the speedup when validating in threads (which depends
+    on whether custom rules release the GIL) and the time to transfer a
+    document to another process. From these the strategy and a chunk size are
+    derived, and re-evaluated periodically. Worker processes are only
+    considered if the validator with its schema can be pickled.
+
+    Executors must be closed when not needed anymore, they can also be used as
+    context manager.
+
+    :param validator: The :class:`~cerberus.Validator` (or subclass) instance
+                      to validate with.
+    :param max_workers: The number of worker threads or processes. Defaults to
+                        the number of CPUs.
+    :param sample_size: The number of documents to measure with.
+    :param reevaluate_every: The number of documents after which the strategy
+                             is re-evaluated. ``None`` disables re-evaluations.
+    :param chunk_duration: The targeted duration in seconds of validating a
+                           chunk of documents.
+    :param update: See :meth:`~cerberus.Validator.validate`.
+    :param normalize: See :meth:`~cerberus.Validator.validate`.
+
+    .. versionadded:: 0.10
+    """
+
+    strategies = ('serial', 'thread', 'process')
+
+    def __init__(self, validator, max_workers=None, sample_size=64,
+                 reevaluate_every=100000, chunk_duration=0.05, update=False,
+                 normalize=True):
+        self.validator = validator
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.sample_size = sample_size
+        self.reevaluate_every = reevaluate_every
+        self.chunk_duration = chunk_duration
+        self.update = update
+        self.normalize = normalize
+        self.payload = ValidatorPayload(validator)
+        self.evaluations = []
+        self.__pools = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ Shuts down the workers. """
+        for pool in self.__pools.values():
+            pool.shutdown()
+        self.__pools.clear()
+
+    @property
+    def report(self):
+        """ The most recent evaluation as ``dict`` with the chosen
+        ``strategy`` and ``chunk_size``, the measured ``document_cost`` and
+        ``transfer_cost`` in seconds per document, the ``thread_speedup`` and
+        the ``index`` of the document where it was made; or ``None``. The
+        ``transfer_cost`` is ``None`` if the validator can't be pickled. """
+        return self.evaluations[-1] if self.evaluations else None
+
+    def validate(self, documents):
+        """ Validates documents and yields a :class:`ValidationResult` for each
+        in the order of the input.
+
+        :param documents: An iterable of mappings.
+        """
+        documents = iter(documents)
+        index = 0
+        while True:
+            sample = list(islice(documents, self.sample_size))
+            if not sample:
+                return
+            for result in self.__evaluate(index, sample):
+                yield result
+            index += len(sample)
+
+            period = self.reevaluate_every
+            if period is not None:
+                period = max(0, period - len(sample))
+            for result in self.__execute(index, islice(documents, period)):
+                yield result
+                index += 1
+
+    def __evaluate(self, offset, sample):
+        # a part of the sample is validated serially, the rest in threads to
+        # measure their speedup; thus each document is only validated once
+        workers = min(self.max_workers, len(sample) // 2)
+        serial_size = len(sample) - len(sample) // 2 if workers > 1 \
+            else len(sample)
+
+        start = _clock()
+        results = validate_documents(self.validator, offset,
+                                     sample[:serial_size], self.update,
+                                     self.normalize)
+        document_cost = (_clock() - start) / serial_size
+
+        if workers > 1:
+            thread_results, thread_speedup = self.__measure_thread_speedup(
+                offset + serial_size, sample[serial_size:], workers,
+                document_cost)
+        else:
+            thread_results, thread_speedup = [], 1.0
+
+        # parallel executions have to pay off by at least 20%
+        costs = {'serial': document_cost,
+                 'thread': 1.2 * document_cost / thread_speedup}
+        transfer_cost = self.__measure_transfer_cost(results)
+        if transfer_cost is not None:
+            costs['process'] = 1.2 * max(
+                2 * transfer_cost,
+                (document_cost + 2 * transfer_cost) / self.max_workers)
+        results.extend(thread_results)
+
+        strategy = min((x for x in self.strategies if x in costs),
+                       key=costs.get)
+        chunk_size = int(self.chunk_duration / max(document_cost, 1e-7))
+        evaluation = {'index': offset, 'strategy': strategy,
+                      'chunk_size': max(1, min(chunk_size, 10000)),
+                      'document_cost': document_cost,
+                      'transfer_cost': transfer_cost,
+                      'thread_speedup': thread_speedup}
+        self.evaluations.append(evaluation)
+        log.info('BatchExecutor picked {strategy} execution with chunks of '
+                 '{chunk_size} documents.'.format(**evaluation))
+        return results
+
+    def __measure_thread_speedup(self, offset, documents, workers,
+                                 document_cost):
+        """ Validates documents in threads and returns the results and the
+        speedup over the serial validation. """
+        size = -(-len(documents) // workers)
+        offsets = range(0, len(documents), size)
+
+        def validate_part(i):
+            return validate_chunk(
+                self.payload, offset + i, documents[i:i + size], self.update,
+                self.normalize)
+
+        start = _clock()
+        pool = self.__pool('thread')
+        parts = list(pool.map(validate_part, offsets))
+        duration = _clock() - start
+        speedup = (document_cost * len(documents)) / max(duration, 1e-9)
+        return [result for part in parts for result in part], speedup
+
+    def __measure_transfer_cost(self, results):
+        """ Returns the time to transfer a document to a worker process and
+        back, or ``None`` if the validator or the results can't be pickled
+        and processes are thus no option. """
+        try:
+            self.payload.data
+            start = _clock()
+            pickle.loads(pickle.dumps(results, pickle.HIGHEST_PROTOCOL))
+        except _pickling_errors as e:
+            log.info('BatchExecutor cannot use worker processes: '
+                     '{0}'.format(e))
+            return None
+        return (_clock() - start) / len(results)
+
+    def __pool(self, strategy):
+        if strategy not in self.__pools:
+            from concurrent import futures
+            if strategy == 'thread':
+                pool = futures.ThreadPoolExecutor(self.max_workers)
+            else:
+                pool = futures.ProcessPoolExecutor(self.max_workers)
+            self.__pools[strategy] = pool
+        return self.__pools[strategy]
+
+    def __execute(self, offset, documents):
+        strategy = self.report['strategy']
+        chunk_size = self.report['chunk_size']
+        if strategy == 'serial':
+            for chunk in chunks(documents, chunk_size):
+                for result in validate_documents(self.validator, offset,
+                                                 chunk, self.update,
+                                                 self.normalize):
+                    yield result
+                offset += len(chunk)
+            return
+
+        pool = self.__pool(strategy)
+        in_flight = deque()
+        for chunk in chunks(documents, chunk_size):
+            in_flight.append(pool.submit(validate_chunk, self.payload, offset,
+                                         chunk, self.update, self.normalize))
+            offset += len(chunk)
+            if len(in_flight) >= 2 * self.max_workers:
+                for result in in_flight.popleft().result():
+                    yield result
+        while in_flight:
+            for result in in_flight.popleft().result():
+                yield result
@@ -9,16 +9,18 @@
 """
 
 from collections import Callable, Hashable, Iterable, Mapping, MutableMapping,\
-    Sequence
-from copy import copy
+    Sequence, namedtuple
+from copy import deepcopy
 from datetime import datetime
 import json
 import logging
 import re
+from weakref import WeakKeyDictionary
 
 from . import errors
 from .platform import _str_type, _int_types
-from .utils import drop_item_from_tuple, warn_deprecated
+from .utils import compile_pattern, drop_item_from_tuple, warn_deprecated
+from .valuesets import AllowedValues, FileValueSet
 
 
 log = logging.getLogger('cerberus')
@@ -36,6 +38,184 @@ class SchemaError(Exception):
     pass
 
 
+TypeDefinition = namedtuple('TypeDefinition',
+                            'name, included_types, excluded_types')
+""" A data type of the ``type``-rule that a value matches if it's an instance
+of any of the ``included_types`` and of none of the ``excluded_types``.
+
+.. versionadded:: 0.10
+"""
+
+
+class _TypeCache(object):
+    """ Resolves the names of the :attr:`Validator.types_mapping` that values
+    of a concrete type match, once per validator class and type. """
+
+    def __init__(self, cls):
+        self.definitions = dict(
+            (name, x) for name, x in cls.types_mapping.items()
+            if _is_builtin_method(cls, '_validate_type_' + name))
+        self.matches = {}
+
+    def __call__(self, value_type):
+        try:
+            return self.matches[value_type]
+        except KeyError:
+            matches = self.matches[value_type] = frozenset(
+                name for name, x in self.definitions.items()
+                if issubclass(value_type, x.included_types) and
+                not issubclass(value_type, x.excluded_types))
+            return matches
+
+
+_type_caches = WeakKeyDictionary()
+_rules_of_classes = WeakKeyDictionary()
+
+
+def _is_builtin_method(cls, name):
+    """ Tests whether a method is undefined or defined by :class:`Validator`.
+    """
+    for base in cls.__mro__:
+        if name in vars(base):
+            return base is Validator
+    return True
+
+
+class _Dependencies(object):
+    """ A 'dependencies'-constraint that is compiled into the pre-split paths
+    of the fields it depends on and, for mappings, the sets of their allowed
+    values. """
+
+    def __init__(self, constraint):
+        # a copy to detect changes of the constraint in place
+        self.constraint = deepcopy(constraint)
+        if isinstance(constraint, _str_type):
+            constraint = [constraint]
+        self.values = None
+        if isinstance(constraint, Mapping):
+            self.values = {}
+            for name, values in constraint.items():
+                if not isinstance(values, Sequence) or \
+                        isinstance(values, _str_type):
+                    values = [values]
+                self.values[name] = AllowedValues(values)
+        self.paths = tuple((name, tuple(name.split('.')))
+                           for name in constraint)
+
+
+class _Excludes(object):
+    """ An 'excludes'-constraint that is compiled into the excluded fields
+    and the group of required fields of which only one must be present if
+    the field is. """
+
+    def __init__(self, constraint, field, schema):
+        # a copy to detect changes of the constraint in place
+        self.constraint = deepcopy(constraint)
+        if isinstance(constraint, Hashable):
+            constraint = [constraint]
+        self.fields = tuple(constraint)
+        self.required = frozenset(
+            x for x in (field,) + self.fields
+            if isinstance(schema.get(x), Mapping) and schema[x].get('required'))
+        # wrap each field between quotes
+        self.info = ', '.join("'{0}'".format(x) for x in self.fields)
+
+
+class _Branches(object):
+    """ The branches of a logical rule, each merged with the other rules of
+    a field into the rules that a value is validated against. """
+
+    def __init__(self, operator, rules):
+        self.operator = operator
+        # shallow copies to detect changes of the rules in place
+        self.rules = dict(rules)
+        self.sources = [dict(x) for x in self.__constraint(rules)]
+        self.definitions = []
+        for definition in self.sources:
+            merged = dict(rules)
+            del merged[operator]
+            merged.update(definition)
+            self.definitions.append(merged)
+        self.indexes = {}
+
+    def __constraint(self, rules):
+        definitions = rules[self.operator]
+        if isinstance(definitions, Mapping):
+            definitions = [definitions]
+        return definitions
+
+    def merged_from(self, rules):
+        """ Tests whether the branches were merged from the rules as they are
+        now. Values that are the same objects are compared by identity, hence
+        this is cheap for unchanged rules. """
+        if rules != self.rules:
+            return False
+        definitions = self.__constraint(rules)
+        return len(definitions) == len(self.sources) and \
+            all(x == y for x, y in zip(definitions, self.sources))
+
+    def dispatch(self, discriminator, value):
+        """ Returns the positions of the definitions that a mapping with a
+        value for the discriminator can validate against, or ``None`` if the
+        value selects none of them. """
+        index = self.indexes.get(discriminator)
+        if index is None:
+            index = self.indexes[discriminator] = self.__index(discriminator)
+        try:
+            return index.get(value)
+        except TypeError:
+            return None
+
+    def __index(self, discriminator):
+        """ Maps the values that the 'allowed'-constraints of the
+        discriminator in the definitions' subschemas admit to the positions
+        of these definitions. Definitions without such a constraint are
+        included for all values. """
+        index, unconstrained = {}, []
+        for i, definition in enumerate(self.definitions):
+            allowed = definition.get('schema')
+            for key in (discriminator, 'allowed'):
+                allowed = allowed.get(key) if isinstance(allowed, Mapping) \
+                    else None
+            try:
+                if not isinstance(allowed, Sequence) or \
+                        isinstance(allowed, _str_type):
+                    raise TypeError
+                for value in allowed:
+                    index.setdefault(value, set()).add(i)
+            except TypeError:
+                unconstrained.append(i)
+        return dict((value, tuple(sorted(positions.union(unconstrained))))
+                    for value, positions in index.items())
+
+
+_missing = object()
+
+
+def _index_allowed(allowed):
+    """ Returns the list of an 'allowed'-constraint with its length and an
+    index of its values. """
+    if isinstance(allowed, AllowedValues):
+        return allowed, len(allowed), allowed
+    return allowed, len(allowed), AllowedValues(allowed)
+
+
+def _required_fields(schema):
+    return frozenset(field for field, rules in schema.items()
+                     if isinstance(rules, Mapping) and
+                     rules.get('required') is True)
+
+
+def _resolve_path(document, path):
+    """ Returns the value at a path of keys in nested mappings or
+    ``_missing``. """
+    for key in path:
+        if not isinstance(document, Mapping) or key not in document:
+            return _missing
+        document = document[key]
+    return document
+
+
 class Validator(object):
     """ Validator class. Normalizes and validates any mapping against a
     validation-schema which is provided as an argument at class instantiation
@@ -64,6 +244,21 @@ class Validator(object):
     :param error_handler: The error handler that formats the result of
                           ``errors``.
                           Default: :class:`cerberus.errors.BasicErrorHandler`.
+    :param sequence_executor: A :class:`concurrent.futures.Executor`. If given,
+                              sequences that are validated against a
+                              ``schema``-rule and are longer than
+                              ``sequence_chunk_size`` are split into chunks
+                              that are validated by the executor. The schema
+                              must be picklable for a process executor.
+                              Defaults to ``None``.
+    :param sequence_chunk_size: The number of items per chunk. Defaults to
+                                ``10000``.
+    :param collect_branch_errors: If ``True`` all branches of the
+                                  ``*of``-rules are evaluated so that the
+                                  errors of all failing branches are
+                                  reported. Otherwise the evaluation stops
+                                  at the first branch that decides the
+                                  result. Defaults to ``False``.
 
 
     .. versionadded:: 0.10
@@ -178,6 +373,16 @@ class Validator(object):
 
     mandatory_validations = ('nullable', )
     priority_validations = ('nullable', 'readonly', 'type')
+    types_mapping = {
+        'boolean': TypeDefinition('boolean', (bool,), ()),
+        'datetime': TypeDefinition('datetime', (datetime,), ()),
+        'dict': TypeDefinition('dict', (Mapping,), ()),
+        'float': TypeDefinition('float', (float,) + _int_types, ()),
+        'integer': TypeDefinition('integer', _int_types, ()),
+        'list': TypeDefinition('list', (Sequence,), (_str_type,)),
+        'number': TypeDefinition('number', (float,) + _int_types, ()),
+        'set': TypeDefinition('set', (set,), ()),
+        'string': TypeDefinition('string', (_str_type,), ())}
 
     def __init__(self, *args, **kwargs):
         """ The arguments will be treated as with this signature:
@@ -209,14 +414,37 @@ class Validator(object):
                 kwargs[p] = args[i]
         self.__config = kwargs
 
-        self.validation_rules = self.__introspect_rules_to('validate')
-        self.normalization_rules = self.__introspect_rules_to('normalize')
+        self.validation_rules, self.normalization_rules = \
+            self.__introspect_rules()
+        self._type_cache = _type_caches.get(type(self))
+        if self._type_cache is None:
+            self._type_cache = _type_caches[type(self)] = \
+                _TypeCache(type(self))
         self._schema = DefinitionSchema(self, kwargs.get('schema', ()))
-
-    def __introspect_rules_to(self, rule_type):
-        rules = ['_'.join(x.split('_')[2:]) for x in dir(self)
-                 if x.startswith('_' + rule_type)]
-        return tuple(rules)
+        self.__branch_validators = {}
+        self.__field_validators = {}
+        self.__dependency_values = {}
+
+    def __introspect_rules(self):
+        """ Returns the implemented validation and normalization rules, once
+        per class. """
+        rules = _rules_of_classes.get(type(self))
+        if rules is None:
+            rules = _rules_of_classes[type(self)] = tuple(
+                tuple('_'.join(x.split('_')[2:]) for x in dir(self)
+                      if x.startswith('_' + rule_type))
+                for rule_type in ('validate', 'normalize'))
+        return rules
+
+    def __reduce__(self):
+        """ A validator is pickled as its class and configuration with the
+        current schema, so it can be shipped to worker processes. The state of
+        a processing and the :attr:`sequence_executor` are not preserved. """
+        config = self.__config.copy()
+        config.pop('sequence_executor', None)
+        if self.schema is not None:
+            config['schema'] = self.schema.schema
+        return (_validator_from_config, (self.__class__, config))
 
     def _error(self, *args):
         """ Creates and adds one or multiple errors.
@@ -279,8 +507,8 @@ class Validator(object):
             self.document_error_tree += error
             self.schema_error_tree += error
 
-    def __get_child_validator(self, document_crumb=None, schema_crumb=None,
-                              **kwargs):
+    def _get_child_validator(self, document_crumb=None, schema_crumb=None,
+                             **kwargs):
         """ Creates a new instance of Validator-(sub-)class. All initial
         parameters of the parent are passed to the initialization, unless
         a parameter is given as an explicit *keyword*-parameter.
@@ -310,6 +538,43 @@ class Validator(object):
 
         return child_validator
 
+    def __reuse_child_validator(self, validator, document_crumb,
+                                schema_crumb):
+        """ Prepares a child validator that was created by
+        :meth:`_get_child_validator` with the same crumbs for another
+        processing. """
+        validator.root_document = self.root_document or self.document
+        validator.root_schema = self.root_schema or self.schema
+        validator.document_path = self.document_path
+        if document_crumb is not None:
+            validator.document_path += document_crumb
+        validator.schema_path = self.schema_path + schema_crumb
+        validator.document_error_tree = errors.DocumentErrorTree()
+        validator.schema_error_tree = errors.SchemaErrorTree()
+
+    def __field_validator(self, rules, field, document_crumb, schema_crumb):
+        """ Returns a child validator with a schema that defines the rules
+        for one field. It's kept as long as the rules and the class and the
+        configuration of the validator don't change, and only the field's
+        name is replaced in its prepared schema. """
+        key = (document_crumb, schema_crumb)
+        cached = self.__field_validators.get(key)
+        if cached is None or cached[0] is not rules or \
+                cached[1] is not type(self) or cached[2] != self.__config:
+            validator = self._get_child_validator(
+                document_crumb=document_crumb, schema_crumb=schema_crumb,
+                schema={field: rules})
+            self.__field_validators[key] = \
+                (rules, type(self), self.__config.copy(), validator)
+            return validator
+
+        validator = cached[3]
+        self.__reuse_child_validator(validator, document_crumb, schema_crumb)
+        if field not in validator.schema:
+            # the rules were validated with the first field
+            validator.schema.schema = {field: rules}
+        return validator
+
     def _drop_nodes_from_errorpaths(self, errors, dp_items, sp_items):
         """ Removes nodes by index from an errorpath, relatively to the
             basepaths of self.
@@ -342,6 +607,14 @@ class Validator(object):
     def allow_unknown(self, value):
         self.__config['allow_unknown'] = value
 
+    @property
+    def collect_branch_errors(self):
+        return self.__config.get('collect_branch_errors', False)
+
+    @collect_branch_errors.setter
+    def collect_branch_errors(self, value):
+        self.__config['collect_branch_errors'] = value
+
     @property
     def error_handler(self):
         """
@@ -401,6 +674,22 @@ class Validator(object):
     def schema(self, schema):
         self._schema = DefinitionSchema(self, schema)
 
+    @property
+    def sequence_chunk_size(self):
+        return self.__config.get('sequence_chunk_size', 10000)
+
+    @sequence_chunk_size.setter
+    def sequence_chunk_size(self, value):
+        self.__config['sequence_chunk_size'] = value
+
+    @property
+    def sequence_executor(self):
+        return self.__config.get('sequence_executor')
+
+    @sequence_executor.setter
+    def sequence_executor(self, value):
+        self.__config['sequence_executor'] = value
+
     @property
     def transparent_schema_rules(self):
         return self.__config.get('transparent_schema_rules', False)
@@ -414,6 +703,7 @@ class Validator(object):
     def __init_processing(self, document, schema=None):
         self._errors = []
         self._unrequired_by_excludes = set()
+        self.__dependency_values = {}
 
         if schema is not None:
             self.schema = DefinitionSchema(self, schema)
@@ -493,8 +783,8 @@ class Validator(object):
                                                property_rules):
         schema = dict(((k, property_rules) for k in mapping[field]))
         document = dict(((k, k) for k in mapping[field]))
-        validator = self.__get_child_validator(field,
-                                               schema=schema)
+        validator = self._get_child_validator(field,
+                                              schema=schema)
         result = validator.normalized(document)
         for k in result:
             if result[k] in mapping[field]:
@@ -509,7 +799,7 @@ class Validator(object):
 
     def __normalize_mapping_per_valueschema(self, field, mapping, value_rules):
         schema = dict(((k, value_rules) for k in mapping[field]))
-        validator = self.__get_child_validator(field, schema=schema)
+        validator = self._get_child_validator(field, schema=schema)
         mapping[field] = validator.normalized(mapping[field])
 
     def __normalize_mapping_per_schema(self, field, mapping, schema):
@@ -519,16 +809,16 @@ class Validator(object):
         purge_unknown = schema[field].get('purge_unknown',
                                           self.purge_unknown)
         validator = self. \
-            __get_child_validator(field,
-                                  schema=child_schema,
-                                  allow_unknown=allow_unknown,
-                                  purge_unknown=purge_unknown)
+            _get_child_validator(field,
+                                 schema=child_schema,
+                                 allow_unknown=allow_unknown,
+                                 purge_unknown=purge_unknown)
         mapping[field] = validator.normalized(mapping[field])
 
     def __normalize_sequence(self, field, mapping, schema):
         child_schema = dict(((k, schema[field]['schema'])
                              for k in range(len(mapping[field]))))
-        validator = self.__get_child_validator(field, schema=child_schema)
+        validator = self._get_child_validator(field, schema=child_schema)
         result = validator.normalized(dict((k, v) for k, v
                                            in enumerate(mapping[field])))
         for i in result:
@@ -607,6 +897,35 @@ class Validator(object):
 
     __call__ = validate
 
+    def _iter_validate(self, document, schema=None, update=False,
+                       normalize=True):
+        """ Generator-variant of :func:`validate` that yields ``None`` after
+        each validated field and after each item of sequences and mappings
+        that are validated against a ``schema``-rule. Thus the processing of
+        large documents can be interleaved with other tasks.
+        Once it is exhausted, the errors are available as with
+        :func:`validate`.
+
+        .. versionadded:: 0.10
+        """
+        self.update = update
+        self.__init_processing(document, schema)
+        self.__prepare_document(document, normalize)
+
+        for field in self.document:
+            if self.ignore_none_values and self.document[field] is None:
+                continue
+            definitions = self.schema.get(field)
+            if definitions is not None:
+                for _ in self.__iter_validate_definitions(definitions, field):
+                    yield
+            else:
+                self.__validate_unknown_fields(field)
+            yield
+
+        if not self.update:
+            self._validate_required_fields(self.document)
+
     def validated(self, *args, **kwargs):
         """ Wrapper around :func:`validate` that returns the normalized and
         validated document or ``None`` if validation failed.
@@ -617,6 +936,65 @@ class Validator(object):
         else:
             return self.document
 
+    def validate_async(self, document, schema=None, update=False,
+                       normalize=True, max_concurrency=None, yield_every=None,
+                       yield_interval=None):
+        """ Coroutine-variant of :func:`validate` that also awaits the results
+        of ``coerce``- and ``validator``-constraints that return awaitables,
+        e.g. coroutine functions. Independent awaitables of a document are
+        awaited concurrently. Requires Python 3.5 or later.
+
+        :param max_concurrency: Maximum number of awaitables that are awaited
+                                at once. Defaults to ``None`` (unbounded).
+        :param yield_every: If given, control is yielded to the event loop
+                            after this number of validated fields and items.
+        :param yield_interval: If given, control is yielded to the event loop
+                               when validating took longer than this number of
+                               seconds since the last yield.
+
+        Other parameters and the result are alike :func:`validate`.
+
+        .. versionadded:: 0.10
+        """
+        from .aio import validate_async
+        return validate_async(self, document, schema, update, normalize,
+                              max_concurrency, yield_every, yield_interval)
+
+    def validate_batch_async(self, documents, executor=None, max_in_flight=4,
+                             chunk_size=100, update=False, normalize=True):
+        """ Validates documents in chunks with an executor and returns an
+        asynchronous iterator over :class:`~cerberus.batch.ValidationResult` s
+        in the order of the input. Requires Python 3.5 or later.
+
+        Workers reuse the validator with its prepared schema for all chunks.
+        It is only pickled, once, if chunks are sent to worker processes;
+        thus the schema must be picklable for a process executor only.
+
+        :param documents: An iterable or an asynchronous iterable of mappings.
+        :param executor: A :class:`concurrent.futures.Executor`. Defaults to
+                         the event loop's default executor.
+        :param max_in_flight: The maximum number of chunks that are submitted
+                              at once. Further documents are only consumed
+                              when a submitted chunk is finished.
+        :param chunk_size: The number of documents per chunk.
+        :param update: See :func:`validate`.
+        :param normalize: See :func:`validate`.
+
+        .. versionadded:: 0.10
+        """
+        from .aio import validate_batch_async
+        return validate_batch_async(self, documents, executor, max_in_flight,
+                                    chunk_size, update, normalize)
+
+    def normalized_async(self, document, schema=None, max_concurrency=None):
+        """ Coroutine-variant of :func:`normalized`, see
+        :func:`validate_async`.
+
+        .. versionadded:: 0.10
+        """
+        from .aio import normalized_async
+        return normalized_async(self, document, schema, max_concurrency)
+
     # TODO remove on next major release
     def validate_update(self, document, schema=None):
         """ Validates a Python dictionary against a validation schema. The
@@ -639,6 +1017,10 @@ class Validator(object):
         return self.validate(document, schema, update=True)
 
     def __prepare_document(self, document, normalize):
+        if not normalize and not isinstance(document, MutableMapping):
+            # a read-only mapping can't change while it's validated
+            self.document = document
+            return
         self.document = document.copy()  # needed by _error
         if normalize:
             self.document = self.__normalize_mapping(document.copy(),
@@ -650,9 +1032,8 @@ class Validator(object):
             if isinstance(self.allow_unknown, Mapping):
                 # validate that unknown fields matches the schema
                 # for unknown_fields
-                validator = self.__get_child_validator(
-                    schema_crumb='allow_unknown',
-                    schema={field: self.allow_unknown})
+                validator = self.__field_validator(
+                    self.allow_unknown, field, None, ('allow_unknown',))
                 if not validator({field: value}, normalize=False):
                     self._error(validator._errors)
         else:
@@ -673,26 +1054,70 @@ class Validator(object):
         value = self.document[field]
 
         """ _validate_-methods must return True to abort validation. """
-        prior_rules = tuple((x for x in self.priority_validations
-                             if x in definitions
-                             or x in self.mandatory_validations))
+        prior_rules, rules = self.__rules_of_definitions(definitions)
         for rule in prior_rules:
             if validate_rule(rule):
                 return
 
+        for rule in rules:
+            validate_rule(rule)
+
+    def __iter_validate_definitions(self, definitions, field):
+        """ Generator-variant of :meth:`__validate_definitions` that descends
+        into the items of sequences and mappings of a ``schema``-rule. """
+
+        def validate_rule(rule):
+            validatorname = "_validate_" + rule.replace(" ", "_")
+            validator = getattr(self, validatorname, None)
+            if validator:
+                return validator(definitions.get(rule, None), field, value)
+
+        value = self.document[field]
+
+        prior_rules, rules = self.__rules_of_definitions(definitions)
+        for rule in prior_rules:
+            if validate_rule(rule):
+                return
+
+        iter_schema = self.__defining_class('_validate_schema') is Validator
+        for rule in rules:
+            if rule == 'schema' and iter_schema:
+                for _ in self.__iter_validate_schema(definitions['schema'],
+                                                     field, value):
+                    yield
+            else:
+                validate_rule(rule)
+
+    def __rules_of_definitions(self, definitions):
+        """ Returns the rules that must be validated first in order and the
+        remaining rules to validate for a field's definitions. """
+        prior_rules = tuple((x for x in self.priority_validations
+                             if x in definitions
+                             or x in self.mandatory_validations))
         rules = set(self.mandatory_validations)
         rules |= set(definitions.keys())
         rules -= set(prior_rules + self.normalization_rules +
                      ('allow_unknown', 'required'))
-        for rule in rules:
-            validate_rule(rule)
+        return prior_rules, rules
+
+    def __defining_class(self, attribute):
+        for cls in type(self).__mro__:
+            if attribute in vars(cls):
+                return cls
 
     def _validate_allowed(self, allowed_values, field, value):
+        indexes = getattr(self.schema, 'allowed', None)
+        if indexes is not None and isinstance(allowed_values, list):
+            index = indexes.get(id(allowed_values))
+            if index is None or index[1] != len(allowed_values):
+                index = indexes[id(allowed_values)] = \
+                    _index_allowed(allowed_values)
+            allowed_values = index[2]
         if isinstance(value, _str_type):
             if value not in allowed_values:
                 self._error(field, errors.UNALLOWED_VALUE, value)
         elif isinstance(value, Sequence) and not isinstance(value, _str_type):
-            unallowed = set(value) - set(allowed_values)
+            unallowed = set(x for x in set(value) if x not in allowed_values)
             if unallowed:
                 self._error(field, errors.UNALLOWED_VALUES, list(unallowed))
         elif isinstance(value, int):
@@ -700,74 +1125,68 @@ class Validator(object):
                 self._error(field, errors.UNALLOWED_VALUE, value)
 
     def _validate_dependencies(self, dependencies, field, value):
-        if isinstance(dependencies, _str_type):
-            dependencies = [dependencies]
-
-        if isinstance(dependencies, Sequence):
-            self.__validate_dependencies_sequence(dependencies, field)
-        elif isinstance(dependencies, Mapping):
-            self.__validate_dependencies_mapping(dependencies, field)
+        compiled = getattr(self.schema, 'dependencies', {}).get(field)
+        if compiled is None or compiled.constraint != dependencies:
+            compiled = _Dependencies(dependencies)
 
-        if self.document_error_tree.fetch_node_from(
-                self.schema_path + (field, 'dependencies')) is not None:
-            return True
+        if compiled.values is None:
+            return self.__validate_dependencies_sequence(compiled, field)
+        else:
+            return self.__validate_dependencies_mapping(compiled, field)
+
+    def __resolve_dependency(self, path):
+        """ Returns the value at the path of a dependency in the document, or
+        ``_missing``. Paths that several fields depend on according to the
+        schema's index of dependents are resolved once per document. """
+        if len(getattr(self.schema, 'dependents', {}).get(path, ())) < 2:
+            return _resolve_path(self.document, path)
+        try:
+            return self.__dependency_values[path]
+        except KeyError:
+            value = self.__dependency_values[path] = \
+                _resolve_path(self.document, path)
+            return value
 
     def __validate_dependencies_mapping(self, dependencies, field):
         validated_deps = 0
-        for dep_name, dep_values in dependencies.items():
-            if (not isinstance(dep_values, Sequence) or
-                    isinstance(dep_values, _str_type)):
-                dep_values = [dep_values]
-            context = self.document.copy()
-            parts = dep_name.split('.')
-            info = dict()
-
-            for part in parts:
-                if part in context:
-                    context = context[part]
-                    if context in dep_values:
-                        validated_deps += 1
-                    else:
-                        info.update({dep_name: context})
+        info = dict()
+        for dep_name, path in dependencies.paths:
+            context = self.__resolve_dependency(path)
+            if context is _missing:
+                continue
+            if context in dependencies.values[dep_name]:
+                validated_deps += 1
+            else:
+                info[dep_name] = context
 
-        if validated_deps != len(dependencies):
+        if validated_deps != len(dependencies.paths):
             self._error(field, errors.DEPENDENCIES_FIELD_VALUE, info)
+            return True
 
     def __validate_dependencies_sequence(self, dependencies, field):
-        for dependency in dependencies:
-
-            context = self.document.copy()
-            parts = dependency.split('.')
-
-            for part in parts:
-                if part in context:
-                    context = context[part]
-                else:
-                    self._error(field, errors.DEPENDENCIES_FIELD, dependency)
+        failed = False
+        for dependency, path in dependencies.paths:
+            if self.__resolve_dependency(path) is _missing:
+                self._error(field, errors.DEPENDENCIES_FIELD, dependency)
+                failed = True
+        return failed
 
     def _validate_empty(self, empty, field, value):
         if isinstance(value, _str_type) and len(value) == 0 and not empty:
             self._error(field, errors.EMPTY_NOT_ALLOWED)
 
     def _validate_excludes(self, excludes, field, value):
-        if isinstance(excludes, Hashable):
-            excludes = [excludes]
-
-        # Save required field to be checked latter
-        if 'required' in self.schema[field] and self.schema[field]['required']:
-            self._unrequired_by_excludes.add(field)
-        for exclude in excludes:
-            if (exclude in self.schema and
-               'required' in self.schema[exclude] and
-                    self.schema[exclude]['required']):
+        compiled = getattr(self.schema, 'excludes', {}).get(field)
+        if compiled is None or compiled.constraint != excludes:
+            compiled = _Excludes(excludes, field, self.schema)
 
-                self._unrequired_by_excludes.add(exclude)
+        # Save required fields to be checked later
+        self._unrequired_by_excludes |= compiled.required
 
-        if [True for key in excludes if key in self.document]:
-            # Wrap each field in `excludes` list between quotes
-            exclusion_str = ', '.join("'{0}'"
-                                      .format(word) for word in excludes)
-            self._error(field, errors.EXCLUDES_FIELD, exclusion_str)
+        for exclude in compiled.fields:
+            if exclude in self.document:
+                self._error(field, errors.EXCLUDES_FIELD, compiled.info)
+                break
 
     # TODO remove on next major release
     def _validate_items(self, items, field, value):
@@ -782,56 +1201,103 @@ class Validator(object):
             self._error(field, errors.ITEMS_LENGTH, len(items), len(values))
         else:
             schema = dict((i, definition) for i, definition in enumerate(items))  # noqa
-            validator = self.__get_child_validator(document_crumb=field,
-                                                   schema_crumb=(field, 'items'),  # noqa
-                                                   schema=schema)
+            validator = self._get_child_validator(document_crumb=field,
+                                                  schema_crumb=(field, 'items'),  # noqa
+                                                  schema=schema)
             if not validator(dict((i, item) for i, item in enumerate(values)),
                              normalize=False):
                 self._error(field, errors.BAD_ITEMS, validator._errors)
 
     # TODO remove on next major release
     def _validate_items_schema(self, items, field, value):
-        validator = self.__get_child_validator(schema=items)
+        validator = self._get_child_validator(schema=items)
         for item in value:
             if not validator(item, normalize=False):
                 self._error(validator._errors)
 
     def __validate_logical(self, operator, definitions, field, value):
-        """ Validates value against all definitions and logs errors according
-        to the operator.
+        """ Validates value against the definitions and logs errors according
+        to the operator. Unless :attr:`collect_branch_errors` is set, no more
+        definitions are tested once the result is decided.
         """
-        if isinstance(definitions, Mapping):
-            definitions = [definitions]
+        branches, validators = self.__branch_validators_for(operator, field)
+        exhaustive = self.collect_branch_errors
+
+        positions = None
+        discriminator = self.schema[field].get('discriminator')
+        if discriminator is not None and operator in ('anyof', 'oneof') and \
+                isinstance(value, Mapping) and discriminator in value:
+            positions = branches.dispatch(discriminator, value[discriminator])
+        if positions is None:
+            positions = range(len(validators))
 
         valid_counter = 0
         _errors = []
 
-        for i, definition in enumerate(definitions):
-            s = self.schema[field].copy()
-            del s[operator]
-            s.update(definition)
-
-            validator = self.__get_child_validator(
-                schema_crumb=(field, operator, i),
-                schema={field: s})
+        for i in positions:
+            validator = self.__branch_validator(branches, validators, field, i)
             if validator({field: value}, normalize=False):
                 valid_counter += 1
+                if exhaustive:
+                    continue
+                if operator in ('anyof', 'noneof') or \
+                        (operator == 'oneof' and valid_counter > 1):
+                    break
             else:
                 self._drop_nodes_from_errorpaths(validator._errors, [], [3])
                 _errors.extend(validator._errors)
+                if operator == 'allof' and not exhaustive:
+                    break
 
         if operator == 'anyof' and valid_counter < 1:
             self._error(field, errors.ANYOF, _errors,
-                        valid_counter, len(definitions))
-        elif operator == 'allof' and valid_counter < len(definitions):
+                        valid_counter, len(validators))
+        elif operator == 'allof' and valid_counter < len(validators):
             self._error(field, errors.ALLOF, _errors,
-                        valid_counter, len(definitions))
+                        valid_counter, len(validators))
         elif operator == 'noneof' and valid_counter > 0:
             self._error(field, errors.NONEOF, _errors,
-                        valid_counter, len(definitions))
+                        valid_counter, len(validators))
         elif operator == 'oneof' and valid_counter != 1:
             self._error(field, errors.ONEOF, _errors,
-                        valid_counter, len(definitions))
+                        valid_counter, len(validators))
+
+    def __branch_validators_for(self, operator, field):
+        """ Returns the merged branches of a logical rule and the list of
+        their child validators that is kept as long as the rules, the class
+        and the configuration of the validator don't change. Its items are
+        created when they're first needed and are shared by all fields with
+        the same rules, e.g. the items of a sequence. """
+        rules = self.schema[field]
+        key = (id(rules), operator)
+        merged = getattr(self.schema, 'branches', {})
+        branches = merged.get(key)
+        if branches is None or not branches.merged_from(rules):
+            branches = merged[key] = _Branches(operator, rules)
+
+        cached = self.__branch_validators.get(key)
+        if cached is None or cached[0] is not branches or \
+                cached[1] is not type(self) or cached[2] != self.__config:
+            cached = (branches, type(self), self.__config.copy(),
+                      [None] * len(branches.definitions))
+            self.__branch_validators[key] = cached
+        return branches, cached[3]
+
+    def __branch_validator(self, branches, validators, field, i):
+        """ Returns a branch's child validator, prepared for the current
+        document. """
+        schema_crumb = (field, branches.operator, i)
+        validator = validators[i]
+        if validator is None:
+            validator = validators[i] = self._get_child_validator(
+                schema_crumb=schema_crumb,
+                schema={field: branches.definitions[i]})
+        else:
+            self.__reuse_child_validator(validator, None, schema_crumb)
+            if field not in validator.schema:
+                # the definition was validated with the first field
+                validator.schema.schema = {field: branches.definitions[i]}
+        return validator
 
     def _validate_anyof(self, definitions, field, value):
         self.__validate_logical('anyof', definitions, field, value)
@@ -875,15 +1341,27 @@ class Validator(object):
 
     def _validate_propertyschema(self, schema, field, value):
         if isinstance(value, Mapping):
-            validator = self.__get_child_validator(
-                document_crumb=(field,),
-                schema_crumb=(field, 'propertyschema'),
-                schema=dict(((k, schema) for k in value.keys())))
-            if not validator(dict(((k, k) for k in value.keys())),
-                             normalize=False):
-                self._drop_nodes_from_errorpaths(validator._errors,
+            schema_crumb = (field, 'propertyschema')
+            if self.__refers_to_siblings(schema):
+                validator = self._get_child_validator(
+                    document_crumb=(field,), schema_crumb=schema_crumb,
+                    schema=dict(((k, schema) for k in value.keys())))
+                validator(dict(((k, k) for k in value.keys())),
+                          normalize=False)
+                validation_errors = validator._errors
+            else:
+                # each key is validated on its own with the same prepared
+                # rules
+                validation_errors = []
+                for key in value:
+                    validator = self.__field_validator(schema, key, (field,),
+                                                       schema_crumb)
+                    if not validator({key: key}, normalize=False):
+                        validation_errors.extend(validator._errors)
+            if validation_errors:
+                self._drop_nodes_from_errorpaths(validation_errors,
                                                  [], [2, 4])
-                self._error(field, errors.PROPERTYSCHEMA, validator._errors)
+                self._error(field, errors.PROPERTYSCHEMA, validation_errors)
 
     def _validate_readonly(self, readonly, field, value):
         if readonly:
@@ -893,10 +1371,10 @@ class Validator(object):
     def _validate_regex(self, pattern, field, value):
         if not isinstance(value, _str_type):
             return
-        if not pattern.endswith('$'):
-            pattern += '$'
-        re_obj = re.compile(pattern)
-        if not re_obj.match(value):
+        compiled = getattr(self.schema, 'patterns', {}).get(field)
+        if compiled is None or compiled[0] != pattern:
+            compiled = (pattern, compile_pattern(pattern))
+        if not compiled[1].match(value):
             self._error(field, errors.REGEX_MISMATCH)
 
     def _validate_required_fields(self, document):
@@ -906,24 +1384,25 @@ class Validator(object):
 
         :param document: The document being validated.
         """
-        required = set(field for field, definition in self.schema.items()
-                       if definition.get('required') is True)
-        required -= self._unrequired_by_excludes
-        missing = required - set(field for field in document
-                                 if document.get(field) is not None or
-                                 not self.ignore_none_values)
+        required = getattr(self.schema, 'required', None)
+        if required is None:
+            required = _required_fields(self.schema)
+        ignore_none_values = self.ignore_none_values
 
-        for field in missing:
-            self._error(field, errors.REQUIRED_FIELD)
+        for field in required:
+            if field in self._unrequired_by_excludes:
+                continue
+            if field not in document or \
+                    (ignore_none_values and document[field] is None):
+                self._error(field, errors.REQUIRED_FIELD)
 
         # At least on field from self._unrequired_by_excludes should be
         # present in document
-        if self._unrequired_by_excludes:
-            fields = set(field for field in document
-                         if document.get(field) is not None)
-            if self._unrequired_by_excludes.isdisjoint(fields):
-                for field in self._unrequired_by_excludes - fields:
-                    self._error(field, errors.REQUIRED_FIELD)
+        if self._unrequired_by_excludes and \
+                all(document.get(field) is None
+                    for field in self._unrequired_by_excludes):
+            for field in self._unrequired_by_excludes:
+                self._error(field, errors.REQUIRED_FIELD)
 
     def _validate_schema(self, schema, field, value):
         if schema is None:
@@ -934,52 +1413,108 @@ class Validator(object):
         elif isinstance(value, Mapping):
             self.__validate_schema_mapping(field, schema, value)
 
-    def __validate_schema_mapping(self, field, schema, value):
+    def __iter_validate_schema(self, schema, field, value):
+        """ Generator-variant of :meth:`_validate_schema`. """
+        if schema is None:
+            return
+
+        if isinstance(value, Sequence) and not isinstance(value, _str_type):
+            validator = self.__get_schema_sequence_validator(field, schema,
+                                                             value)
+            for _ in validator._iter_validate(
+                    dict(((i, v) for i, v in enumerate(value))),
+                    normalize=False):
+                yield
+            self.__submit_schema_sequence_errors(field, validator)
+        elif isinstance(value, Mapping):
+            validator = self.__get_schema_mapping_validator(field, schema)
+            for _ in validator._iter_validate(value, update=self.update,
+                                              normalize=False):
+                yield
+            if validator._errors:
+                self._error(validator._errors)
+
+    def __get_schema_mapping_validator(self, field, schema):
         allow_unknown = self.schema[field].get('allow_unknown',
                                                self.allow_unknown)
-        validator = self.__get_child_validator(document_crumb=field,
-                                               schema_crumb=(field, 'schema'),
-                                               schema=schema,
-                                               allow_unknown=allow_unknown)
+        return self._get_child_validator(document_crumb=field,
+                                         schema_crumb=(field, 'schema'),
+                                         schema=schema,
+                                         allow_unknown=allow_unknown)
+
+    def __validate_schema_mapping(self, field, schema, value):
+        validator = self.__get_schema_mapping_validator(field, schema)
         if not validator(value, update=self.update, normalize=False):
             self._error(validator._errors)
 
-    def __validate_schema_sequence(self, field, schema, value):
+    def __get_schema_sequence_validator(self, field, schema, value):
         schema = dict(((i, schema) for i in range(len(value))))
-        validator = self.__get_child_validator(
+        return self._get_child_validator(
             document_crumb=field, schema_crumb=(field, 'schema'),
             schema=schema, allow_unknown=self.allow_unknown)
-        validator(dict(((i, v) for i, v in enumerate(value))), normalize=False)
+
+    def __submit_schema_sequence_errors(self, field, validator):
         if validator._errors:
             self._drop_nodes_from_errorpaths(validator._errors, [], [2])
             self._error(field, errors.SEQUENCE_SCHEMA, validator._errors)
 
-    def _validate_type(self, data_type, field, value):
-        def call_type_validation(_type, value):
-            # TODO refactor to a less complex code as submitting an error is now unified and can be triggered here  # noqa
-            # validator = getattr(self, "_validate_type_" + _type)
-            # return validator(field, value)
-
-            prev_errors = copy(self._errors)
-            validator = getattr(self, "_validate_type_" + _type)
-            validator(field, value)
-            if len(self._errors) == len(prev_errors):
-                return True
-            else:
-                self._errors = prev_errors
-                return False
+    def __validate_schema_sequence(self, field, schema, value):
+        if self.sequence_executor is not None and \
+                len(value) > self.sequence_chunk_size:
+            self.__validate_schema_sequence_in_chunks(field, schema, value)
+            return
+        validator = self.__get_schema_sequence_validator(field, schema, value)
+        validator(dict(((i, v) for i, v in enumerate(value))), normalize=False)
+        self.__submit_schema_sequence_errors(field, validator)
+
+    def __validate_schema_sequence_in_chunks(self, field, schema, value):
+        """ Validates chunks of a sequence with the :attr:`sequence_executor`.
+        The items' indexes in the resulting errors refer to the whole
+        sequence. """
+        from .batch import ValidatorPayload, validate_sequence_chunk
+        template = self._get_child_validator(
+            document_crumb=field, schema_crumb=(field, 'schema'),
+            schema={}, allow_unknown=self.allow_unknown)
+        payload = ValidatorPayload(template)
+        size = self.sequence_chunk_size
+        futures = [self.sequence_executor.submit(
+            validate_sequence_chunk, payload, template.document_path,
+            template.schema_path, schema, i, value[i:i + size])
+            for i in range(0, len(value), size)]
+        _errors = []
+        for future in futures:
+            _errors.extend(future.result())
+        if _errors:
+            self._drop_nodes_from_errorpaths(_errors, [], [2])
+            self._error(field, errors.SEQUENCE_SCHEMA, _errors)
 
+    def _validate_type(self, data_type, field, value):
         if isinstance(data_type, _str_type):
-            if call_type_validation(data_type, value):
+            data_type = (data_type,)
+        elif not isinstance(data_type, Iterable):
+            data_type = ()
+
+        matches = self._type_cache(type(value))
+        for _type in data_type:
+            if _type in matches:
+                return
+            if _type not in self._type_cache.definitions and \
+                    self.__call_type_method(_type, field, value):
                 return
-        elif isinstance(data_type, Iterable):
-            for _type in data_type:
-                if call_type_validation(_type, value):
-                    return
 
         self._error(field, errors.BAD_TYPE)
         return True
 
+    def __call_type_method(self, _type, field, value):
+        """ Tests a value with a ``_validate_type_<name>``-method of a
+        subclass, which submits an error if the value doesn't match. """
+        previous_errors, self._errors = self._errors, []
+        try:
+            getattr(self, '_validate_type_' + _type)(field, value)
+            return not self._errors
+        finally:
+            self._errors = previous_errors
+
     def _validate_type_boolean(self, field, value):
         if not isinstance(value, bool):
             self._error(field, errors.BAD_TYPE)
@@ -1024,13 +1559,35 @@ class Validator(object):
     def _validate_valueschema(self, schema, field, value):
         schema_crumb = (field, 'valueschema')
         if isinstance(value, Mapping):
-            validator = self.__get_child_validator(
-                document_crumb=field, schema_crumb=schema_crumb,
-                schema=dict((k, schema) for k in value))
-            validator(value, normalize=False)
-            if validator._errors:
-                self._drop_nodes_from_errorpaths(validator._errors, [], [2])
-                self._error(field, errors.VALUESCHEMA, validator._errors)
+            if self.__refers_to_siblings(schema):
+                validator = self._get_child_validator(
+                    document_crumb=field, schema_crumb=schema_crumb,
+                    schema=dict((k, schema) for k in value))
+                validator(value, normalize=False)
+                validation_errors = validator._errors
+            else:
+                # each value is validated on its own with the same prepared
+                # rules
+                validation_errors = []
+                for key in value:
+                    validator = self.__field_validator(schema, key, (field,),
+                                                       schema_crumb)
+                    if not validator({key: value[key]}, normalize=False):
+                        validation_errors.extend(validator._errors)
+            if validation_errors:
+                self._drop_nodes_from_errorpaths(validation_errors, [], [2])
+                self._error(field, errors.VALUESCHEMA, validation_errors)
+
+    def __refers_to_siblings(self, rules):
+        """ Tests whether the rules for the items of a mapping may look at
+        other items, which requires to validate them within the whole mapping.
+        That is the case for 'dependencies'- and 'excludes'-rules and for
+        rules that are implemented by a subclass. """
+        if not isinstance(rules, Mapping):
+            return False
+        return any(rule in ('dependencies', 'excludes') or
+                   not _is_builtin_method(type(self), '_validate_' + rule)
+                   for rule in rules)
 
 
 class DefinitionSchema(MutableMapping):
@@ -1041,7 +1598,7 @@ class DefinitionSchema(MutableMapping):
 
     class Encoder(json.JSONEncoder):
         def default(self, o):
-            if isinstance(o, Callable):
+            if isinstance(o, (Callable, FileValueSet)):
                 return repr(o)
             return json.JSONEncoder.default(self, o)
 
@@ -1070,7 +1627,7 @@ class DefinitionSchema(MutableMapping):
         except:
             raise
         else:
-            del self.schema[key]
+            self.schema = _new_schema
 
     def __getitem__(self, item):
         return self.schema[item]
@@ -1097,6 +1654,49 @@ class DefinitionSchema(MutableMapping):
     def __str__(self):
         return str(self.schema)
 
+    @property
+    def schema(self):
+        return self.__schema
+
+    @schema.setter
+    def schema(self, schema):
+        self.__schema = schema
+        # the compiled constraints of the fields
+        self.dependencies = dict(
+            (field, _Dependencies(rules['dependencies']))
+            for field, rules in schema.items()
+            if isinstance(rules, Mapping) and 'dependencies' in rules)
+        self.excludes = dict(
+            (field, _Excludes(rules['excludes'], field, schema))
+            for field, rules in schema.items()
+            if isinstance(rules, Mapping) and 'excludes' in rules)
+        # the fields that depend on each path
+        self.dependents = {}
+        for field, compiled in self.dependencies.items():
+            for _, path in compiled.paths:
+                self.dependents.setdefault(path, []).append(field)
+        self.required = _required_fields(schema)
+        self.patterns = dict(
+            (field, (rules['regex'], compile_pattern(rules['regex'])))
+            for field, rules in schema.items()
+            if isinstance(rules, Mapping) and
+            isinstance(rules.get('regex'), _str_type))
+        # the values of 'allowed'-constraints are indexed when they're first
+        # used, the indexes of lists that remain are kept
+        lists = set(id(rules.get('allowed')) for rules in schema.values()
+                    if isinstance(rules, Mapping))
+        self.allowed = dict(
+            (key, index)
+            for key, index in getattr(self, 'allowed', {}).items()
+            if key in lists)
+        # the branches of '*of'-rules are merged when they're first used and
+        # kept for rules that remain, e.g. when only a field is renamed
+        remaining = set(id(rules) for rules in schema.values())
+        self.branches = dict(
+            (key, branches)
+            for key, branches in getattr(self, 'branches', {}).items()
+            if key[0] in remaining)
+
     def update(self, schema):
         try:
             _new_schema = self.schema.copy()
@@ -1194,6 +1794,12 @@ class DefinitionSchema(MutableMapping):
                                           .format(field))
                 elif constraint == 'excludes':
                     self.__validate_excludes_definition(value)
+                elif constraint == 'regex':
+                    self.__validate_regex_definition(field, value)
+                elif constraint == 'discriminator':
+                    if not isinstance(value, Hashable):
+                        raise SchemaError(errors.SCHEMA_ERROR_DISCRIMINATOR
+                                          .format(field))
                 elif constraint in ('propertyschema', 'valueschema'):
                     if set(value) & set(('rename', 'rename_handler')):
                         raise SchemaError(errors.SCHEMA_ERROR_XSCHEMA_RENAME)
@@ -1246,14 +1852,27 @@ class DefinitionSchema(MutableMapping):
         except SchemaError:  # if sequence
             DefinitionSchema(self.validator, {'schema': value})
 
+    def __validate_regex_definition(self, field, pattern):
+        """ Compiles a pattern into the shared cache. """
+        try:
+            compile_pattern(pattern)
+        except (re.error, TypeError) as e:
+            raise SchemaError(errors.SCHEMA_ERROR_REGEX
+                              .format(field, pattern, e))
+
     def __validate_type_definition(self, type_defs):
         type_defs = type_defs if isinstance(type_defs, list) else [type_defs]
         for type_def in type_defs:
-            if not 'type_' + type_def in self.rules:
+            if not 'type_' + type_def in self.rules and \
+                    type_def not in self.validator.types_mapping:
                 raise SchemaError(
                     errors.SCHEMA_ERROR_UNKNOWN_TYPE.format(type_def))
 
 
+def _validator_from_config(cls, config):
+    return cls(**config)
+
+
 def expand_definition_schema(schema):
     """ Expand agglutinated rules in a definition-schema.
 
@@ -0,0 +1,339 @@
+"""
+    The command-line interface for bulk validation, invoked as
+    ``python -m cerberus``.
+
+    Records of NDJSON-, JSON- or CSV-files, which may be compressed, are
+    validated serially or in a :class:`~cerberus.pipeline.Pipeline` of worker
+    processes and the valid and rejected records as well as the errors are
+    written to separate files.
+"""
+
+from __future__ import print_function
+
+import argparse
+from collections import deque
+import csv
+from itertools import islice
+import io
+import json
+import os
+import sys
+import time
+
+from . import errors
+from .cerberus import Validator
+from .incremental import iter_json_items
+from .pipeline import Pipeline, parse_chunk, serialize_chunk, validate_chunk
+from .streaming import decode_json_line, dump_json_line, iter_lines, \
+    open_compressed
+from .tabular import Columns
+
+
+DEFAULT_CHUNK_SIZE = 500
+FORMATS = ('ndjson', 'json', 'csv')
+EXTENSIONS = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'json',
+              '.csv': 'csv'}
+COMPRESSION_EXTENSIONS = ('.gz', '.bz2', '.xz')
+INVALID_INPUT = 'invalid input'
+
+# the coercers that can be named in a JSON schema
+COERCERS = {'float': float, 'int': int, 'str': str}
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+# maps the codes of the defined errors to their names
+ERROR_NAMES = dict((x.code, name) for name, x in vars(errors).items()
+                   if isinstance(x, errors.ErrorDefinition))
+
+
+class _CodedErrors(dict):
+    """ The errors of a document as :attr:`~cerberus.Validator.errors` returns
+    them, with the ``codes`` of all errors. """
+
+
+class _CodingValidator(Validator):
+    """ Adds the codes of the errors to :attr:`errors`, so that they can be
+    counted by code after they passed processes. """
+
+    @property
+    def errors(self):
+        tree = _CodedErrors(Validator.errors.fget(self))
+        tree.codes = list(_codes(self._errors))
+        return tree
+
+
+def _codes(validation_errors):
+    for error in validation_errors:
+        if error.is_group_error:
+            for code in _codes(error.child_errors):
+                yield code
+        else:
+            yield error.code
+
+
+def load_schema(path):
+    """ Loads a schema from a JSON file. The constraints of its
+    ``coerce``-rules may be the names of :data:`COERCERS`. """
+    with open(path) as f:
+        return _resolve_coercers(json.load(f))
+
+
+def _resolve_coercers(value):
+    if isinstance(value, dict):
+        return dict((key, COERCERS[x]
+                     if key == 'coerce' and _is_string(x) and x in COERCERS
+                     else _resolve_coercers(x))
+                    for key, x in value.items())
+    if isinstance(value, list):
+        return [_resolve_coercers(x) for x in value]
+    return value
+
+
+def _is_string(value):
+    return isinstance(value, (str, type(u'')))
+
+
+def detect_format(path):
+    """ Returns the format of a file that is implied by its name's extension,
+    ignoring the extension of a compression. """
+    root, extension = os.path.splitext(path.lower())
+    if extension in COMPRESSION_EXTENSIONS:
+        root, extension = os.path.splitext(root)
+    if extension not in EXTENSIONS:
+        raise ValueError("Can't detect the format of {0}, use --format."
+                         .format(path))
+    return EXTENSIONS[extension]
+
+
+def read_records(validator, stream, format, delimiter=','):
+    """ Yields the index and the record of each document of a binary file
+    object, which is decompressed if necessary. The records of ``'ndjson'``
+    are undecoded lines with their numbers, those of ``'csv'`` are
+    dictionaries with their row numbers and those of ``'json'`` are the
+    documents of an array or a single document with their positions, which
+    are parsed one by one. """
+    reader = open_compressed(stream)
+    try:
+        if format == 'ndjson':
+            for number, line in enumerate(iter_lines(reader), 1):
+                if line.strip():
+                    yield number, line
+        elif format == 'csv':
+            lines = (x + b'\n' for x in iter_lines(reader))
+            if sys.version_info[0] > 2:
+                lines = (x.decode('utf-8') for x in lines)
+            rows = csv.reader(lines, delimiter=delimiter)
+            columns = Columns(validator, next(rows, ()))
+            for number, row in enumerate(rows, 2):
+                if row:
+                    yield number, columns.document(row).copy()
+        else:
+            for i, document in enumerate(iter_json_items(reader)):
+                yield i, document
+    finally:
+        reader.close()
+
+
+class Statistics(object):
+    """ Counts the processed documents and their errors by code. """
+
+    def __init__(self):
+        self.files = 0
+        self.valid = 0
+        self.invalid = 0
+        self.codes = {}
+        self.stages = {}
+        self.start = _clock()
+
+    def add(self, result):
+        if result.valid:
+            self.valid += 1
+            return
+        self.invalid += 1
+        for code in getattr(result.errors, 'codes', (INVALID_INPUT,)):
+            self.codes[code] = self.codes.get(code, 0) + 1
+
+    def add_stages(self, statistics):
+        for stage, values in statistics.items():
+            if stage != 'total':
+                totals = self.stages.setdefault(
+                    stage, {'workers': values['workers'], 'documents': 0,
+                            'seconds': 0.0})
+                totals['documents'] += values['documents']
+                totals['seconds'] += values['seconds']
+
+    def report(self, stream):
+        duration = _clock() - self.start
+        documents = self.valid + self.invalid
+        print('{0} files, {1} documents in {2:.2f}s ({3:.1f} documents/s)'
+              .format(self.files, documents, duration,
+                      documents / max(duration, 1e-9)), file=stream)
+        print('valid: {0}, invalid: {1}'.format(self.valid, self.invalid),
+              file=stream)
+        for stage in ('parse', 'validate', 'serialize'):
+            if stage in self.stages:
+                values = self.stages[stage]
+                print('{0} stage: {1} workers, {2:.1f} documents/s'.format(
+                    stage, values['workers'], values['documents'] *
+                    max(values['workers'], 1) / max(values['seconds'], 1e-9)),
+                    file=stream)
+        if self.codes:
+            print('errors by code:', file=stream)
+        for code, count in sorted(self.codes.items(),
+                                  key=lambda x: (-x[1], str(x[0]))):
+            if code == INVALID_INPUT:
+                name = code
+            else:
+                name = '0x{0:02x} {1}'.format(
+                    code, ERROR_NAMES.get(code, 'UNKNOWN'))
+            print('  {0}: {1}'.format(name, count), file=stream)
+
+
+def process(validator, items, parse, jobs=1, chunk_size=DEFAULT_CHUNK_SIZE,
+            method='validated', update=False, normalize=True,
+            statistics=None):
+    """ Yields a :class:`~cerberus.batch.ValidationResult` for each item, in
+    the same process or with a :class:`~cerberus.pipeline.Pipeline` of
+    ``jobs`` validating processes. The documents of valid results are
+    serialized as JSON lines. """
+    if jobs > 1:
+        pipeline = Pipeline(validator, parse=parse, validators=jobs,
+                            chunk_size=chunk_size, method=method,
+                            update=update, normalize=normalize)
+        for result in pipeline.run(items):
+            yield result
+        if statistics is not None:
+            statistics.add_stages(pipeline.statistics)
+        return
+
+    items = iter(items)
+    offset = 0
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            break
+        parsed = parse_chunk(parse or _identity, offset, chunk)
+        results = validate_chunk(validator, method, update, normalize,
+                                 offset, parsed)
+        for result in serialize_chunk(dump_json_line, offset, results):
+            yield result
+        offset += len(chunk)
+
+
+def _identity(item):
+    return item
+
+
+def _text(line):
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    return line.rstrip(u'\r') + u'\n'
+
+
+def validate_file(validator, path, format, sinks, options, statistics):
+    """ Validates the records of a file and writes them and their errors to
+    the ``valid``, ``rejected`` and ``errors`` file objects in ``sinks``. """
+    records = deque()
+
+    def items():
+        with open(path, 'rb') as stream:
+            for record in read_records(validator, stream, format,
+                                       options.delimiter):
+                records.append(record)
+                yield record[1]
+
+    parse = decode_json_line if format == 'ndjson' else None
+    method = 'normalized' if options.normalize_only else 'validated'
+    for result in process(validator, items(), parse, options.jobs,
+                          options.chunk_size, method, options.update,
+                          not options.no_normalize, statistics):
+        index, record = records.popleft()
+        statistics.add(result)
+        if result.valid:
+            if sinks['valid'] is not None:
+                sinks['valid'].write(result.document)
+            continue
+        if sinks['rejected'] is not None:
+            sinks['rejected'].write(_text(record) if format == 'ndjson'
+                                    else dump_json_line(record))
+        if sinks['errors'] is not None:
+            sinks['errors'].write(dump_json_line(
+                {'file': path, 'index': index, 'errors': result.errors}))
+    statistics.files += 1
+
+
+def parser():
+    """ Returns the :class:`argparse.ArgumentParser` of the interface. """
+    parser = argparse.ArgumentParser(
+        prog='python -m cerberus',
+        description='Validates and normalizes the records of NDJSON-, JSON- '
+                    'or CSV-files, which may be compressed with gzip, bz2 or '
+                    'xz.')
+    parser.add_argument('schema', help='a JSON file with the schema')
+    parser.add_argument('inputs', nargs='+', metavar='input',
+                        help='the files to validate')
+    parser.add_argument('--format', choices=FORMATS,
+                        help='the format of the inputs, by default detected '
+                             'from their extensions')
+    parser.add_argument('--delimiter', default=',',
+                        help='the delimiter of CSV-files')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='the number of validating processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='the number of records that are processed at '
+                             'once')
+    parser.add_argument('--valid', metavar='PATH',
+                        help='a file for the valid, normalized documents')
+    parser.add_argument('--rejected', metavar='PATH',
+                        help='a file for the records of invalid documents')
+    parser.add_argument('--errors', metavar='PATH',
+                        help='a file for the errors of invalid documents')
+    parser.add_argument('--allow-unknown', action='store_true',
+                        help='allow fields that are not in the schema')
+    parser.add_argument('--purge-unknown', action='store_true',
+                        help='remove fields that are not in the schema')
+    parser.add_argument('--update', action='store_true',
+                        help="don't require the required fields")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--no-normalize', action='store_true',
+                      help='validate the documents without normalizing them')
+    mode.add_argument('--normalize-only', action='store_true',
+                      help='normalize the documents without validating them')
+    parser.add_argument('--stats', action='store_true',
+                        help='print a summary with the throughput and the '
+                             'errors by code to stderr')
+    return parser
+
+
+def main(argv=None):
+    """ Runs the command-line interface and returns ``0`` if all documents
+    are valid, ``1`` otherwise. """
+    options = parser().parse_args(argv)
+    if options.jobs < 1 or options.chunk_size < 1:
+        parser().error('--jobs and --chunk-size must be positive')
+    validator = _CodingValidator(load_schema(options.schema),
+                                 allow_unknown=options.allow_unknown,
+                                 purge_unknown=options.purge_unknown)
+
+    sinks = {}
+    statistics = Statistics()
+    try:
+        for name in ('valid', 'rejected', 'errors'):
+            path = getattr(options, name)
+            sinks[name] = None if path is None else \
+                io.open(path, 'w', encoding='utf-8')
+        for path in options.inputs:
+            try:
+                format = options.format or detect_format(path)
+            except ValueError as e:
+                parser().error(str(e))
+            validate_file(validator, path, format, sinks, options,
+                          statistics)
+    finally:
+        for sink in sinks.values():
+            if sink is not None:
+                sink.close()
+
+    if options.stats:
+        statistics.report(sys.stderr)
+    return 1 if statistics.invalid else 0
@@ -0,0 +1,351 @@
+"""
+    A long-running validation server that listens on a Unix domain socket,
+    and its client.
+
+    Schemas are registered under names and kept prepared in memory, so that
+    short-lived processes and non-Python components can have batches of
+    documents validated without preparing a validator for each call.
+
+    Each message is a JSON object that is encoded as UTF-8 and prefixed with
+    its length as 4-byte unsigned integer in network byte order. A request
+    has an ``op``:
+
+    - ``register``: Prepares the ``schema`` under the ``name``. The options
+      ``allow_unknown`` and ``purge_unknown`` are optional.
+    - ``validate``: Validates the ``documents`` with the schema named
+      ``schema``. ``update`` and ``normalize`` are optional. The response's
+      ``results`` have the ``valid``-state, the normalized ``document`` and
+      the ``errors`` as formatted by :class:`~cerberus.errors.
+      BasicErrorHandler` for each document.
+    - ``schemas``: Responds with the names of the registered ``schemas``.
+
+    Failed requests are answered with an ``error`` that has a ``type`` and a
+    ``message``.
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import threading
+
+try:
+    import socketserver
+except ImportError:  # Python 2
+    import SocketServer as socketserver
+
+from .batch import ValidationResult, ValidatorPayload, chunks, validate_chunk
+from .cerberus import DocumentError, SchemaError, Validator
+
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_MESSAGE_SIZE = 1 << 28
+
+_header = struct.Struct('>I')
+
+# the exceptions that are passed from the server to the client
+_EXCEPTIONS = dict((x.__name__, x) for x in
+                   (DocumentError, KeyError, SchemaError, ValueError))
+
+
+def send_message(connection, message):
+    """ Sends a JSON-serializable object over a socket. Values that JSON
+    doesn't support are represented as strings. """
+    data = json.dumps(message, default=str).encode('utf-8')
+    connection.sendall(_header.pack(len(data)) + data)
+
+
+def receive_message(connection):
+    """ Receives an object from a socket, or ``None`` if the peer closed the
+    connection before a message. """
+    header = _receive(connection, _header.size)
+    if header is None:
+        return None
+    size = _header.unpack(header)[0]
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError('The message of {0} bytes exceeds the limit of {1} '
+                         'bytes.'.format(size, MAX_MESSAGE_SIZE))
+    data = _receive(connection, size)
+    if data is None:
+        raise EOFError('The connection was closed within a message.')
+    return json.loads(data.decode('utf-8'))
+
+
+def _receive(connection, size):
+    parts, remaining = [], size
+    while remaining:
+        part = connection.recv(min(remaining, 1 << 20))
+        if not part:
+            if remaining == size:
+                return None
+            raise EOFError('The connection was closed within a message.')
+        parts.append(part)
+        remaining -= len(part)
+    return b''.join(parts)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """ Answers the requests of a connection until it's closed. """
+
+    def handle(self):
+        while True:
+            try:
+                request = receive_message(self.request)
+            except (EOFError, ValueError, socket.error):
+                return
+            if request is None:
+                return
+            try:
+                response = self.server.daemon.respond(request)
+            except Exception as e:
+                response = {'error': {'type': type(e).__name__,
+                                      'message': _message(e)}}
+            send_message(self.request, response)
+
+
+def _message(exception):
+    # a KeyError's str() is the repr of its argument
+    if len(exception.args) == 1:
+        return u'{0}'.format(exception.args[0])
+    return str(exception)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ValidationDaemon(object):
+    """ Serves the validation of documents on a Unix domain socket. Batches of
+    documents are split into chunks that are validated by a pool of worker
+    processes, which unpickle each registered validator only once.
+
+    :param path: The path of the socket. A stale socket file is replaced.
+    :param schemas: An optional mapping of names to schemas to register.
+    :param workers: The number of worker processes. Defaults to the number
+                    of CPUs. With ``0`` the documents are validated in the
+                    threads that serve the connections.
+    :param chunk_size: The number of documents that a worker validates at
+                       once.
+    :param validator_class: The :class:`~cerberus.Validator` (or subclass) to
+                            prepare schemas with.
+
+    .. versionadded:: 0.10
+    """
+
+    def __init__(self, path, schemas=None, workers=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, validator_class=Validator):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.validator_class = validator_class
+        self.payloads = {}
+        self.lock = threading.Lock()
+        for name, schema in (schemas or {}).items():
+            self.register(name, schema)
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(workers) if workers else None
+
+        _remove_stale_socket(path)
+        self.server = _UnixServer(path, _RequestHandler)
+        self.server.daemon = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def serve_forever(self):
+        """ Handles requests until :meth:`shutdown` is called. """
+        self.server.serve_forever()
+
+    def shutdown(self):
+        """ Stops :meth:`serve_forever` from another thread. """
+        self.server.shutdown()
+
+    def close(self):
+        """ Closes the socket and stops the worker processes. """
+        self.server.server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+    def register(self, name, schema, allow_unknown=False,
+                 purge_unknown=False):
+        """ Prepares a schema and keeps it under a name, replacing a previous
+        one. Raises :class:`~cerberus.SchemaError` if it's invalid. """
+        validator = self.validator_class(schema, allow_unknown=allow_unknown,
+                                         purge_unknown=purge_unknown)
+        with self.lock:
+            self.payloads[name] = ValidatorPayload(validator)
+
+    def validate(self, name, documents, update=False, normalize=True):
+        """ Validates documents with a registered schema and returns a list of
+        :class:`~cerberus.batch.ValidationResult` s. """
+        with self.lock:
+            if name not in self.payloads:
+                raise KeyError('Unknown schema: {0}'.format(name))
+            payload = self.payloads[name]
+
+        parts = []
+        for offset, chunk in zip(range(0, len(documents), self.chunk_size),
+                                 chunks(documents, self.chunk_size)):
+            arguments = (payload, offset, chunk, update, normalize)
+            if self.pool is None:
+                parts.append(validate_chunk(*arguments))
+            else:
+                parts.append(self.pool.apply_async(validate_chunk,
+                                                   arguments))
+        if self.pool is not None:
+            parts = [x.get() for x in parts]
+        return [result for part in parts for result in part]
+
+    def respond(self, request):
+        """ Returns the response to a request. """
+        operation = request.get('op')
+        if operation == 'register':
+            self.register(request['name'], request['schema'],
+                          request.get('allow_unknown', False),
+                          request.get('purge_unknown', False))
+            return {'ok': True}
+        if operation == 'validate':
+            documents = request['documents']
+            if not isinstance(documents, list):
+                raise ValueError('documents must be a list.')
+            results = self.validate(request['schema'], documents,
+                                    request.get('update', False),
+                                    request.get('normalize', True))
+            return {'results': [{'valid': x.valid, 'document': x.document,
+                                 'errors': x.errors} for x in results]}
+        if operation == 'schemas':
+            with self.lock:
+                return {'schemas': sorted(self.payloads)}
+        raise ValueError('Unknown operation: {0}'.format(operation))
+
+
+def _remove_stale_socket(path):
+    """ Removes a socket file that no server listens on anymore. """
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except socket.error:
+        os.remove(path)
+    else:
+        raise ValueError('A server already listens on {0}.'.format(path))
+    finally:
+        probe.close()
+
+
+class ValidationClient(object):
+    """ A connection to a :class:`ValidationDaemon`. It's opened with the
+    first request and can be used as context manager. Errors of the server
+    are raised as :class:`~cerberus.SchemaError`,
+    :class:`~cerberus.DocumentError`, :class:`KeyError` or
+    :class:`ValueError`, others as :class:`RuntimeError`.
+
+    :param path: The path of the daemon's socket.
+    :param timeout: An optional timeout in seconds for the socket operations.
+
+    .. versionadded:: 0.10
+    """
+
+    def __init__(self, path, timeout=None):
+        self.path = path
+        self.timeout = timeout
+        self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def request(self, request):
+        """ Sends a request and returns the response. """
+        if self.connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            connection.connect(self.path)
+            self.connection = connection
+        try:
+            send_message(self.connection, request)
+            response = receive_message(self.connection)
+        except Exception:
+            self.close()
+            raise
+        if response is None:
+            self.close()
+            raise EOFError('The daemon closed the connection.')
+        if 'error' in response:
+            error = response['error']
+            raise _EXCEPTIONS.get(error['type'], RuntimeError)(
+                error['message'])
+        return response
+
+    def register(self, name, schema, allow_unknown=False,
+                 purge_unknown=False):
+        """ Registers a schema under a name. """
+        self.request({'op': 'register', 'name': name, 'schema': schema,
+                      'allow_unknown': allow_unknown,
+                      'purge_unknown': purge_unknown})
+
+    def schemas(self):
+        """ Returns the names of the registered schemas. """
+        return self.request({'op': 'schemas'})['schemas']
+
+    def validate(self, name, documents, update=False, normalize=True):
+        """ Validates a list of documents with a registered schema and returns
+        a list of :class:`~cerberus.batch.ValidationResult` s. """
+        response = self.request({'op': 'validate', 'schema': name,
+                                 'documents': documents, 'update': update,
+                                 'normalize': normalize})
+        return [ValidationResult(i, x['valid'], x['document'], x['errors'])
+                for i, x in enumerate(response['results'])]
+
+
+def main(argv=None):
+    """ Runs a daemon until it's interrupted. """
+    import argparse
+    from .cli import load_schema
+    parser = argparse.ArgumentParser(
+        prog='python -m cerberus.daemon',
+        description='Serves the validation of documents on a Unix domain '
+                    'socket.')
+    parser.add_argument('path', help='the path of the socket')
+    parser.add_argument('--schema', action='append', default=[],
+                        metavar='NAME=PATH',
+                        help='registers the schema of a JSON file')
+    parser.add_argument('--workers', type=int,
+                        help='the number of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='the number of documents a worker validates at '
+                             'once')
+    options = parser.parse_args(argv)
+    schemas = {}
+    for definition in options.schema:
+        name, _, path = definition.partition('=')
+        if not path:
+            parser.error('--schema expects NAME=PATH')
+        schemas[name] = load_schema(path)
+
+    with ValidationDaemon(options.path, schemas, options.workers,
+                          options.chunk_size) as daemon:
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
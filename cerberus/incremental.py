@@ -0,0 +1,589 @@
+"""
+    Incremental validation of a single document that is too large to be held
+    in memory, e.g. a JSON file with a huge array.
+
+    The document is fed as a series of events, either directly or as raw JSON
+    that is tokenized incrementally. Sequences that are validated against a
+    ``schema``-rule are validated item by item as they arrive and are then
+    replaced by a stand-in that carries the items' errors. All other values
+    are collected and validated when the containing document is complete.
+
+    The items of a huge JSON array of documents can also be parsed one by one
+    with :func:`iter_json_items`.
+"""
+
+from collections import Mapping, Sequence
+import codecs
+import json
+from json.decoder import scanstring
+import re
+
+from . import errors
+from .cerberus import DocumentError, Validator
+from .platform import _str_type
+
+
+class _StreamedSequence(Sequence):
+    """ Stands in for a sequence whose items were validated and discarded.
+    """
+
+    def __init__(self, length, errors):
+        self.length = length
+        self.errors = errors
+
+    def __getitem__(self, index):
+        raise IndexError('The items of a streamed sequence are discarded.')
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return '<streamed sequence of {0} items>'.format(self.length)
+
+
+class _StreamingRules(object):
+    """ Rule-methods of :class:`~cerberus.Validator` that handle stand-ins of
+    streamed sequences. """
+
+    def _validate_schema(self, schema, field, value):
+        if not isinstance(value, _StreamedSequence):
+            return super(_StreamingRules, self)._validate_schema(
+                schema, field, value)
+        if value.errors:
+            self._drop_nodes_from_errorpaths(value.errors, [], [2])
+            self._error(field, errors.SEQUENCE_SCHEMA, value.errors)
+
+
+_streaming_classes = dict()
+
+
+def _streaming_class(cls):
+    """ Returns the subclass of ``cls`` that handles streamed sequences,
+    created once per class. """
+    if cls not in _streaming_classes:
+        namespace = {'__module__': cls.__module__,
+                     '__qualname__': getattr(cls, '__qualname__',
+                                             cls.__name__)}
+        _streaming_classes[cls] = \
+            type(cls.__name__, (_StreamingRules, cls), namespace)
+    return _streaming_classes[cls]
+
+
+# rules that don't need the items of a sequence or the fields of a mapping
+# besides those that are validated against the 'schema'-rule
+_SEQUENCE_RULES = ('dependencies', 'excludes', 'maxlength', 'minlength',
+                   'nullable', 'readonly', 'required', 'schema', 'type')
+_MAPPING_RULES = ('allow_unknown', 'dependencies', 'excludes', 'nullable',
+                  'readonly', 'required', 'schema', 'type')
+
+
+def _is_builtin(validator, method):
+    for cls in type(validator).__mro__:
+        if method in vars(cls):
+            return cls in (Validator, _StreamingRules)
+    return False
+
+
+def _is_streamable(validator, rules, supported_rules):
+    """ Tests whether a container with the given rules can be validated
+    incrementally against its ``schema``-rule. """
+    if not isinstance(rules.get('schema'), Mapping):
+        return False
+    for rule in rules:
+        if rule in validator.normalization_rules:
+            continue
+        if rule not in supported_rules:
+            return False
+        method = '_validate_' + rule
+        if hasattr(validator, method) and not _is_builtin(validator, method):
+            return False
+    types = rules.get('type', ())
+    if isinstance(types, _str_type):
+        types = (types,)
+    return all(_is_builtin(validator, '_validate_type_' + x) for x in types)
+
+
+def _child_validator(validator, **kwargs):
+    child = validator._get_child_validator(**kwargs)
+    child.root_document = None
+    return child
+
+
+def _set_index(_errors, dp_depth, sp_depth, index):
+    """ Sets the index of a sequence's item in the paths of errors. """
+    for error in _errors:
+        path = error.document_path
+        if len(path) > dp_depth:
+            error.document_path = path[:dp_depth] + (index,) + \
+                path[dp_depth + 1:]
+        path = error.schema_path
+        if len(path) > sp_depth:
+            error.schema_path = path[:sp_depth] + (index,) + \
+                path[sp_depth + 1:]
+        if error.child_errors:
+            _set_index(error.child_errors, dp_depth, sp_depth, index)
+
+
+class _MappingFrame(object):
+    """ Collects the fields of a mapping. If a ``validator`` is given, it is
+    equivalent to the one that will validate the mapping's fields. """
+
+    def __init__(self, validator=None):
+        self.validator = validator
+        self.mapping = dict()
+        self.key = None
+
+    def add(self, value):
+        if self.key is None:
+            raise DocumentError('A value in a mapping misses its key.')
+        self.mapping[self.key] = value
+        self.key = None
+
+    def context(self):
+        """ Returns the validator and the rules of the current field, or
+        ``None``. """
+        validator = self.validator
+        if validator is None:
+            return None
+        if self.key in validator.schema:
+            return validator, validator.schema[self.key]
+        if isinstance(validator.allow_unknown, Mapping):
+            return (_child_validator(validator, schema_crumb='allow_unknown',
+                                     schema={self.key:
+                                             validator.allow_unknown}),
+                    validator.allow_unknown)
+        return None
+
+    def result(self):
+        return self.mapping
+
+
+class _SequenceFrame(object):
+    """ Collects the items of a sequence. """
+
+    def __init__(self):
+        self.sequence = []
+
+    def add(self, value):
+        self.sequence.append(value)
+
+    def context(self):
+        return None
+
+    def result(self):
+        return self.sequence
+
+
+class _StreamedSequenceFrame(object):
+    """ Validates the items of a sequence as they are completed. The
+    ``validator`` is equivalent to the one that validates the items of the
+    sequence, but it validates only one item at a time as index ``0``. """
+
+    def __init__(self, validator, rules):
+        self.validator = validator
+        self.rules = rules
+        self.length = 0
+        self.errors = []
+
+    def add(self, value):
+        validator = self.validator
+        validator.root_document = None
+        validator.document_error_tree = errors.DocumentErrorTree()
+        validator.schema_error_tree = errors.SchemaErrorTree()
+        if not validator.validate({0: value}, normalize=False):
+            _set_index(validator._errors, len(validator.document_path),
+                       len(validator.schema_path), self.length)
+            self.errors.extend(validator._errors)
+        self.length += 1
+
+    def context(self):
+        return self.validator, self.rules
+
+    def result(self):
+        return _StreamedSequence(self.length, self.errors)
+
+
+class IncrementalValidator(object):
+    """ Validates a document that is fed incrementally, either as events or
+    as chunks of JSON, see :meth:`feed`. The result equals that of
+    :meth:`~cerberus.Validator.validate` with disabled normalization.
+
+    Sequences that are validated against a ``schema``-rule are validated
+    item by item and the completed items are discarded, unless the field has
+    other rules than ``dependencies``, ``excludes``, ``maxlength``,
+    ``minlength``, ``nullable``, ``readonly``, ``required`` and ``type`` or
+    the validator overrides any of these. The same applies to the fields of
+    mappings that are validated against a ``schema``-rule, with
+    ``allow_unknown`` instead of the length-rules. All other values are
+    collected until their containing document is complete.
+
+    Errors of discarded values have a stand-in as ``value``. Custom rules
+    can't access the ``root_document`` of the items.
+
+    :param validator: A :class:`~cerberus.Validator` (or subclass) instance.
+                      It is not altered.
+    :param schema: The validation-schema. Defaults to the validator's one.
+    :param update: See :meth:`~cerberus.Validator.validate`.
+
+    .. versionadded:: 0.10
+    """
+
+    def __init__(self, validator, schema=None, update=False):
+        if schema is None:
+            schema = validator.schema.schema
+        self.validator = validator._get_child_validator(schema=schema)
+        # its own child validators are created with the same class
+        self.validator.__class__ = _streaming_class(validator.__class__)
+        self.validator.root_document = self.validator.root_schema = None
+        self.update = update
+        self.document = None
+        self.__stack = []
+        self.__tokenizer = None
+
+    @property
+    def errors(self):
+        """ The errors of the validation as formatted by the validator's
+        error handler. """
+        return self.validator.errors
+
+    def start_map(self):
+        """ Starts a mapping. """
+        context = self.__context()
+        if not self.__stack:
+            validator = self.validator
+        elif context is not None and _is_streamable(context[0], context[1],
+                                                    _MAPPING_RULES):
+            owner, rules = context
+            field = self.__field()
+            validator = _child_validator(
+                owner, document_crumb=field, schema_crumb=(field, 'schema'),
+                schema=rules['schema'],
+                allow_unknown=rules.get('allow_unknown', owner.allow_unknown))
+        else:
+            validator = None
+        self.__stack.append(_MappingFrame(validator))
+
+    def map_key(self, key):
+        """ Sets the key of the following value in the current mapping. """
+        self.__stack[-1].key = key
+
+    def end_map(self):
+        """ Ends the current mapping. """
+        self.__end()
+
+    def start_array(self):
+        """ Starts a sequence. """
+        if not self.__stack:
+            raise DocumentError(errors.DOCUMENT_FORMAT.format('[...]'))
+        context = self.__context()
+        if context is not None and _is_streamable(context[0], context[1],
+                                                  _SEQUENCE_RULES):
+            owner, rules = context
+            field = self.__field()
+            validator = _child_validator(
+                owner, document_crumb=field, schema_crumb=(field, 'schema'),
+                schema={0: rules['schema']}, allow_unknown=owner.allow_unknown)
+            self.__stack.append(_StreamedSequenceFrame(validator,
+                                                       rules['schema']))
+        else:
+            self.__stack.append(_SequenceFrame())
+
+    def end_array(self):
+        """ Ends the current sequence. """
+        self.__end()
+
+    def value(self, value):
+        """ Adds a value to the current mapping or sequence. """
+        if not self.__stack:
+            raise DocumentError(errors.DOCUMENT_FORMAT.format(value))
+        self.__stack[-1].add(value)
+
+    def feed(self, data):
+        """ Feeds a chunk of a JSON document as ``bytes`` encoded with UTF-8
+        or as text. """
+        if self.__tokenizer is None:
+            self.__tokenizer = _Tokenizer(self)
+        self.__tokenizer.feed(data)
+
+    def close(self):
+        """ Validates what remains of the fed document.
+
+        :return: ``True`` if the document is valid, otherwise ``False``. The
+                 errors are available as :attr:`errors`.
+        """
+        if self.__tokenizer is not None:
+            self.__tokenizer.close()
+        if self.__stack or self.document is None:
+            raise DocumentError(errors.DOCUMENT_MISSING)
+        return self.validator.validate(self.document, update=self.update,
+                                       normalize=False)
+
+    def __context(self):
+        if self.__stack:
+            return self.__stack[-1].context()
+
+    def __field(self):
+        frame = self.__stack[-1]
+        if isinstance(frame, _MappingFrame):
+            return frame.key
+        return frame.length
+
+    def __end(self):
+        value = self.__stack.pop().result()
+        if self.__stack:
+            self.__stack[-1].add(value)
+        else:
+            self.document = value
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?')
+_NUMBER_CHARS = re.compile(r'[-+.0-9eE]*')
+_LITERALS = (('true', True), ('false', False), ('null', None))
+
+# the states of the tokenizer are named after the expected tokens
+_VALUE, _VALUE_OR_END, _KEY, _KEY_OR_END, _COLON, _SEPARATOR, _DONE = range(7)
+
+
+class _Tokenizer(object):
+    """ Translates chunks of JSON into the events of an
+    :class:`IncrementalValidator`. Only an incomplete token at the end of a
+    chunk is buffered. """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = u''
+        self.offset = 0
+        self.containers = []
+        self.state = _VALUE
+
+    def feed(self, data, final=False):
+        if isinstance(data, bytes):
+            data = self.decoder.decode(data, final)
+        self.buffer += data
+        position = self.__scan(self.buffer, final)
+        self.buffer = self.buffer[position:]
+        self.offset += position
+
+    def close(self):
+        self.feed(b'', final=True)
+        if self.state != _DONE:
+            self.__fail(len(self.buffer), 'unexpected end of data')
+
+    def __scan(self, text, final):
+        position = 0
+        while True:
+            position = _WHITESPACE.match(text, position).end()
+            if position == len(text):
+                return position
+            char = text[position]
+            state = self.state
+
+            if state == _DONE:
+                self.__fail(position, 'extra data')
+
+            elif state in (_KEY, _KEY_OR_END):
+                if char == '}' and state == _KEY_OR_END:
+                    self.__end(char, position)
+                    position += 1
+                    continue
+                if char != '"':
+                    self.__fail(position, 'expected a key')
+                token = self.__string(text, position, final)
+                if token is None:
+                    return position
+                key, position = token
+                self.handler.map_key(key)
+                self.state = _COLON
+
+            elif state == _COLON:
+                if char != ':':
+                    self.__fail(position, "expected ':'")
+                position += 1
+                self.state = _VALUE
+
+            elif state == _SEPARATOR:
+                if char == ',':
+                    position += 1
+                    if self.containers[-1] == '{':
+                        self.state = _KEY
+                    else:
+                        self.state = _VALUE
+                else:
+                    self.__end(char, position)
+                    position += 1
+
+            elif char == ']' and state == _VALUE_OR_END:
+                self.__end(char, position)
+                position += 1
+
+            elif char == '{':
+                self.containers.append(char)
+                self.handler.start_map()
+                self.state = _KEY_OR_END
+                position += 1
+
+            elif char == '[':
+                self.containers.append(char)
+                self.handler.start_array()
+                self.state = _VALUE_OR_END
+                position += 1
+
+            else:
+                if char == '"':
+                    token = self.__string(text, position, final)
+                else:
+                    token = self.__scalar(text, position, final)
+                if token is None:
+                    return position
+                value, position = token
+                self.handler.value(value)
+                self.__after_value()
+
+    def __after_value(self):
+        self.state = _SEPARATOR if self.containers else _DONE
+
+    def __end(self, char, position):
+        closing = {'{': '}', '[': ']'}[self.containers[-1]]
+        if char != closing:
+            self.__fail(position, "expected ',' or '{0}'".format(closing))
+        if self.containers.pop() == '{':
+            self.handler.end_map()
+        else:
+            self.handler.end_array()
+        self.__after_value()
+
+    def __string(self, text, position, final):
+        if _STRING.match(text, position) is None:
+            if final:
+                self.__fail(position, 'unterminated string')
+            return None
+        try:
+            return scanstring(text, position + 1)
+        except ValueError as e:
+            self.__fail(position, e)
+
+    def __scalar(self, text, position, final):
+        end = _NUMBER_CHARS.match(text, position).end()
+        if end > position:
+            if end == len(text) and not final:
+                return None
+            match = _NUMBER.match(text, position)
+            if match is None or match.end() != end:
+                self.__fail(position, 'invalid number')
+            if match.group(1) or match.group(2):
+                return float(match.group()), match.end()
+            return int(match.group()), match.end()
+        for literal, value in _LITERALS:
+            if text.startswith(literal, position):
+                return value, position + len(literal)
+            if not final and literal.startswith(text[position:]):
+                return None
+        self.__fail(position, 'expected a value')
+
+    def __fail(self, position, message):
+        raise DocumentError('Invalid JSON at character {0}: {1}'
+                            .format(self.offset + position, message))
+
+
+class _JSONItems(object):
+    """ Reads the items of a JSON array from a file object. Each item is
+    parsed by the :mod:`json` module as soon as it's completely buffered. """
+
+    def __init__(self, stream, buffer_size):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.parse = json.JSONDecoder().raw_decode
+        self.text = u''
+        self.position = 0
+        self.offset = 0
+        self.exhausted = False
+
+    def __iter__(self):
+        if self.__next_char() != '[':
+            # a single document can't be split
+            while self.__read(self.buffer_size):
+                pass
+            try:
+                yield json.loads(self.text[self.position:])
+            except ValueError as e:
+                self.__fail(self.position, e)
+            return
+
+        self.position += 1
+        if self.__next_char() == ']':
+            self.position += 1
+        else:
+            while True:
+                yield self.__item()
+                char = self.__next_char()
+                self.position += 1
+                if char == ']':
+                    break
+                if char != ',':
+                    self.__fail(self.position - 1, "expected ',' or ']'")
+        if self.__next_char() is not None:
+            self.__fail(self.position, 'extra data')
+
+    def __read(self, size):
+        """ Appends a block to the buffered text and drops what was consumed.
+        Returns ``False`` if the stream is exhausted. """
+        if self.exhausted:
+            return False
+        data = self.stream.read(size)
+        self.exhausted = not data
+        if isinstance(data, bytes):
+            data = self.decoder.decode(data, self.exhausted)
+        self.text = self.text[self.position:] + data
+        self.offset += self.position
+        self.position = 0
+        return not self.exhausted
+
+    def __next_char(self):
+        """ Skips whitespace and returns the next character, or ``None`` at
+        the end of the stream. """
+        while True:
+            self.position = _WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.__read(self.buffer_size):
+                return None
+
+    def __item(self):
+        if self.__next_char() is None:
+            self.__fail(self.position, 'unexpected end of data')
+        size = self.buffer_size
+        while True:
+            try:
+                value, end = self.parse(self.text, self.position)
+            except ValueError as e:
+                error, end = e, None
+            # a value at the end of the buffer may continue, e.g. a number
+            if end is not None and (self.exhausted or _WHITESPACE.match(
+                    self.text, end).end() < len(self.text)):
+                self.position = end
+                return value
+            if not self.__read(size):
+                if end is None:
+                    self.__fail(self.position, error)
+            # large items are read in growing blocks to parse them less often
+            size = max(size, len(self.text))
+
+    def __fail(self, position, message):
+        raise DocumentError('Invalid JSON at character {0}: {1}'
+                            .format(self.offset + position, message))
+
+
+def iter_json_items(stream, buffer_size=1 << 20):
+    """ Yields the items of a JSON array, or a single JSON document, from a
+    binary or text file object that is read in blocks of ``buffer_size``.
+    Only the items in the current block are held in memory, a single document
+    is loaded completely. Raises :class:`~cerberus.DocumentError` for invalid
+    JSON.
+
+    .. versionadded:: 0.10
+    """
+    return iter(_JSONItems(stream, buffer_size))
@@ -0,0 +1,276 @@
+"""
+    Pipeline-parallel processing of documents, where parsing, validation and
+    serialization run in separate worker processes.
+
+    The stages are connected by bounded queues, thus a slow stage throttles
+    its predecessors. Chunks of documents are numbered when they enter the
+    pipeline and the results are put back in order before they are yielded.
+"""
+
+from itertools import islice
+import json
+import multiprocessing
+import threading
+import time
+import traceback
+
+from .batch import ValidationResult
+from .cerberus import DocumentError
+from .streaming import dump_json_line
+
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+def parse_chunk(parse, offset, items):
+    """ Parses the items of a chunk and returns a list of tuples with the
+    index, the document and an error message if parsing failed. """
+    parsed = []
+    for index, item in enumerate(items, offset):
+        try:
+            parsed.append((index, parse(item), None))
+        except ValueError as e:
+            parsed.append((index, None, 'invalid input: {0}'.format(e)))
+    return parsed
+
+
+def validate_chunk(validator, method, update, normalize, offset, items):
+    """ Validates or normalizes the parsed documents of a chunk and returns a
+    list of :class:`~cerberus.batch.ValidationResult` s. """
+    results = []
+    for index, document, error in items:
+        if error is not None:
+            results.append(ValidationResult(index, False, None, error))
+            continue
+        try:
+            if method == 'normalized':
+                processed = validator.normalized(document)
+            else:
+                processed = validator.validated(document, update=update,
+                                                normalize=normalize)
+        except DocumentError as e:
+            results.append(ValidationResult(index, False, None, str(e)))
+            continue
+        if processed is None:
+            results.append(ValidationResult(index, False, None,
+                                            validator.errors))
+        else:
+            results.append(ValidationResult(index, True, processed, {}))
+    return results
+
+
+def serialize_chunk(serialize, offset, results):
+    """ Replaces the documents of valid results in a chunk with their
+    serialization. """
+    return [x._replace(document=serialize(x.document)) if x.valid else x
+            for x in results]
+
+
+class _Failure(object):
+    """ Takes the place of a chunk whose processing raised an exception. """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.traceback = traceback.format_exc()
+
+
+def _work(stage, function, arguments, inbox, outbox):
+    """ The loop of a stage's worker process. """
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        number, offset, payload, statistics = item
+        if not isinstance(payload, _Failure):
+            start = _clock()
+            try:
+                payload = function(*(arguments + (offset, payload)))
+            except Exception:
+                payload = _Failure(stage)
+            else:
+                statistics = statistics + \
+                    ((stage, _clock() - start, len(payload)),)
+        outbox.put((number, offset, payload, statistics))
+
+
+class Pipeline(object):
+    """ Processes documents in three stages that run in worker processes:
+    ``parse`` decodes the input items, ``validate`` processes the documents
+    with :meth:`~cerberus.Validator.validated` or
+    :meth:`~cerberus.Validator.normalized` and ``serialize`` encodes the
+    valid documents.
+
+    The validator is pickled to the workers once, thus its class, schema and
+    the stages' functions must be picklable.
+
+    :param validator: The :class:`~cerberus.Validator` (or subclass) instance
+                      to process with.
+    :param parse: A callable that returns a document from an input item.
+                  Defaults to :func:`json.loads`. If ``None``, the input items
+                  are the documents and the stage is omitted.
+    :param serialize: A callable that returns the serialization of a
+                      processed document. Defaults to
+                      :func:`~cerberus.streaming.dump_json_line`. If
+                      ``None``, the stage is omitted.
+    :param parsers: The number of worker processes for parsing.
+    :param validators: The number of worker processes for validation.
+    :param serializers: The number of worker processes for serialization.
+    :param chunk_size: The number of items that are passed between the stages
+                       at once.
+    :param queue_size: The number of chunks that can be queued before each
+                       stage.
+    :param method: ``'validated'`` or ``'normalized'``.
+    :param update: See :meth:`~cerberus.Validator.validate`.
+    :param normalize: See :meth:`~cerberus.Validator.validate`.
+
+    .. versionadded:: 0.10
+    """
+
+    def __init__(self, validator, parse=json.loads, serialize=dump_json_line,
+                 parsers=1, validators=1, serializers=1, chunk_size=100,
+                 queue_size=16, method='validated', update=False,
+                 normalize=True):
+        if method not in ('validated', 'normalized'):
+            raise ValueError("method must be 'validated' or 'normalized'.")
+        if validators < 1 or (serialize is not None and serializers < 1):
+            raise ValueError('The validate- and serialize-stages need at '
+                             'least one worker process.')
+        self.stages = []
+        if parse is not None:
+            self.stages.append(('parse', parse_chunk, (parse,), parsers))
+        else:
+            self.stages.append(('parse', parse_chunk, (_identity,), 0))
+        self.stages.append(('validate', validate_chunk,
+                            (validator, method, update, normalize),
+                            validators))
+        if serialize is not None:
+            self.stages.append(('serialize', serialize_chunk, (serialize,),
+                                serializers))
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.statistics = None
+
+    def run(self, items):
+        """ Processes items and yields a :class:`~cerberus.batch.
+        ValidationResult` for each in the order of the input, with its
+        position as ``index``. The ``document`` of a valid result is
+        serialized, if the ``serialize``-stage is enabled. Afterwards the
+        :attr:`statistics` are available.
+
+        :param items: An iterable of input items, e.g. lines of JSON.
+        """
+        queues = [multiprocessing.Queue(self.queue_size)]
+        workers = []
+        for stage, function, arguments, count in self.stages:
+            outbox = multiprocessing.Queue(self.queue_size)
+            if count:
+                workers.append([multiprocessing.Process(
+                    target=_work,
+                    args=(stage, function, arguments, queues[-1], outbox))
+                    for _ in range(count)])
+            else:  # the parse-stage runs in the feeder
+                workers.append([])
+                outbox = queues[-1]
+            queues.append(outbox)
+        for process in (x for stage in workers for x in stage):
+            process.daemon = True
+            process.start()
+
+        start = _clock()
+        failures = []
+        feeder = threading.Thread(target=self.__feed,
+                                  args=(items, queues, workers, failures))
+        feeder.daemon = True
+        feeder.start()
+
+        collected = []
+        finished = False
+        try:
+            pending = dict()
+            expected = 0
+            while True:
+                item = queues[-1].get()
+                if item is None:
+                    break
+                pending[item[0]] = item
+                while expected in pending:
+                    number, offset, payload, statistics = \
+                        pending.pop(expected)
+                    if isinstance(payload, _Failure):
+                        raise RuntimeError(
+                            'The {0} stage failed:\n{1}'
+                            .format(payload.stage, payload.traceback))
+                    collected.append(statistics)
+                    for result in payload:
+                        yield result
+                    expected += 1
+            if failures:
+                raise failures[0]
+            if pending or any(x.exitcode for stage in workers
+                              for x in stage):
+                raise RuntimeError('A worker process exited unexpectedly.')
+            feeder.join()
+            finished = True
+        finally:
+            for process in (x for stage in workers for x in stage):
+                if process.is_alive():
+                    process.terminate()
+            for queue in queues:
+                if finished:
+                    queue.close()
+                    queue.join_thread()
+                else:  # the feeder may still be blocked
+                    queue.cancel_join_thread()
+            self.statistics = self.__summarize(collected, _clock() - start)
+
+    def __feed(self, items, queues, workers, failures):
+        """ Puts the chunks of the input into the first queue and shuts the
+        stages down in order when the input is exhausted. """
+        try:
+            iterator = iter(items)
+            offset = number = 0
+            stage, function, arguments, count = self.stages[0]
+            while True:
+                chunk = list(islice(iterator, self.chunk_size))
+                if not chunk:
+                    break
+                if count:
+                    statistics = ()
+                else:
+                    start = _clock()
+                    chunk = function(*(arguments + (offset, chunk)))
+                    statistics = ((stage, _clock() - start, len(chunk)),)
+                queues[0].put((number, offset, chunk, statistics))
+                offset += len(chunk)
+                number += 1
+
+            for i, stage_workers in enumerate(workers):
+                for _ in stage_workers:
+                    queues[i].put(None)
+                for process in stage_workers:
+                    process.join()
+        except Exception as e:
+            failures.append(e)
+        finally:
+            queues[-1].put(None)
+
+    def __summarize(self, collected, duration):
+        summary = dict()
+        for stage, function, arguments, count in self.stages:
+            summary[stage] = {'workers': count, 'documents': 0,
+                              'seconds': 0.0}
+        for statistics in collected:
+            for stage, seconds, documents in statistics:
+                summary[stage]['seconds'] += seconds
+                summary[stage]['documents'] += documents
+        for stage in summary.values():
+            # the throughput a stage could sustain with its workers
+            stage['throughput'] = stage['documents'] * \
+                max(stage['workers'], 1) / max(stage['seconds'], 1e-9)
+        summary['total'] = {'documents': summary['validate']['documents'],
+                            'seconds': duration}
+        return summary
+
+
+def _identity(item):
+    return item
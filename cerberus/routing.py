@@ -0,0 +1,101 @@
+"""
+    Validation of mixed documents with one of several schemas, which is
+    picked by the value of a discriminating field.
+"""
+
+from collections import Mapping
+
+from .cerberus import Validator
+
+
+class Router(object):
+    """ Validates each document with the validator that is registered for
+    the value of its discriminator field, which is looked up in a dictionary
+    regardless of the number of schemas. It can be used like a
+    :class:`~cerberus.Validator` for :mod:`~cerberus.batch`-,
+    :mod:`~cerberus.streaming`- and :mod:`~cerberus.pipeline`-processing.
+
+    Documents whose discriminator is missing or has no registered value are
+    invalid with the errors of the ``required``- and ``allowed``-rules on the
+    discriminator, unless a ``default`` is given.
+
+    :param discriminator: The name of the discriminator field.
+    :param schemas: A mapping of the discriminator's values to schemas or
+                    :class:`~cerberus.Validator` instances.
+    :param default: An optional schema or validator for the documents that
+                    can't be routed.
+    :param validator_class: The :class:`~cerberus.Validator` (or subclass) to
+                            prepare schemas with.
+    :param kwargs: Further arguments for the validators that are prepared.
+
+    .. versionadded:: 0.10
+    """
+
+    def __init__(self, discriminator, schemas, default=None,
+                 validator_class=Validator, **kwargs):
+        def prepare(schema):
+            if isinstance(schema, Validator):
+                return schema
+            return validator_class(schema, **kwargs)
+
+        self.discriminator = discriminator
+        self.validators = dict((value, prepare(schema))
+                               for value, schema in schemas.items())
+        if default is None:
+            default = validator_class(
+                {discriminator: {'required': True,
+                                 'allowed': list(self.validators)}},
+                allow_unknown=True)
+            self.strict = True
+        else:
+            default = prepare(default)
+            self.strict = False
+        self.default = default
+        self.validator = None
+
+    def route(self, document):
+        """ Returns the validator for a document. """
+        if isinstance(document, Mapping) and self.discriminator in document:
+            try:
+                return self.validators.get(document[self.discriminator],
+                                           self.default)
+            except TypeError:
+                pass
+        return self.default
+
+    def validate(self, document, update=False, normalize=True):
+        """ Validates a document with the validator it's routed to, alike
+        :meth:`cerberus.Validator.validate`. """
+        self.validator = self.route(document)
+        if self.strict and self.validator is self.default:
+            # an update can't omit the discriminator
+            update = False
+        return self.validator.validate(document, update=update,
+                                       normalize=normalize)
+
+    __call__ = validate
+
+    def validated(self, *args, **kwargs):
+        """ Like :meth:`cerberus.Validator.validated`. """
+        self.validate(*args, **kwargs)
+        return None if self.validator._errors else self.validator.document
+
+    def normalized(self, document):
+        """ Like :meth:`cerberus.Validator.normalized`. """
+        self.validator = self.route(document)
+        return self.validator.normalized(document)
+
+    @property
+    def document(self):
+        """ The last processed document. """
+        return None if self.validator is None else self.validator.document
+
+    @property
+    def errors(self):
+        """ The errors of the last processing, see
+        :attr:`cerberus.Validator.errors`. """
+        return {} if self.validator is None else self.validator.errors
+
+    @property
+    def _errors(self):
+        return [] if self.validator is None else self.validator._errors
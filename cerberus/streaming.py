@@ -0,0 +1,627 @@
+"""
+    Validation of streams of documents that are too large to be held in
+    memory, e.g. files with newline-delimited JSON.
+
+    Large files can also be split into byte ranges along an index of their
+    lines that are validated by parallel workers.
+
+    Compressed streams are decompressed in a background thread, so that
+    reading and decompressing overlaps with the validation.
+"""
+
+from array import array
+import bz2
+from collections import deque
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+import zlib
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from .batch import ValidationResult, ValidatorPayload, validate_documents, \
+    worker_validator
+
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MAX_BLOCKS = 8
+DEFAULT_CHECKPOINT_INTERVAL = 10.0
+
+COMPRESSIONS = ((b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'xz'))
+
+log = logging.getLogger('cerberus')
+_clock = getattr(time, 'perf_counter', time.time)
+_replace = getattr(os, 'replace', os.rename)
+
+
+def iter_lines(stream, buffer_size=DEFAULT_BUFFER_SIZE):
+    """ Yields the lines of a binary or text file object without their line
+    endings. The stream is read in blocks of ``buffer_size``. """
+    remainder = stream.read(0)
+    newline = b'\n' if isinstance(remainder, bytes) else u'\n'
+    while True:
+        block = stream.read(buffer_size)
+        if not block:
+            break
+        lines = (remainder + block).split(newline)
+        remainder = lines.pop()
+        for line in lines:
+            yield line
+    if remainder:
+        yield remainder
+
+
+def _decompressor(compression):
+    if compression == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if compression == 'bz2':
+        return bz2.BZ2Decompressor()
+    if compression == 'xz':
+        import lzma
+        return lzma.LZMADecompressor()
+    raise ValueError('Unsupported compression: {0}'.format(compression))
+
+
+def iter_decompressed(stream, compression, buffer_size=DEFAULT_BUFFER_SIZE,
+                      first_block=b''):
+    """ Yields the decompressed blocks of a binary file object. Streams with
+    multiple concatenated members are supported.
+
+    :param compression: ``'gzip'``, ``'bz2'`` or ``'xz'``.
+    :param first_block: Data that was already read from the stream.
+    """
+    decompressor = None
+    data = first_block or stream.read(buffer_size)
+    while data:
+        if decompressor is None:
+            decompressor = _decompressor(compression)
+        yield decompressor.decompress(data)
+        data = decompressor.unused_data
+        if data:  # another member follows
+            decompressor = None
+        else:
+            data = stream.read(buffer_size)
+    if decompressor is not None:
+        if hasattr(decompressor, 'flush'):
+            yield decompressor.flush()
+        if not getattr(decompressor, 'eof', True):
+            raise EOFError('The compressed stream ended unexpectedly.')
+
+
+def _iter_blocks(stream, buffer_size, first_block):
+    block = first_block
+    while block:
+        yield block
+        block = stream.read(buffer_size)
+
+
+class BackgroundReader(object):
+    """ A binary file object that reads blocks of data from an iterable in a
+    background thread. Up to ``max_blocks`` blocks are buffered. Exceptions
+    of the iterable are raised by :meth:`read`.
+    """
+
+    def __init__(self, blocks, max_blocks=DEFAULT_MAX_BLOCKS):
+        self.queue = queue.Queue(max_blocks)
+        self.buffer = b''
+        self.position = 0
+        self.closed = False
+        self.exhausted = False
+        self.thread = threading.Thread(target=self.__produce, args=(blocks,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __produce(self, blocks):
+        try:
+            for block in blocks:
+                if block:
+                    self.__put(block)
+                if self.closed:
+                    return
+        except Exception as e:
+            self.__put(e)
+        self.__put(None)
+
+    def __put(self, item):
+        while not self.closed:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read(self, size=-1):
+        while not self.exhausted and \
+                (size < 0 or len(self.buffer) - self.position < size):
+            block = self.queue.get()
+            if block is None:
+                self.exhausted = True
+            elif isinstance(block, Exception):
+                self.exhausted = True
+                raise block
+            else:
+                self.buffer = self.buffer[self.position:] + block
+                self.position = 0
+        end = len(self.buffer)
+        if size >= 0:
+            end = min(end, self.position + size)
+        data = self.buffer[self.position:end]
+        self.position = end
+        return data
+
+    def close(self):
+        """ Stops the background thread. The source isn't closed. """
+        self.closed = True
+        self.thread.join()
+
+
+def open_compressed(stream, compression='auto',
+                    buffer_size=DEFAULT_BUFFER_SIZE,
+                    max_blocks=DEFAULT_MAX_BLOCKS):
+    """ Returns a :class:`BackgroundReader` that reads and, if necessary,
+    decompresses a binary file object in a background thread. Text streams
+    are returned as they are.
+
+    :param stream: A file object.
+    :param compression: ``'gzip'``, ``'bz2'``, ``'xz'`` or ``None`` for
+                        uncompressed data. With ``'auto'`` it's detected from
+                        the first bytes of the stream.
+    :param buffer_size: The number of bytes to read at once.
+    :param max_blocks: The number of decompressed blocks to buffer.
+
+    .. versionadded:: 0.10
+    """
+    first_block = stream.read(buffer_size)
+    if not isinstance(first_block, bytes):
+        raise ValueError('Only binary streams can be decompressed.')
+    if compression == 'auto':
+        compression = None
+        for magic, name in COMPRESSIONS:
+            if first_block.startswith(magic):
+                compression = name
+    if compression is None:
+        blocks = _iter_blocks(stream, buffer_size, first_block)
+    else:
+        blocks = iter_decompressed(stream, compression, buffer_size,
+                                   first_block)
+    return BackgroundReader(blocks, max_blocks)
+
+
+def dump_json_line(document):
+    """ Serializes a document as line of JSON. Values that are not supported
+    by JSON, e.g. :class:`~datetime.datetime` s, are represented as strings.
+    """
+    line = json.dumps(document, default=str)
+    if isinstance(line, bytes):  # Python 2
+        line = line.decode('utf-8')
+    return line + u'\n'
+
+
+def decode_json_line(line):
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    return json.loads(line)
+
+
+class NDJSONSinks(object):
+    """ Writes the results of a validation to text file objects.
+
+    :param valid: Receives the normalized valid documents as JSON lines.
+    :param invalid: Receives the original lines of invalid documents.
+    :param errors: Receives a JSON line with the ``line`` number and the
+                   ``errors`` of each invalid document.
+    """
+
+    def __init__(self, valid=None, invalid=None, errors=None):
+        self.valid = valid
+        self.invalid = invalid
+        self.errors = errors
+
+    def write(self, result, line):
+        if result.valid:
+            if self.valid is not None:
+                self.valid.write(dump_json_line(result.document))
+            return
+        if self.invalid is not None:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            self.invalid.write(line.rstrip(u'\r') + u'\n')
+        if self.errors is not None:
+            self.errors.write(dump_json_line({'line': result.index,
+                                              'errors': result.errors}))
+
+
+class Checkpoint(object):
+    """ Records the progress of :func:`validate_ndjson` in a JSON file, so
+    that an interrupted validation can be resumed. The file is replaced
+    atomically and written at most every ``interval`` seconds, after a chunk
+    of documents was processed, and once the stream is exhausted.
+
+    If the file exists, the recorded progress is loaded. A validation that is
+    resumed skips the input up to the recorded ``offset`` and truncates its
+    seekable sinks to their recorded sizes, thus they should be opened with
+    the mode ``'r+'`` or ``'a'``.
+
+    :param path: The path of the checkpoint file.
+    :param interval: The minimal number of seconds between two writes.
+    """
+
+    def __init__(self, path, interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.offset = 0
+        self.line = 0
+        self.valid = 0
+        self.invalid = 0
+        self.outputs = {}
+        self.complete = False
+        self.saved = _clock()
+        self.load()
+
+    def load(self):
+        """ Loads the recorded progress, if the file exists. """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (IOError, OSError):
+            return
+        for key in ('offset', 'line', 'valid', 'invalid', 'outputs',
+                    'complete'):
+            setattr(self, key, state[key])
+
+    def save(self, sinks=None):
+        """ Writes the progress and the sizes of the flushed sinks to a
+        temporary file that replaces the checkpoint file. """
+        if sinks is not None:
+            self.outputs = {}
+            for name in ('valid', 'invalid', 'errors'):
+                sink = getattr(sinks, name)
+                if sink is None:
+                    continue
+                sink.flush()
+                self.outputs[name] = {'path': getattr(sink, 'name', None),
+                                      'size': _tell(sink)}
+        state = dict((x, getattr(self, x)) for x in
+                     ('offset', 'line', 'valid', 'invalid', 'outputs',
+                      'complete'))
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(state, f, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(temporary, self.path)
+        self.saved = _clock()
+
+    def restore(self, sinks):
+        """ Truncates the sinks to their recorded sizes. """
+        for name, output in self.outputs.items():
+            sink = getattr(sinks, name)
+            if sink is None or output['size'] is None:
+                continue
+            sink.seek(0, os.SEEK_END)
+            if sink.tell() > output['size']:
+                sink.seek(output['size'])
+                sink.truncate()
+
+    def update(self, offset, line, results, sinks, complete=False):
+        """ Records a processed chunk and saves the progress if the interval
+        elapsed or the input is ``complete``. """
+        self.offset, self.line = offset, line
+        for result in results:
+            if result.valid:
+                self.valid += 1
+            else:
+                self.invalid += 1
+        if complete or _clock() - self.saved >= self.interval:
+            self.complete = complete
+            self.save(sinks)
+
+
+def _tell(stream):
+    try:
+        return stream.tell()
+    except (AttributeError, IOError, OSError):
+        return None
+
+
+def _skip(stream, offset, buffer_size):
+    """ Reads and discards ``offset`` bytes or characters. """
+    while offset > 0:
+        data = stream.read(min(offset, buffer_size))
+        if not data:
+            break
+        offset -= len(data)
+
+
+def _seek_uncompressed(stream, offset, compression):
+    """ Moves an uncompressed, seekable binary stream forward by ``offset``
+    bytes and returns whether it did so. """
+    if compression not in ('auto', None) or _tell(stream) is None:
+        return False
+    start = stream.tell()
+    if compression == 'auto':
+        magic = stream.read(max(len(x) for x, _ in COMPRESSIONS))
+        if any(magic.startswith(x) for x, _ in COMPRESSIONS):
+            stream.seek(start)
+            return False
+    stream.seek(start + offset)
+    return True
+
+
+def validate_ndjson(validator, stream, valid_sink=None, invalid_sink=None,
+                    error_sink=None, buffer_size=DEFAULT_BUFFER_SIZE,
+                    chunk_size=DEFAULT_CHUNK_SIZE, update=False,
+                    normalize=True, compression='auto', checkpoint=None):
+    """ Validates a file object with one JSON document per line and yields a
+    :class:`~cerberus.batch.ValidationResult` for each non-empty line, with
+    the line number as ``index``. Lines that can't be decoded are reported as
+    invalid with a message as ``errors``.
+    Only ``chunk_size`` documents are held in memory at once, the values of
+    :class:`~cerberus.batch.BatchedValidator` s are checked per chunk.
+    Binary streams are read and decompressed in a background thread, see
+    :func:`open_compressed`.
+
+    :param validator: A :class:`~cerberus.Validator` instance.
+    :param stream: A binary or text file object.
+    :param valid_sink: An optional text file object for valid documents, see
+                       :class:`NDJSONSinks`.
+    :param invalid_sink: An optional text file object for invalid documents.
+    :param error_sink: An optional text file object for errors.
+    :param buffer_size: The number of bytes or characters to read at once.
+    :param chunk_size: The number of documents to validate at once.
+    :param update: See :meth:`~cerberus.Validator.validate`.
+    :param normalize: See :meth:`~cerberus.Validator.validate`.
+    :param compression: The compression of a binary stream, see
+                        :func:`open_compressed`.
+    :param checkpoint: An optional :class:`Checkpoint` that the progress is
+                       recorded with and resumed from. The ``offset`` refers
+                       to the decompressed data.
+
+    .. versionadded:: 0.10
+    """
+    sinks = NDJSONSinks(valid_sink, invalid_sink, error_sink)
+    offset = first_line = 0
+    if checkpoint is not None:
+        if checkpoint.complete:
+            return
+        offset, first_line = checkpoint.offset, checkpoint.line
+        checkpoint.restore(sinks)
+
+    skip = offset
+    if isinstance(stream.read(0), bytes):
+        if offset and _seek_uncompressed(stream, offset, compression):
+            compression, skip = None, 0
+        stream = open_compressed(stream, compression, buffer_size)
+    try:
+        _skip(stream, skip, buffer_size)
+        chunk = []
+        number = first_line
+        for number, line in enumerate(iter_lines(stream, buffer_size),
+                                      first_line + 1):
+            offset += len(line) + 1
+            if not line.strip():
+                continue
+            chunk.append((number, line))
+            if len(chunk) >= chunk_size:
+                results = list(_validate_lines(validator, chunk, sinks,
+                                               update, normalize))
+                for result in results:
+                    yield result
+                if checkpoint is not None:
+                    checkpoint.update(offset, number, results, sinks)
+                chunk = []
+        results = list(_validate_lines(validator, chunk, sinks, update,
+                                       normalize))
+        for result in results:
+            yield result
+        if checkpoint is not None:
+            checkpoint.update(offset, number, results, sinks, complete=True)
+    finally:
+        if isinstance(stream, BackgroundReader):
+            stream.close()
+
+
+def _validate_lines(validator, lines, sinks, update, normalize):
+    results, documents, positions = [], [], []
+    for number, line in lines:
+        try:
+            document = decode_json_line(line)
+        except ValueError as e:
+            results.append(ValidationResult(number, False, None,
+                                            'invalid JSON: {0}'.format(e)))
+        else:
+            results.append(None)
+            documents.append(document)
+            positions.append(len(results) - 1)
+
+    validated = validate_documents(validator, 0, documents, update, normalize)
+    for position, result in zip(positions, validated):
+        results[position] = result._replace(index=lines[position][0])
+
+    for (number, line), result in zip(lines, results):
+        sinks.write(result, line)
+        yield result
+
+
+def _offsets():
+    try:
+        return array('Q')
+    except ValueError:  # Python 2
+        return array('L')
+
+
+class LineIndex(object):
+    """ The byte offsets of the lines of a file. Once built, an index is
+    persisted beside the file and reused as long as the file's size and
+    modification time don't change.
+
+    :param offsets: An :class:`array.array` with the offsets at which the
+                    lines start.
+    :param size: The size of the file in bytes.
+    """
+
+    def __init__(self, offsets, size):
+        self.offsets = offsets
+        self.size = size
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @staticmethod
+    def path_for(path):
+        """ Returns the path where the index of a file is persisted. """
+        return path + '.idx'
+
+    @classmethod
+    def build(cls, path):
+        """ Scans a memory-mapped file for line endings. """
+        offsets = _offsets()
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return cls(offsets, size)
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                position = 0
+                while 0 <= position < size:
+                    offsets.append(position)
+                    position = data.find(b'\n', position) + 1 or -1
+            finally:
+                data.close()
+        return cls(offsets, size)
+
+    @classmethod
+    def load(cls, path, index_path=None):
+        """ Returns the persisted index of a file, or builds and persists it if
+        it's missing or outdated. If it can't be persisted, e.g. in a
+        read-only directory, the built index is returned nonetheless.
+
+        :param path: The path of the indexed file.
+        :param index_path: The path of the persisted index. Defaults to the
+                           file's path with the suffix ``.idx``.
+        """
+        if index_path is None:
+            index_path = cls.path_for(path)
+        stat = os.stat(path)
+        try:
+            with open(index_path, 'rb') as f:
+                header = json.loads(f.readline().decode('utf-8'))
+                offsets = _offsets()
+                if header == cls.__header(stat, offsets, header['count']):
+                    offsets.fromfile(f, header['count'])
+                    return cls(offsets, stat.st_size)
+        except (EOFError, IOError, OSError, KeyError, ValueError):
+            pass
+        index = cls.build(path)
+        try:
+            index.save(index_path, stat)
+        except (IOError, OSError) as e:
+            log.warning('The line index of {0} could not be persisted: '
+                        '{1}'.format(path, e))
+        return index
+
+    def save(self, index_path, stat):
+        """ Persists the index of a file with the given
+        :func:`os.stat`-result. """
+        header = self.__header(stat, self.offsets, len(self.offsets))
+        with open(index_path, 'wb') as f:
+            f.write(json.dumps(header, sort_keys=True).encode('utf-8') +
+                    b'\n')
+            self.offsets.tofile(f)
+
+    @staticmethod
+    def __header(stat, offsets, count):
+        return {'size': stat.st_size, 'mtime': stat.st_mtime,
+                'typecode': offsets.typecode, 'itemsize': offsets.itemsize,
+                'count': count}
+
+    def ranges(self, lines):
+        """ Yields the number of the first line, the start and the end of
+        byte ranges that span up to ``lines`` lines. """
+        offsets = self.offsets
+        for i in range(0, len(offsets), lines):
+            end = offsets[i + lines] if i + lines < len(offsets) else self.size
+            yield i + 1, offsets[i], end
+
+
+def validate_ndjson_range(payload, path, first_line, start, end,
+                          update=False, normalize=True):
+    """ Validates the lines in a byte range of a file in a worker and returns
+    a list of :class:`~cerberus.batch.ValidationResult` s with the line
+    numbers as ``index``. Only the given range of the file is read. """
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            chunk = data[start:end]
+        finally:
+            data.close()
+    lines = [(number, line) for number, line
+             in enumerate(chunk.split(b'\n'), first_line) if line.strip()]
+    return list(_validate_lines(worker_validator(payload), lines,
+                                NDJSONSinks(), update, normalize))
+
+
+def validate_ndjson_file(validator, path, executor=None, index=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, max_in_flight=8,
+                         update=False, normalize=True, index_path=None):
+    """ Validates a file with one JSON document per line and yields a
+    :class:`~cerberus.batch.ValidationResult` for each non-empty line, with
+    the line number as ``index``, in the order of the file.
+
+    The file is split into byte ranges along a :class:`LineIndex` that is
+    persisted for later runs if possible. Each range is read and validated by
+    a worker of the executor that reuses the validator with its prepared
+    schema.
+
+    :param validator: A :class:`~cerberus.Validator` instance.
+    :param path: The path of the file.
+    :param executor: An optional :class:`concurrent.futures.Executor`. The
+                     ranges are validated serially if it's omitted.
+    :param index: A :class:`LineIndex`. Defaults to the persisted one.
+    :param chunk_size: The number of lines per range.
+    :param max_in_flight: The maximum number of ranges that are submitted to
+                          the executor at once.
+    :param update: See :meth:`~cerberus.Validator.validate`.
+    :param normalize: See :meth:`~cerberus.Validator.validate`.
+    :param index_path: The path of the persisted index, see
+                       :meth:`LineIndex.load`.
+
+    .. versionadded:: 0.10
+    """
+    if index is None:
+        index = LineIndex.load(path, index_path)
+    payload = ValidatorPayload(validator)
+    ranges = index.ranges(chunk_size)
+
+    if executor is None:
+        for first_line, start, end in ranges:
+            for result in validate_ndjson_range(payload, path, first_line,
+                                                start, end, update,
+                                                normalize):
+                yield result
+        return
+
+    in_flight = deque()
+    for first_line, start, end in ranges:
+        in_flight.append(executor.submit(
+            validate_ndjson_range, payload, path, first_line, start, end,
+            update, normalize))
+        if len(in_flight) >= max_in_flight:
+            for result in in_flight.popleft().result():
+                yield result
+    while in_flight:
+        for result in in_flight.popleft().result():
+            yield result
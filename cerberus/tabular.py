@@ -0,0 +1,290 @@
+"""
+    Validation of tabular data, e.g. CSV files or results of SQL queries,
+    where each row is a document with a value per column.
+
+    The columns are mapped to the schema's fields once. If the schema permits
+    it, the values are then coerced per column and the rows are validated
+    without a further normalization.
+"""
+
+from collections import Mapping
+import csv
+import json
+
+from .batch import ValidationResult, validate_documents
+from .cerberus import Validator
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# rules that prevent a row from being normalized by the column coercers
+_NORMALIZED_RULES = ('allow_unknown', 'propertyschema', 'purge_unknown',
+                     'rename', 'rename_handler', 'schema', 'valueschema')
+
+
+class Columns(object):
+    """ Maps the columns of a table to the rules of a validator's schema.
+
+    :param validator: A :class:`~cerberus.Validator` instance.
+    :param names: The names of the columns, used as fields of the rows.
+                  Columns named ``None`` are omitted from the rows.
+    """
+
+    def __init__(self, validator, names):
+        self.names = tuple(names)
+        self.positions = dict((x, i) for i, x in enumerate(self.names)
+                              if x is not None)
+        # the fields of rows with a given number of values
+        self.fields = [tuple(x for x in self.names[:i] if x is not None)
+                       for i in range(len(self.names) + 1)]
+        rules = [self.__rules(validator, x) for x in self.names]
+        self.coercers = tuple(x.get('coerce') if x is not None else None
+                              for x in rules)
+        self.coerced = tuple(i for i, x in enumerate(self.coercers)
+                             if x is not None)
+        self.coercible = self.__coercible(validator, rules)
+
+    @staticmethod
+    def __rules(validator, name):
+        if name is None:
+            return None
+        if name in validator.schema:
+            return validator.schema[name]
+        if isinstance(validator.allow_unknown, Mapping):
+            return validator.allow_unknown
+
+    @staticmethod
+    def __coercible(validator, rules):
+        """ Tests whether the columns' coercers result in the same documents
+        as a normalization. """
+        if validator.purge_unknown:
+            return False
+        for cls in type(validator).__mro__:
+            if cls is Validator:
+                break
+            if '_normalize_coerce' in vars(cls):
+                return False
+        for column_rules in rules:
+            if column_rules is not None and \
+                    set(column_rules) & set(_NORMALIZED_RULES):
+                return False
+        return True
+
+    def document(self, row):
+        """ Returns a row as document with the values as they are. """
+        return Row(self, row)
+
+    def coerce(self, row):
+        """ Returns a row as document with coerced values, or ``None`` if a
+        coercion fails. """
+        row = list(row)
+        coercers = self.coercers
+        try:
+            for i in self.coerced:
+                if i < len(row):
+                    row[i] = coercers[i](row[i])
+        except (TypeError, ValueError):
+            return None
+        return Row(self, row)
+
+
+class Row(Mapping):
+    """ A read-only mapping of the :class:`Columns`' names to the values of a
+    row, which is used as is. Missing trailing values are omitted.
+
+    Rows that aren't normalized are validated without being copied, they are
+    also the ``document`` of their results. :meth:`copy` returns a ``dict``.
+    """
+
+    __slots__ = ('columns', 'values')
+
+    def __init__(self, columns, values):
+        self.columns = columns
+        self.values = values
+
+    def __contains__(self, key):
+        return self.columns.positions.get(key, len(self.values)) < \
+            len(self.values)
+
+    def __getitem__(self, key):
+        position = self.columns.positions[key]
+        if position >= len(self.values):
+            raise KeyError(key)
+        return self.values[position]
+
+    def __iter__(self):
+        return iter(self.columns.fields[len(self.values)])
+
+    def __len__(self):
+        return len(self.columns.fields[len(self.values)])
+
+    def get(self, key, default=None):
+        position = self.columns.positions.get(key, len(self.values))
+        if position >= len(self.values):
+            return default
+        return self.values[position]
+
+    def copy(self):
+        return dict((x, y) for x, y in zip(self.columns.names, self.values)
+                    if x is not None)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.copy())
+
+
+def validate_rows(validator, columns, rows, update=False, normalize=True):
+    """ Validates a list of rows and returns a list of
+    :class:`~cerberus.batch.ValidationResult` s with the positions of the rows
+    in ``rows`` as ``index``.
+
+    Rows whose values can be coerced per column are validated without
+    normalization. Other rows are normalized as usual, thus those with failed
+    coercions are reported alike.
+
+    :param validator: A :class:`~cerberus.Validator` instance.
+    :param columns: The rows' :class:`Columns`.
+    :param rows: A list of sequences with a value per column.
+    :param update: See :meth:`~cerberus.Validator.validate`.
+    :param normalize: See :meth:`~cerberus.Validator.validate`.
+    """
+    coerced, raw = [], []
+    for i, row in enumerate(rows):
+        document = None
+        if normalize and columns.coercible:
+            document = columns.coerce(row)
+        if document is None:
+            raw.append((i, columns.document(row)))
+        else:
+            coerced.append((i, document))
+
+    results = [None] * len(rows)
+    for documents, normalize_documents in ((coerced, False),
+                                           (raw, normalize)):
+        if not documents:
+            continue
+        positions = [x[0] for x in documents]
+        for position, result in zip(positions, validate_documents(
+                validator, 0, [x[1] for x in documents], update,
+                normalize_documents)):
+            results[position] = result._replace(index=position)
+    return results
+
+
+def validate_csv(validator, stream, chunk_size=DEFAULT_CHUNK_SIZE,
+                 update=False, normalize=True, **fmtparams):
+    """ Validates a CSV file whose first row names the columns and yields a
+    :class:`~cerberus.batch.ValidationResult` for each non-empty row, with
+    the row's number as ``index``, counting the header as row ``1``. The
+    ``errors`` of a row refer to the columns' names.
+
+    The columns' ``coerce``-rules are looked up once and applied per column.
+    Only ``chunk_size`` rows are held in memory at once.
+
+    :param validator: A :class:`~cerberus.Validator` instance.
+    :param stream: A file object as expected by :func:`csv.reader`.
+    :param chunk_size: The number of rows to validate at once.
+    :param update: See :meth:`~cerberus.Validator.validate`.
+    :param normalize: See :meth:`~cerberus.Validator.validate`.
+    :param fmtparams: Further arguments for :func:`csv.reader`, e.g. the
+                      ``delimiter``.
+
+    .. versionadded:: 0.10
+    """
+    reader = csv.reader(stream, **fmtparams)
+    try:
+        columns = Columns(validator, next(reader))
+    except StopIteration:
+        return
+
+    numbers, rows = [], []
+    for number, row in enumerate(reader, 2):
+        if not row:
+            continue
+        numbers.append(number)
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            for result in _validate_chunk(validator, columns, numbers, rows,
+                                          update, normalize):
+                yield result
+            numbers, rows = [], []
+    for result in _validate_chunk(validator, columns, numbers, rows, update,
+                                  normalize):
+        yield result
+
+
+def _validate_chunk(validator, columns, numbers, rows, update, normalize):
+    width = len(columns.names)
+    fitting = [i for i, row in enumerate(rows) if len(row) <= width]
+    results = dict(zip(fitting, validate_rows(
+        validator, columns, [rows[i] for i in fitting], update, normalize)))
+    for i, (number, row) in enumerate(zip(numbers, rows)):
+        if i in results:
+            yield results[i]._replace(index=number)
+        else:
+            yield ValidationResult(number, False, None,
+                                   'too many values: {0} for {1} columns'
+                                   .format(len(row), width))
+
+
+def validate_query(validator, connection, query, parameters=(),
+                   batch_size=DEFAULT_CHUNK_SIZE, id_column=None,
+                   errors_table=None, update=False, normalize=True):
+    """ Validates the rows of a query's result and yields a
+    :class:`~cerberus.batch.ValidationResult` for each. The rows are fetched
+    and validated in batches.
+
+    :param validator: A :class:`~cerberus.Validator` instance.
+    :param connection: A :class:`sqlite3.Connection` or another connection of
+                       the :pep:`249`-compliant module that provides
+                       :meth:`~sqlite3.Connection.execute`.
+    :param query: The SQL-query, e.g. ``SELECT rowid, * FROM staging``.
+    :param parameters: The parameters of the query.
+    :param batch_size: The number of rows to fetch and validate at once.
+    :param id_column: The name of a column that identifies the rows and is
+                      used as ``index``. It is not part of the validated
+                      documents. If omitted, the rows' positions in the
+                      result are used.
+    :param errors_table: The name of a table that the ``index`` (as
+                         ``row_id``) and the ``errors`` (as JSON) of invalid
+                         rows are inserted into, one transaction per batch. It
+                         is created if it doesn't exist.
+    :param update: See :meth:`~cerberus.Validator.validate`.
+    :param normalize: See :meth:`~cerberus.Validator.validate`.
+
+    .. versionadded:: 0.10
+    """
+    cursor = connection.execute(query, parameters)
+    names = [x[0] for x in cursor.description]
+    id_position = None
+    if id_column is not None:
+        id_position = names.index(id_column)
+        names[id_position] = None
+    columns = Columns(validator, names)
+
+    if errors_table is not None:
+        errors_table = '"{0}"'.format(errors_table.replace('"', '""'))
+        with connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS {0} '
+                               '(row_id, errors TEXT)'.format(errors_table))
+
+    offset = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        results = validate_rows(validator, columns, rows, update, normalize)
+        for i, result in enumerate(results):
+            index = offset + i if id_position is None else \
+                rows[i][id_position]
+            results[i] = result._replace(index=index)
+        offset += len(rows)
+
+        if errors_table is not None:
+            with connection:
+                connection.executemany(
+                    'INSERT INTO {0} (row_id, errors) VALUES (?, ?)'
+                    .format(errors_table),
+                    ((x.index, json.dumps(x.errors, default=str))
+                     for x in results if not x.valid))
+        for result in results:
+            yield result
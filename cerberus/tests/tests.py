@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 
+from io import BytesIO, StringIO
+import json
+import os
+import pickle
 import re
+import socket
+import sys
+import threading
+import time
 from datetime import datetime
 from random import choice
 from string import ascii_lowercase
 from tempfile import NamedTemporaryFile
-from . import TestBase
-from ..cerberus import errors, SchemaError, Validator
+from . import TestBase, unittest
+from ..cerberus import DocumentError, errors, SchemaError, Validator
 
 
 ValidationError = errors.ValidationError
@@ -399,6 +407,91 @@ class TestValidation(TestBase):
         self.assertError(field, (field, 'regex'), errors.REGEX_MISMATCH,
                          '^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
 
+    def test_regex_full_match(self):
+        schema = {'code': {'regex': '[a-z]{3}'},
+                  'word': {'regex': '(?i)[a-z]+|[0-9]+'}}
+        self.assertSuccess({'code': 'abc', 'word': 'ABC'}, schema)
+        self.assertFail({'code': 'abc\n'}, schema)
+        self.assertFail({'code': 'abcd'}, schema)
+        self.assertFail({'word': 'abc123'}, schema)
+        self.assertRaises(SchemaError, Validator, {'code': {'regex': '['}})
+
+    def test_pattern_cache(self):
+        from ..utils import PatternCache
+        cache = PatternCache(maxsize=2)
+        compiled = cache('a+')
+        self.assertIs(cache('a+'), compiled)
+        cache('b+')
+        # a hit keeps a pattern
+        cache('a+')
+        cache('c+')
+        self.assertEqual(sorted(cache.patterns), ['a+', 'c+'])
+        for i in range(10):
+            cache('a+')
+        cache('d+')
+        self.assertEqual(sorted(cache.patterns), ['a+', 'd+'])
+        self.assertTrue(cache('a+|b').match('b'))
+        # a trailing comment doesn't swallow the anchor
+        compiled = cache('(?x) a+ b  # comment')
+        self.assertTrue(compiled.match('aab'))
+        self.assertFalse(compiled.match('aabc'))
+
+        # the patterns of a schema are kept with it
+        v = Validator({'code': {'regex': '[a-z]{3}'}})
+        pattern, compiled = v.schema.patterns['code']
+        self.assertEqual(pattern, '[a-z]{3}')
+        self.assertTrue(v.validate({'code': 'abc'}))
+        v.schema['code']['regex'] = '[0-9]{3}'
+        self.assertFalse(v.validate({'code': 'abc'}))
+        self.assertTrue(v.validate({'code': '123'}))
+
+    def test_allowed_values_index(self):
+        from ..valuesets import AllowedValues
+        schema = {'codes': {'type': 'list', 'schema': {'allowed': ['a', 'b']}},
+                  'tags': {'type': 'list', 'allowed': ['x', ['y']]}}
+        v = Validator(schema)
+        constraint = schema['codes']['schema']['allowed']
+        self.assertTrue(v.validate({'codes': ['a'], 'tags': ['x']}))
+        # the schema isn't changed
+        self.assertIs(type(constraint), list)
+        self.assertIs(type(schema['tags']['allowed']), list)
+        index = v.schema.allowed[id(schema['tags']['allowed'])]
+        self.assertIsInstance(index[2], AllowedValues)
+        self.assertFalse(v.validate({'codes': ['c']}))
+        constraint.append('c')
+        self.assertTrue(v.validate({'codes': ['c']}))
+        self.assertFalse(v.validate({'tags': ['x', 'z']}))
+        self.assertEqual(v.errors, {'tags': "unallowed values ['z']"})
+        constraint = AllowedValues(['a', 'b'])
+        constraint.append('c')
+        self.assertEqual(pickle.loads(pickle.dumps(constraint)).hashable,
+                         frozenset('abc'))
+
+    def test_file_value_set(self):
+        from ..valuesets import FileValueSet
+        f = NamedTemporaryFile(delete=False)
+        f.close()
+        try:
+            values = FileValueSet.write(f.name, ['%04d' % i for i in
+                                                 range(0, 2000, 3)])
+            self.assertTrue(all(('%04d' % i in values) == (i % 3 == 0)
+                                for i in range(2000)))
+            self.assertNotIn(3, values)
+            v = Validator({'code': {'type': 'string', 'allowed': values},
+                           'codes': {'type': 'list', 'allowed': values}})
+            self.assertTrue(v.validate({'code': '0003', 'codes': ['0006']}))
+            self.assertFalse(v.validate({'codes': ['0006', '0007']}))
+            self.assertEqual(v.errors, {'codes': "unallowed values ['0007']"})
+            values = pickle.loads(pickle.dumps(values))
+            self.assertIn('1998', values)
+            self.assertEqual(len(list(values)), 667)
+            values.close()
+            empty = FileValueSet.write(f.name, [])
+            self.assertNotIn('', empty)
+            empty.close()
+        finally:
+            os.remove(f.name)
+
     # TODO remove on next major release
     def test_a_list_of_dicts_deprecated(self):
         self.assertSuccess(
@@ -524,6 +617,28 @@ class TestValidation(TestBase):
                          ('Below the min',), v_errors=v._errors)
         self.assertDictEqual(v.errors, {'test_field': 'Below the min'})
 
+    def test_types_mapping(self):
+        from decimal import Decimal
+        from ..cerberus import TypeDefinition
+
+        class MyValidator(Validator):
+            types_mapping = Validator.types_mapping.copy()
+            types_mapping['decimal'] = TypeDefinition('decimal', (Decimal,),
+                                                      ())
+            types_mapping['integer'] = TypeDefinition('integer', (int,),
+                                                      (bool,))
+
+        v = MyValidator({'amount': {'type': ['decimal', 'integer']}})
+        self.assertSuccess({'amount': Decimal('1.5')}, validator=v)
+        self.assertSuccess({'amount': 1}, validator=v)
+        self.assertFail({'amount': True}, validator=v)
+        self.assertError('amount', ('amount', 'type'), errors.BAD_TYPE,
+                         ['decimal', 'integer'], v_errors=v._errors)
+        self.assertIn('boolean', v._type_cache(bool))
+        self.assertNotIn('integer', v._type_cache(bool))
+        self.assertIn('string', Validator()._type_cache(str))
+        self.assertNotIn('list', Validator()._type_cache(str))
+
     def test_custom_validator(self):
         class MyValidator(Validator):
             def _validate_isodd(self, isodd, field, value):
@@ -799,6 +914,34 @@ class TestValidation(TestBase):
                          {'field1': ['one', 'two']}, ({'field1': 'three'}, ),
                          v_errors=v._errors)
 
+    def test_dependencies_compiled(self):
+        v = Validator({'a': {'dependencies': ['b.c', 'd']},
+                       'b': {'allow_unknown': True},
+                       'd': {}})
+        compiled = v.schema.dependencies['a']
+        self.assertEqual(compiled.paths, (('b.c', ('b', 'c')), ('d', ('d',))))
+        self.assertTrue(v.validate({'a': 1, 'b': {'c': None}, 'd': 0}))
+        self.assertFalse(v.validate({'a': 1, 'b': 'c', 'd': 0}))
+        self.assertError('a', ('a', 'dependencies'), errors.DEPENDENCIES_FIELD,
+                         ['b.c', 'd'], ('b.c', ), v_errors=v._errors)
+        self.assertEqual(len(v._errors), 1)
+        v.schema['a'] = {'dependencies': {'d': [[1], 2]}}
+        self.assertTrue(v.validate({'a': 1, 'd': [1]}))
+        self.assertFalse(v.validate({'a': 1, 'd': 1}))
+        v.schema['a']['dependencies']['d'].append(1)
+        self.assertTrue(v.validate({'a': 1, 'd': 1}))
+
+        # paths that several fields depend on are resolved once per document
+        v = Validator({'a': {'dependencies': ['c.d']},
+                       'b': {'dependencies': {'c.d': [1]}},
+                       'c': {'type': 'dict'}})
+        self.assertEqual(sorted(v.schema.dependents[('c', 'd')]), ['a', 'b'])
+        self.assertTrue(v.validate({'a': 0, 'b': 0, 'c': {'d': 1}}))
+        self.assertFalse(v.validate({'a': 0, 'b': 0, 'c': {'d': 2}}))
+        self.assertEqual(list(v.errors), ['b'])
+        self.assertFalse(v.validate({'a': 0, 'b': 0, 'c': {}}))
+        self.assertEqual(sorted(v.errors), ['a', 'b'])
+
     def test_options_passed_to_nested_validators(self):
         schema = {'sub_dict': {'type': 'dict',
                                'schema': {'foo': {'type': 'string'}}}}
@@ -1009,6 +1152,180 @@ class TestValidation(TestBase):
         doc = {'prop1': 15}
         self.assertFail(doc, schema)
 
+    def test_logical_short_circuit(self):
+        calls = []
+
+        def record(i):
+            def validator(field, value, error):
+                calls.append(i)
+                if value < i:
+                    error(field, 'too small')
+            return validator
+
+        branches = [{'validator': record(i)} for i in range(4)]
+        for operator, value, expected, valid in (
+                ('anyof', 2, [0], True), ('oneof', 3, [0, 1], False),
+                ('allof', 1, [0, 1, 2], False), ('noneof', 0, [0], False)):
+            v = Validator({'field': {operator: branches}})
+            del calls[:]
+            self.assertEqual(v.validate({'field': value}), valid)
+            self.assertEqual(calls, expected)
+            v.collect_branch_errors = True
+            del calls[:]
+            self.assertEqual(v.validate({'field': value}), valid)
+            self.assertEqual(calls, [0, 1, 2, 3])
+
+        v = Validator({'field': {'allof': branches}},
+                      collect_branch_errors=True)
+        self.assertFalse(v.validate({'field': 1}))
+        self.assertEqual(len(v._errors[0].child_errors), 2)
+        self.assertEqual(v._errors[0].info[1:], (2, 4))
+        self.assertTrue(v.validate({'field': 3}))
+
+    def test_discriminator(self):
+        calls = []
+
+        def record(i):
+            def validator(field, value, error):
+                calls.append(i)
+            return validator
+
+        branches = [{'type': 'dict', 'validator': record(i),
+                     'schema': {'kind': {'allowed': ['k%d' % i]},
+                                'size': {'type': 'integer'}}}
+                    for i in range(10)]
+        branches[3]['schema']['kind']['allowed'].append('k4')
+        v = Validator({'shape': {'discriminator': 'kind', 'oneof': branches}})
+        self.assertTrue(v.validate({'shape': {'kind': 'k7', 'size': 1}}))
+        self.assertEqual(calls, [7])
+        del calls[:]
+        self.assertFalse(v.validate({'shape': {'kind': 'k4', 'size': 1}}))
+        self.assertEqual(calls, [3, 4])
+        del calls[:]
+        self.assertFalse(v.validate({'shape': {'kind': 'k7', 'size': 'x'}}))
+        self.assertEqual(calls, [7])
+        self.assertEqual(len(v._errors[0].child_errors), 1)
+        del calls[:]
+        self.assertFalse(v.validate({'shape': {'kind': 'k10'}}))
+        self.assertEqual(calls, list(range(10)))
+        self.assertSchemaError({'shape': {}},
+                               {'shape': {'discriminator': ['kind'],
+                                          'anyof': branches}})
+
+    def test_logical_branches_shared(self):
+        class CountingValidator(Validator):
+            instances = 0
+
+            def __init__(self, *args, **kwargs):
+                CountingValidator.instances += 1
+                super(CountingValidator, self).__init__(*args, **kwargs)
+
+        schema = {'items': {'type': 'list',
+                            'schema': {'anyof': [{'type': 'string'},
+                                                 {'type': 'float'},
+                                                 {'type': 'integer'}]}}}
+        v = CountingValidator(schema)
+        self.assertTrue(v.validate({'items': list(range(20))}))
+        # the validator, the one for the items and one per branch
+        self.assertEqual(CountingValidator.instances, 5)
+        self.assertFalse(v.validate({'items': [0, [], 'x', 2]}))
+        self.assertEqual([x.document_path for x in
+                          v._errors[0].child_errors[0].child_errors],
+                         [('items', 1)] * 3)
+
+        # and by the items of mappings and by unknown fields
+        rules = {'anyof': [{'type': 'string'}, {'type': 'integer'}]}
+        document = dict(('k%d' % i, i) for i in range(5))
+        for v in (CountingValidator({'map': {'valueschema': rules}}),
+                  CountingValidator({}, allow_unknown=rules)):
+            instances = CountingValidator.instances
+            if v.allow_unknown:
+                self.assertTrue(v.validate(document))
+            else:
+                self.assertTrue(v.validate({'map': document}))
+            self.assertLessEqual(CountingValidator.instances, instances + 4)
+
+        # changes of the rules in place are followed
+        schema = {'f': {'anyof': [{'min': 0}, {'min': 100}], 'max': 5}}
+        v = Validator(schema)
+        self.assertFalse(v.validate({'f': 50}))
+        schema['f']['max'] = 100
+        self.assertTrue(v.validate({'f': 50}))
+        schema['f']['anyof'][0]['min'] = 60
+        self.assertFalse(v.validate({'f': 50}))
+
+    def test_allow_unknown_compiled(self):
+        v = Validator({'known': {'type': 'string'}},
+                      allow_unknown={'type': 'integer', 'min': 0})
+        self.assertTrue(v.validate({'known': 'x', 'a': 1, 'b': 2}))
+        self.assertFalse(v.validate({'c': 'x', 'd': -1, 'e': 3}))
+        self.assertEqual(v.errors, {'c': 'must be of integer type',
+                                    'd': 'min value is 0'})
+        paths = sorted((x.document_path, x.schema_path) for x in v._errors)
+        self.assertEqual(paths, [(('c',), ('allow_unknown', 'c', 'type')),
+                                 (('d',), ('allow_unknown', 'd', 'min'))])
+
+        # the rules are replaced with the option
+        v.allow_unknown = {'type': 'string'}
+        self.assertTrue(v.validate({'c': 'x'}))
+        self.assertFalse(v.validate({'c': 1}))
+        self.assertEqual(v.errors, {'c': 'must be of string type'})
+
+        # with subdocuments
+        v = Validator({'sub': {'type': 'dict', 'schema': {},
+                               'allow_unknown': {'type': 'integer'}}})
+        self.assertFalse(v.validate({'sub': {'a': 1, 'b': 'x'}}))
+        error = v._errors[0]
+        self.assertEqual(error.document_path, ('sub', 'b'))
+        self.assertEqual(error.schema_path,
+                         ('sub', 'schema', 'allow_unknown', 'b', 'type'))
+
+    def test_mapping_schemas_per_item(self):
+        schema = {'map': {'valueschema': {'type': 'integer', 'min': 0},
+                          'propertyschema': {'type': 'string',
+                                             'regex': '[a-z]+'}}}
+        v = Validator(schema)
+        mapping = dict(('key%d' % i, i) for i in range(50))
+        self.assertFalse(v.validate({'map': mapping}, normalize=False))
+        self.assertEqual(len(v._errors), 1)
+        self.assertEqual(len(v._errors[0].child_errors), 50)
+
+        mapping = {'a': -1, 'b': 'x', 'c': 1, 'D': 2}
+        self.assertFalse(v.validate({'map': mapping}, normalize=False))
+        self.assertEqual(v.errors['map'], {
+            'a': 'min value is 0', 'b': 'must be of integer type',
+            'D': "value does not match regex '[a-z]+'"})
+        errors_ = sorted((x.document_path, x.schema_path)
+                         for e in v._errors for x in e.child_errors)
+        self.assertEqual(errors_, [
+            (('map', 'D'), ('map', 'propertyschema', 'regex')),
+            (('map', 'a'), ('map', 'valueschema', 'min')),
+            (('map', 'b'), ('map', 'valueschema', 'type'))])
+
+        v = Validator({'map': {'valueschema': {'type': 'string'}}})
+        self.assertTrue(v.validate({'map': {1: 'a', 2: 'b'}}))
+        self.assertFalse(v.validate({'map': {1: 'a', 2: 3}}))
+        self.assertEqual(v.errors, {'map': {2: 'must be of string type'}})
+
+        # rules that refer to other items see the whole mapping
+        v = Validator({'map': {'valueschema': {'dependencies': 'other'}}})
+        self.assertTrue(v.validate({'map': {'a': 1, 'other': 2}}))
+        self.assertFalse(v.validate({'map': {'a': 1}}))
+        v = Validator({'map': {'valueschema': {'excludes': 'other'}}})
+        self.assertFalse(v.validate({'map': {'a': 1, 'other': 2}}))
+        self.assertEqual(sorted(v.errors['map']), ['a', 'other'])
+
+        class SiblingsValidator(Validator):
+            def _validate_greater_than(self, other, field, value):
+                if field != other and value <= self.document[other]:
+                    self._error(field, 'not greater than ' + other)
+
+        v = SiblingsValidator({'map': {'valueschema': {
+            'greater_than': 'base'}}})
+        self.assertTrue(v.validate({'map': {'base': 1, 'a': 2}}))
+        self.assertFalse(v.validate({'map': {'base': 3, 'a': 2}}))
+        self.assertEqual(v.errors, {'map': {'a': 'not greater than base'}})
+
     def test_anyof_allof(self):
 
         # prop1 can be any number outside of [0-10]
@@ -1316,6 +1633,62 @@ class TestValidation(TestBase):
                                  'required': True}}
         self.assertSchemaError({'this_field': {}}, schema)
 
+    def test_required_excludes_compiled(self):
+        v = Validator({'a': {'required': True, 'excludes': ['b', 'c']},
+                       'b': {'required': True},
+                       'c': {},
+                       'd': {'required': True, 'nullable': True}},
+                      ignore_none_values=True)
+        self.assertEqual(v.schema.required, frozenset(('a', 'b', 'd')))
+        self.assertEqual(v.schema.excludes['a'].required,
+                         frozenset(('a', 'b')))
+        self.assertTrue(v.validate({'a': 1, 'd': 1}))
+        self.assertFalse(v.validate({'a': 1, 'd': None}))
+        self.assertEqual(v.errors, {'d': 'required field'})
+        self.assertFalse(v.validate({'a': 1, 'c': 1, 'd': 1}))
+        self.assertEqual(list(v.errors), ['a'])
+        self.assertFalse(v.validate({'d': 1}))
+        self.assertEqual(sorted(v.errors), ['a', 'b'])
+        del v.schema['b']
+        self.assertEqual(v.schema.required, frozenset(('a', 'd')))
+
+        # changed rules are followed when they're assigned
+        v.schema['c'] = dict(v.schema['c'], required=True)
+        self.assertEqual(v.schema.excludes['a'].required,
+                         frozenset(('a', 'c')))
+        self.assertFalse(v.validate({'d': 1}))
+        self.assertEqual(sorted(v.errors), ['a', 'c'])
+        # constraints that are changed in place are compiled again
+        v.schema['a']['excludes'].remove('c')
+        self.assertTrue(v.validate({'a': 1, 'c': 1, 'd': 1}))
+
+    @unittest.skipIf(sys.version_info < (3, 2), 'requires concurrent.futures')
+    def test_sequence_executor(self):
+        from concurrent.futures import ProcessPoolExecutor
+        schema = {'items': {'type': 'list',
+                            'schema': {'type': 'dict',
+                                       'schema': {'id': {'type': 'integer',
+                                                         'max': 20},
+                                                  'tags': {'type': 'list',
+                                                           'schema': {'type': 'string'}}}}}}  # noqa
+        document = {'items': [{'id': i, 'tags': ['a', i]} for i in range(25)]}
+        serial = Validator(schema)
+        self.assertFalse(serial.validate(document))
+
+        with ProcessPoolExecutor(2) as executor:
+            v = Validator(schema, sequence_executor=executor,
+                          sequence_chunk_size=4)
+            self.assertFalse(v.validate(document))
+        self.assertEqual(v._errors, serial._errors)
+        self.assertDictEqual(v.errors, serial.errors)
+        parallel_errors = v._errors[0].child_errors
+        serial_errors = serial._errors[0].child_errors
+        self.assertEqual([(x.document_path, x.schema_path, x.code)
+                          for x in parallel_errors],
+                         [(x.document_path, x.schema_path, x.code)
+                          for x in serial_errors])
+        self.assertEqual(parallel_errors[-1].document_path[:2], ('items', 24))
+
 
 class TestNormalization(TestBase):
     def test_coerce(self):
@@ -1451,7 +1824,7 @@ class DefinitionSchema(TestBase):
         v = Validator({'foozifix': {'coerce': int}})
         self.assertEqual(len(v.schema.valid_schemas), cache_size)
 
-        max_cache_size = 200
+        max_cache_size = 350
         self.assertLess(cache_size, max_cache_size,
                         "There's an unexpected high amount of cached valid "
                         "definition schemas. Unless you added further tests, "
@@ -1691,24 +2064,621 @@ class BackwardCompatibility(TestBase):
         self.assertSuccess(document, schema, v)
 
 
-class TestInheritance(TestBase):
-    def test_contextual_data_preservation(self):
+def sleeping_validator(field, value, error):
+    time.sleep(0.002)
+    if value < 0:
+        error(field, 'negative')
 
-        class InheritedValidator(Validator):
-            def __init__(self, *args, **kwargs):
-                if 'working_dir' in kwargs:
-                    self.working_dir = kwargs['working_dir']
-                super(InheritedValidator, self).__init__(*args, **kwargs)
 
-            def _validate_type_test(self, field, value):
-                if not self.working_dir:
-                    self._error('self.working_dir', 'is None')
+validated_values = []
+
 
+def recording_validator(field, value, error):
+    validated_values.append(value)
+
+
+class InheritedValidator(Validator):
+    def __init__(self, *args, **kwargs):
+        if 'working_dir' in kwargs:
+            self.working_dir = kwargs['working_dir']
+        super(InheritedValidator, self).__init__(*args, **kwargs)
+
+    def _validate_type_test(self, field, value):
+        if not self.working_dir:
+            self._error('self.working_dir', 'is None')
+
+
+class TestInheritance(TestBase):
+    def test_contextual_data_preservation(self):
         v = InheritedValidator({'test': {'type': 'list',
                                          'schema': {'type': 'test'}}},
                                working_dir='/tmp')
         self.assertSuccess({'test': ['foo']}, validator=v)
 
+    def test_pickle(self):
+        v = InheritedValidator(working_dir='/tmp')
+        v({'test': 'foo'}, {'test': {'type': 'string'}})
+        w = pickle.loads(pickle.dumps(v))
+        self.assertIs(type(w), InheritedValidator)
+        self.assertEqual(w.working_dir, '/tmp')
+        self.assertDictEqual(w.schema.schema, v.schema.schema)
+        self.assertFail({'test': 0}, validator=w)
+
+
+class TestBatchedValidator(TestBase):
+    def setUp(self):
+        from ..batch import BatchedValidator
+        self.calls = []
+
+        def known_skus(values):
+            self.calls.append(sorted(values))
+            return [None if x.startswith('sku-') else 'unknown sku'
+                    for x in values]
+
+        self.validator = Validator(
+            {'lines': {'type': 'list',
+                       'schema': {'type': 'dict',
+                                  'schema': {'sku': {'type': 'string',
+                                                     'validator': BatchedValidator(known_skus)}}}}})  # noqa
+
+    def test_batched_values(self):
+        from ..batch import validate_documents
+        documents = [{'lines': [{'sku': 'sku-1'}, {'sku': 'sku-2'}]},
+                     {'lines': [{'sku': 'sku-2'}, {'sku': 'x'}]},
+                     {'lines': []}]
+        results = validate_documents(self.validator, 10, documents)
+        self.assertEqual(self.calls, [['sku-1', 'sku-2', 'x']])
+        self.assertEqual([x.index for x in results], [10, 11, 12])
+        self.assertEqual([x.valid for x in results], [True, False, True])
+        self.assertDictEqual(results[1].errors,
+                             {'lines': {1: {'sku': 'unknown sku'}}})
+
+    def test_single_values(self):
+        self.assertFail({'lines': [{'sku': 'x'}]})
+        self.assertSuccess({'lines': [{'sku': 'sku-1'}]})
+        self.assertEqual(self.calls, [['x'], ['sku-1']])
+
+
+class TestStreaming(TestBase):
+    def setUp(self):
+        self.validator = Validator({'id': {'type': 'integer', 'required': True},
+                                    'name': {'type': 'string',
+                                             'coerce': str}})
+
+    def test_iter_lines(self):
+        from ..streaming import iter_lines
+        data = b'first\nsecond line\n\nlast'
+        self.assertEqual(list(iter_lines(BytesIO(data), 3)),
+                         [b'first', b'second line', b'', b'last'])
+        self.assertEqual(list(iter_lines(StringIO(data.decode()), 4)),
+                         [u'first', u'second line', u'', u'last'])
+
+    def test_validate_ndjson(self):
+        from ..streaming import validate_ndjson
+        data = (b'{"id": 1, "name": 1}\n'
+                b'\n'
+                b'{"name": "x"}\n'
+                b'{"id": \n'
+                b'[1, 2]\n'
+                b'{"id": 5}')
+        valid, invalid, _errors = StringIO(), StringIO(), StringIO()
+        results = list(validate_ndjson(self.validator, BytesIO(data), valid,
+                                       invalid, _errors, buffer_size=5,
+                                       chunk_size=2))
+        self.assertEqual([(x.index, x.valid) for x in results],
+                         [(1, True), (3, False), (4, False), (5, False),
+                          (6, True)])
+        self.assertDictEqual(results[0].document, {'id': 1, 'name': '1'})
+        self.assertDictEqual(results[1].errors, {'id': 'required field'})
+        self.assertTrue(results[2].errors.startswith('invalid JSON'))
+        self.assertEqual(valid.getvalue().splitlines(),
+                         ['{"id": 1, "name": "1"}', '{"id": 5}'])
+        self.assertEqual(invalid.getvalue().splitlines(),
+                         ['{"name": "x"}', '{"id": ', '[1, 2]'])
+        self.assertEqual([json.loads(x)['line']
+                          for x in _errors.getvalue().splitlines()],
+                         [3, 4, 5])
+
+    def test_compressed_ndjson(self):
+        import bz2
+        import gzip
+        from ..streaming import validate_ndjson
+        data = ''.join('{"id": %d}\n' % i if i % 3 else '{"name": "x"}\n'
+                       for i in range(1, 301)).encode()
+        compressed = BytesIO()
+        for part in (data[:1000], data[1000:]):  # two gzip members
+            with gzip.GzipFile(fileobj=compressed, mode='wb') as f:
+                f.write(part)
+        streams = [BytesIO(data), BytesIO(compressed.getvalue()),
+                   BytesIO(bz2.compress(data))]
+        if sys.version_info >= (3, 3):
+            import lzma
+            streams.append(BytesIO(lzma.compress(data)))
+        for stream in streams:
+            results = list(validate_ndjson(self.validator, stream,
+                                           buffer_size=256, chunk_size=50))
+            self.assertEqual(len(results), 300)
+            self.assertEqual([x.index for x in results if not x.valid],
+                             list(range(3, 301, 3)))
+
+    def test_corrupted_compression(self):
+        import zlib
+        from ..streaming import validate_ndjson
+        stream = BytesIO(b'\x1f\x8b' + b'\x00' * 64)
+        self.assertRaises(zlib.error, list,
+                          validate_ndjson(self.validator, stream))
+
+    def test_line_index(self):
+        from ..streaming import LineIndex
+        with NamedTemporaryFile(suffix='.ndjson') as f:
+            f.write(b'{"id": 1}\n\n{"id": 2}\n{"id": 3}')
+            f.flush()
+            index = LineIndex.load(f.name)
+            try:
+                self.assertEqual(list(index.offsets), [0, 10, 11, 21])
+                self.assertEqual(list(index.ranges(3)),
+                                 [(1, 0, 21), (4, 21, 30)])
+                with open(LineIndex.path_for(f.name), 'rb') as persisted:
+                    self.assertIn(b'"count": 4', persisted.readline())
+                self.assertEqual(list(LineIndex.load(f.name).offsets),
+                                 [0, 10, 11, 21])
+            finally:
+                os.remove(LineIndex.path_for(f.name))
+
+    def test_validate_ndjson_file(self):
+        from ..streaming import LineIndex, validate_ndjson_file
+        lines = [json.dumps({'id': i} if i % 5 else {'name': i})
+                 for i in range(1, 101)]
+        with NamedTemporaryFile(suffix='.ndjson') as f:
+            f.write('\n'.join(lines).encode())
+            f.flush()
+            index = LineIndex.build(f.name)
+            executor = None
+            if sys.version_info >= (3, 2):
+                from concurrent.futures import ThreadPoolExecutor
+                executor = ThreadPoolExecutor(2)
+            results = list(validate_ndjson_file(
+                self.validator, f.name, executor=executor, index=index,
+                chunk_size=7, max_in_flight=2))
+            if executor is not None:
+                executor.shutdown()
+        self.assertEqual([x.index for x in results], list(range(1, 101)))
+        self.assertEqual([x.index for x in results if not x.valid],
+                         list(range(5, 101, 5)))
+        self.assertDictEqual(results[1].document, {'id': 2})
+
+    def test_unwritable_line_index(self):
+        from ..streaming import validate_ndjson_file
+        with NamedTemporaryFile(suffix='.ndjson') as f:
+            f.write(b'{"id": 1}\n{"id": "2"}\n')
+            f.flush()
+            index_path = os.path.join(f.name + '.missing', 'index')
+            results = list(validate_ndjson_file(self.validator, f.name,
+                                                index_path=index_path))
+        self.assertEqual([x.valid for x in results], [True, False])
+        self.assertFalse(os.path.exists(index_path))
+
+    def test_checkpoint(self):
+        from ..streaming import Checkpoint, validate_ndjson
+        data = b''.join(json.dumps({'id': i}).encode() + b'\n'
+                        for i in range(-9, 21))
+        validator = Validator({'id': {'type': 'integer', 'min': 0}})
+        with NamedTemporaryFile('w+', suffix='.json') as f:
+            checkpoint = Checkpoint(f.name + '.checkpoint', interval=0)
+            try:
+                stream = BytesIO(data)
+                for result in validate_ndjson(validator, stream,
+                                              error_sink=f, chunk_size=4,
+                                              checkpoint=checkpoint):
+                    if result.index == 14:
+                        break  # interrupted in the fourth chunk
+                checkpoint = Checkpoint(checkpoint.path)
+                self.assertEqual((checkpoint.line, checkpoint.offset,
+                                  checkpoint.valid, checkpoint.invalid),
+                                 (12, 129, 3, 9))
+                self.assertFalse(checkpoint.complete)
+                results = list(validate_ndjson(
+                    validator, BytesIO(data), error_sink=f,
+                    chunk_size=4, checkpoint=checkpoint))
+                self.assertEqual([x.index for x in results],
+                                 list(range(13, 31)))
+                self.assertTrue(Checkpoint(checkpoint.path).complete)
+                self.assertEqual((checkpoint.valid, checkpoint.invalid),
+                                 (21, 9))
+                f.seek(0)
+                self.assertEqual(len(f.read().splitlines()), 9)
+            finally:
+                os.remove(checkpoint.path)
+
+
+class TestIncrementalValidation(TestBase):
+    def setUp(self):
+        item = {'type': 'dict',
+                'schema': {'id': {'type': 'integer', 'min': 0},
+                           'tags': {'type': 'list', 'maxlength': 2,
+                                    'schema': {'type': 'string',
+                                               'regex': '[a-z]+'}}}}
+        self.schema = {'name': {'type': 'string', 'required': True},
+                       'data': {'type': 'dict',
+                                'schema': {'items': {'type': 'list',
+                                                     'minlength': 1,
+                                                     'schema': item}}},
+                       'rows': {'type': 'list',
+                                'schema': {'type': 'list',
+                                           'schema': {'type': 'number'}}}}
+
+    def test_iter_json_items(self):
+        from ..incremental import iter_json_items
+        items = [{'id': 1, 'tags': ['a', {'b': [None, True]}]}, [], 2.5,
+                 u'\xe9']
+        data = json.dumps(items).encode('utf-8')
+        self.assertEqual(list(iter_json_items(BytesIO(data), 3)), items)
+        self.assertEqual(list(iter_json_items(BytesIO(b' {"a": [1]} '), 2)),
+                         [{'a': [1]}])
+        self.assertEqual(list(iter_json_items(BytesIO(b'[ ]'), 1)), [])
+        self.assertEqual(list(iter_json_items(StringIO(u'[12, 345]'), 2)),
+                         [12, 345])
+        for data in (b'[{"a": 1}, {', b'[1 2]', b'[1] 2', b''):
+            self.assertRaises(DocumentError, list,
+                              iter_json_items(BytesIO(data), 4))
+
+    def test_feed(self):
+        from ..incremental import IncrementalValidator
+        data = json.dumps({'data': {'items': [{'id': 1, 'tags': ['a']},
+                                              {'id': -1,
+                                               'tags': ['A', 'b', 'c']},
+                                              {'id': 'x'}, 5]},
+                           'rows': [[1, 2.5], ['a', 3e2], 4],
+                           'extra': [1, {'a': [True, None]}]}).encode()
+        validator = Validator(self.schema)
+        incremental = IncrementalValidator(validator)
+        for i in range(len(data)):
+            incremental.feed(data[i:i + 1])
+        self.assertFalse(incremental.close())
+        self.assertFalse(validator.validate(json.loads(data.decode()),
+                                            normalize=False))
+        self.assertEqual(
+            sorted((x.document_path, x.schema_path, x.code)
+                   for x in incremental.validator._errors),
+            sorted((x.document_path, x.schema_path, x.code)
+                   for x in validator._errors))
+
+    def test_events(self):
+        from ..incremental import IncrementalValidator
+        incremental = IncrementalValidator(Validator(self.schema))
+        incremental.start_map()
+        incremental.map_key('name')
+        incremental.value('many rows')
+        incremental.map_key('rows')
+        incremental.start_array()
+        for i in range(1000):
+            incremental.start_array()
+            incremental.value(i if i % 400 else str(i))
+            incremental.end_array()
+        incremental.end_array()
+        incremental.end_map()
+        self.assertEqual(len(incremental.document['rows']), 1000)
+        self.assertRaises(IndexError, lambda: incremental.document['rows'][0])
+        self.assertFalse(incremental.close())
+        self.assertEqual([x.document_path for x in
+                          incremental.validator._errors[0].child_errors],
+                         [('rows', 0), ('rows', 400), ('rows', 800)])
+        self.assertEqual(incremental.validator._errors[0].child_errors[1]
+                         .child_errors[0].schema_path,
+                         ('rows', 'schema', 'schema', 'type'))
+
+    def test_invalid_json(self):
+        from ..incremental import IncrementalValidator
+        for data in (b'{"name": 1,,}', b'{"name": [1, 2}', b'{"name": 01}',
+                     b'{"name": "x"} {}', b'{"name": "x', b'[1, 2]'):
+            incremental = IncrementalValidator(Validator(self.schema))
+            self.assertRaises(DocumentError, lambda: (incremental.feed(data),
+                                                      incremental.close()))
+
+
+class TestTabular(TestBase):
+    def setUp(self):
+        self.schema = {'id': {'type': 'integer', 'coerce': int, 'min': 1,
+                              'required': True},
+                       'price': {'type': 'float', 'coerce': float},
+                       'name': {'type': 'string', 'empty': False}}
+
+    def test_columns(self):
+        from ..tabular import Columns
+        columns = Columns(Validator(self.schema), ['name', 'id', 'other'])
+        self.assertTrue(columns.coercible)
+        self.assertEqual(columns.coerced, (1,))
+        self.assertDictEqual(dict(columns.coerce(['a', '1', 'b'])),
+                             {'name': 'a', 'id': 1, 'other': 'b'})
+        self.assertIsNone(columns.coerce(['a', 'x', 'b']))
+        row = Columns(Validator(self.schema), [None, 'id', 'name']) \
+            .document((7, 1))
+        self.assertEqual(len(row), 1)
+        self.assertNotIn('name', row)
+        self.assertDictEqual(row.copy(), {'id': 1})
+        self.assertEqual(repr(row), "Row({'id': 1})")
+        # rows are validated as they are
+        v = Validator(self.schema)
+        self.assertTrue(v.validate(row, normalize=False))
+        self.assertIs(v.document, row)
+        self.assertTrue(v.validate(row))
+        self.assertDictEqual(v.document, {'id': 1})
+        self.schema['name']['rename'] = 'title'
+        self.assertFalse(Columns(Validator(self.schema), ['name']).coercible)
+
+    def test_validate_csv(self):
+        from ..tabular import validate_csv
+        data = 'id;price;name\n1;2.5;a\n\nx;1;b\n0;3;\n4;5;c;d\n5;6\n'
+        stream = BytesIO(data) if sys.version_info[0] == 2 \
+            else StringIO(data)
+        results = list(validate_csv(Validator(self.schema), stream,
+                                    chunk_size=2, delimiter=';'))
+        self.assertEqual([(x.index, x.valid) for x in results],
+                         [(2, True), (4, False), (5, False), (6, False),
+                          (7, True)])
+        self.assertDictEqual(dict(results[0].document),
+                             {'id': 1, 'price': 2.5, 'name': 'a'})
+        self.assertEqual(sorted(results[1].errors), ['id'])
+        self.assertEqual(len(results[1].errors['id']), 2)
+        self.assertEqual(sorted(results[2].errors), ['id', 'name'])
+        self.assertIsNone(results[3].document)
+        self.assertDictEqual(dict(results[4].document),
+                             {'id': 5, 'price': 6.0})
+
+    def test_validate_query(self):
+        import sqlite3
+        from ..tabular import validate_query
+        connection = sqlite3.connect(':memory:')
+        connection.execute('CREATE TABLE staging (id, price, name)')
+        connection.executemany('INSERT INTO staging VALUES (?, ?, ?)',
+                               [(i, i * 1.5, 'x' if i % 3 else '')
+                                for i in range(10)])
+        results = list(validate_query(
+            Validator(self.schema), connection,
+            'SELECT rowid, * FROM staging WHERE id > ?', (0,), batch_size=4,
+            id_column='rowid', errors_table='errors'))
+        self.assertEqual([x.index for x in results], list(range(2, 11)))
+        self.assertEqual([x.index for x in results if not x.valid],
+                         [4, 7, 10])
+        self.assertEqual(results[0].document,
+                         {'id': 1, 'price': 1.5, 'name': 'x'})
+        self.assertEqual(
+            connection.execute('SELECT row_id, errors FROM errors').fetchall(),
+            [(i, '{"name": "empty values not allowed"}') for i in (4, 7, 10)])
+
+
+class TestPipeline(TestBase):
+    def test_run(self):
+        from ..pipeline import Pipeline
+        validator = Validator({'id': {'type': 'integer', 'coerce': int,
+                                      'min': 0}})
+        lines = ['{"id": "%d"}' % (i if i % 7 else -i) for i in range(50)]
+        lines[10] = '{oops'
+        pipeline = Pipeline(validator, parsers=2, validators=2,
+                            serializers=1, chunk_size=3, queue_size=2)
+        results = list(pipeline.run(lines))
+        self.assertEqual([x.index for x in results], list(range(50)))
+        self.assertEqual([x.index for x in results if not x.valid],
+                         [7, 10, 14, 21, 28, 35, 42, 49])
+        self.assertEqual(results[1].document, '{"id": 1}\n')
+        self.assertTrue(results[10].errors.startswith('invalid input'))
+        self.assertDictEqual(results[7].errors,
+                             {'id': 'min value is 0'})
+        statistics = pipeline.statistics
+        self.assertEqual(statistics['parse']['workers'], 2)
+        for stage in ('parse', 'validate', 'serialize', 'total'):
+            self.assertEqual(statistics[stage]['documents'], 50)
+
+    def test_documents(self):
+        from ..pipeline import Pipeline
+        pipeline = Pipeline(Validator({'id': {'coerce': int}}), parse=None,
+                            serialize=None, method='normalized')
+        results = list(pipeline.run([{'id': '1'}, {'id': '2'}]))
+        self.assertEqual([x.document for x in results],
+                         [{'id': 1}, {'id': 2}])
+        self.assertNotIn('serialize', pipeline.statistics)
+
+
+class TestRouter(TestBase):
+    def test_route(self):
+        from ..routing import Router
+        router = Router('kind', {'a': {'kind': {}, 'x': {'type': 'integer'}},
+                                 'b': {'kind': {}, 'y': {'required': True}}})
+        self.assertTrue(router.validate({'kind': 'a', 'x': 1}))
+        self.assertFalse(router.validate({'kind': 'a', 'x': 'one'}))
+        self.assertEqual(router.errors, {'x': 'must be of integer type'})
+        self.assertFalse(router.validate({'kind': 'b'}))
+        self.assertTrue(router.validate({'kind': 'b'}, update=True))
+        self.assertFalse(router.validate({'kind': 'c'}))
+        self.assertEqual(router.errors, {'kind': 'unallowed value c'})
+        self.assertFalse(router.validate({}, update=True))
+        self.assertEqual(router.errors, {'kind': 'required field'})
+        self.assertRaises(DocumentError, router.validate, 'a')
+
+        router = Router('kind', {'a': Validator({'kind': {}})},
+                        default={'kind': {'nullable': True,
+                                          'type': 'integer'}})
+        self.assertTrue(router.validate({'kind': None}))
+        self.assertFalse(router.validate({'kind': 'c'}))
+
+    def test_pipeline(self):
+        from ..pipeline import Pipeline
+        from ..routing import Router
+        router = Router('kind', {'a': {'kind': {}, 'x': {'coerce': int}}})
+        pipeline = Pipeline(router, parse=None, serialize=None, validators=2,
+                            chunk_size=2)
+        results = list(pipeline.run([{'kind': 'a', 'x': '1'}, {'kind': 'b'},
+                                     {'kind': 'a', 'x': '3'}]))
+        self.assertEqual([x.valid for x in results], [True, False, True])
+        self.assertEqual(results[2].document, {'kind': 'a', 'x': 3})
+
+
+class TestCommandLine(TestBase):
+    def setUp(self):
+        from tempfile import mkdtemp
+        self.directory = mkdtemp()
+        self.schema = self.path('schema.json')
+        with open(self.schema, 'w') as f:
+            json.dump({'id': {'type': 'integer', 'coerce': 'int', 'min': 0,
+                              'required': True},
+                       'name': {'type': 'string', 'maxlength': 3}}, f)
+
+    def tearDown(self):
+        from shutil import rmtree
+        rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_main(self):
+        import gzip
+        from ..cli import main
+        with gzip.open(self.path('a.ndjson.gz'), 'wb') as f:
+            f.write(b'{"id": 1}\n\n{"id": -1}\n{oops\n{"id": 2}\n')
+        with open(self.path('b.csv'), 'w') as f:
+            f.write('id,name\n3,abc\n4,abcd\n')
+        stderr, sys.stderr = sys.stderr, \
+            BytesIO() if sys.version_info[0] == 2 else StringIO()
+        try:
+            status = main([self.schema, self.path('a.ndjson.gz'),
+                           self.path('b.csv'), '--valid', self.path('valid'),
+                           '--rejected', self.path('rejected'), '--errors',
+                           self.path('errors'), '--stats'])
+            report = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(status, 1)
+        with open(self.path('valid')) as f:
+            self.assertEqual([json.loads(x) for x in f],
+                             [{'id': 1}, {'id': 2}, {'id': 3, 'name': 'abc'}])
+        with open(self.path('rejected')) as f:
+            self.assertEqual(f.read().splitlines()[:2],
+                             ['{"id": -1}', '{oops'])
+        with open(self.path('errors')) as f:
+            errors = [json.loads(x) for x in f]
+        self.assertEqual([(os.path.basename(x['file']), x['index'])
+                          for x in errors],
+                         [('a.ndjson.gz', 3), ('a.ndjson.gz', 4),
+                          ('b.csv', 3)])
+        self.assertDictEqual(errors[0]['errors'], {'id': 'min value is 0'})
+        self.assertIn('valid: 3, invalid: 3', report)
+        self.assertIn('0x42 MIN_VALUE: 1', report)
+        self.assertIn('invalid input: 1', report)
+
+    def test_jobs(self):
+        from ..cli import main
+        with open(self.path('a.json'), 'w') as f:
+            json.dump([{'id': i} for i in range(-5, 45)], f)
+        status = main([self.schema, self.path('a.json'), '--jobs', '2',
+                       '--chunk-size', '7', '--errors', self.path('errors')])
+        self.assertEqual(status, 1)
+        with open(self.path('errors')) as f:
+            self.assertEqual([json.loads(x)['index'] for x in f],
+                             list(range(5)))
+
+
+@unittest.skipIf(not hasattr(socket, 'AF_UNIX'), 'requires Unix sockets')
+class TestDaemon(TestBase):
+    def setUp(self):
+        from tempfile import mkdtemp
+        from ..daemon import ValidationDaemon
+        self.directory = mkdtemp()
+        self.path = os.path.join(self.directory, 'cerberus.sock')
+        self.daemon = ValidationDaemon(
+            self.path, {'ids': {'id': {'type': 'integer', 'min': 0}}},
+            workers=1, chunk_size=3)
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        from shutil import rmtree
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.close()
+        rmtree(self.directory)
+
+    def test_validate(self):
+        from ..daemon import ValidationClient
+        with ValidationClient(self.path, timeout=10) as client:
+            results = client.validate('ids', [{'id': i}
+                                              for i in range(-2, 8)])
+            self.assertEqual([x.index for x in results if not x.valid],
+                             [0, 1])
+            self.assertDictEqual(results[0].errors,
+                                 {'id': 'min value is 0'})
+            self.assertDictEqual(results[2].document, {'id': 0})
+            results = client.validate('ids', ['oops'])
+            self.assertFalse(results[0].valid)
+
+    def test_register(self):
+        from ..daemon import ValidationClient
+        with ValidationClient(self.path, timeout=10) as client:
+            self.assertRaises(SchemaError, client.register, 'names',
+                              {'name': {'type': 'nope'}})
+            self.assertRaises(KeyError, client.validate, 'names', [])
+            client.register('names', {'name': {'type': 'string'}},
+                            allow_unknown=True)
+            self.assertEqual(client.schemas(), ['ids', 'names'])
+            results = client.validate('names', [{'name': 1, 'x': 2}])
+            self.assertDictEqual(results[0].errors,
+                                 {'name': 'must be of string type'})
+
+
+@unittest.skipIf(sys.version_info < (3, 2), 'requires concurrent.futures')
+class TestBatchExecutor(TestBase):
+    def test_results(self):
+        from ..batch import BatchExecutor
+        schema = {'id': {'type': 'integer', 'min': 0}}
+        documents = [{'id': i if i % 7 else -i} for i in range(1, 301)]
+        with BatchExecutor(Validator(schema), max_workers=1, sample_size=20,
+                           reevaluate_every=100) as executor:
+            results = list(executor.validate(documents))
+            self.assertEqual([x.index for x in results], list(range(300)))
+            self.assertEqual([x.index for x in results if not x.valid],
+                             [i for i in range(300) if not (i + 1) % 7])
+            self.assertEqual([x['index'] for x in executor.evaluations],
+                             [0, 100, 200])
+            self.assertEqual(executor.report['strategy'], 'serial')
+            self.assertGreater(executor.report['chunk_size'], 0)
+
+    def test_parallel_strategy(self):
+        from ..batch import BatchExecutor
+        schema = {'id': {'validator': sleeping_validator}}
+        documents = [{'id': i} for i in range(-5, 75)]
+        with BatchExecutor(Validator(schema), max_workers=4, sample_size=16,
+                           reevaluate_every=None) as executor:
+            results = list(executor.validate(documents))
+            self.assertIn(executor.report['strategy'], ('thread', 'process'))
+            self.assertGreater(executor.report['thread_speedup'], 2)
+        self.assertEqual([x.index for x in results], list(range(80)))
+        self.assertEqual([x.index for x in results if not x.valid],
+                         list(range(5)))
+        self.assertDictEqual(results[0].errors, {'id': 'negative'})
+
+    def test_sample_validated_once(self):
+        from ..batch import BatchExecutor
+        del validated_values[:]
+        schema = {'id': {'validator': recording_validator}}
+        documents = [{'id': i} for i in range(16)]
+        with BatchExecutor(Validator(schema), max_workers=4, sample_size=16,
+                           reevaluate_every=None) as executor:
+            results = list(executor.validate(documents))
+            self.assertGreater(executor.report['thread_speedup'], 0)
+        self.assertEqual([x.index for x in results], list(range(16)))
+        self.assertEqual(sorted(validated_values), list(range(16)))
+
+    def test_unpicklable_validator(self):
+        from ..batch import BatchExecutor
+        schema = {'id': {'coerce': lambda x: int(x), 'type': 'integer'}}
+        documents = [{'id': str(i)} for i in range(40)]
+        with BatchExecutor(Validator(schema), max_workers=2, sample_size=8,
+                           reevaluate_every=16) as executor:
+            results = list(executor.validate(documents))
+            self.assertIsNone(executor.report['transfer_cost'])
+            self.assertNotIn('process',
+                             [x['strategy'] for x in executor.evaluations])
+        self.assertEqual([x.document['id'] for x in results], list(range(40)))
+
 
 class TestDockerCompose(TestBase):
     """ Tests for https://github.com/docker/compose """
@@ -1768,3 +2738,276 @@ class TestDockerCompose(TestBase):
 
         document = {'extra_hosts': "somehost::alias:127.0.0.1"}
         self.assertFail(document, schema)
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'requires Python 3.5 or later')
+class TestAsyncio(TestBase):
+    def run_coroutine(self, coroutine):
+        import asyncio
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def collect_async(self, iterable):
+        import asyncio
+        loop = asyncio.new_event_loop()
+        iterator = iterable.__aiter__()
+        result = []
+        try:
+            while True:
+                try:
+                    result.append(
+                        loop.run_until_complete(iterator.__anext__()))
+                except StopAsyncIteration:  # noqa
+                    return result
+        finally:
+            loop.close()
+
+    def test_coroutine_validator(self):
+        from types import coroutine
+
+        @coroutine
+        def known_sku(field, value, error):
+            yield
+            if value not in ('a-1', 'b-2'):
+                error(field, 'unknown sku')
+
+        schema = {'items': {'type': 'list',
+                            'schema': {'type': 'dict',
+                                       'schema': {'sku': {'validator':
+                                                          known_sku}}}}}
+        v = Validator(schema)
+        document = {'items': [{'sku': 'a-1'}, {'sku': 'x-0'}]}
+        self.assertFalse(self.run_coroutine(v.validate_async(document)))
+        self.assertDictEqual(v.errors,
+                             {'items': {1: {'sku': 'unknown sku'}}})
+        self.assertTrue(self.run_coroutine(
+            v.validate_async({'items': [{'sku': 'b-2'}]})))
+
+    def test_awaitables_called_once(self):
+        import asyncio
+        from types import coroutine
+        calls = []
+
+        def parse(value):
+            calls.append(('parse', value))
+            return asyncio.ensure_future(
+                asyncio.sleep(0, result={'id': value}))
+
+        def to_int(value):
+            calls.append(('to_int', value))
+            return asyncio.ensure_future(asyncio.sleep(0, result=int(value)))
+
+        def positive(field, value, error):
+            calls.append(('positive', value))
+
+            @coroutine
+            def check():
+                yield
+                if value <= 0:
+                    error(field, 'not positive')
+            return asyncio.ensure_future(check())
+
+        schema = {'ref': {'coerce': parse, 'type': 'dict',
+                          'schema': {'id': {'coerce': to_int,
+                                            'validator': positive}}},
+                  'count': {'coerce': to_int, 'validator': positive}}
+        v = Validator(schema)
+        self.assertFalse(self.run_coroutine(
+            v.validate_async({'ref': '-3', 'count': '2'})))
+        self.assertDictEqual(v.errors, {'ref': {'id': 'not positive'}})
+        self.assertEqual(sorted(calls, key=repr),
+                         sorted([('parse', '-3'), ('to_int', '-3'),
+                                 ('to_int', '2'), ('positive', -3),
+                                 ('positive', 2)], key=repr))
+
+    def test_coroutine_coercer(self):
+        import asyncio
+        from types import coroutine
+
+        def lookup(value):
+            return asyncio.sleep(0, result={'one': 1, 'two': 2}.get(value))
+
+        @coroutine
+        def failing(value):
+            yield
+            raise ValueError
+
+        schema = {'amount': {'coerce': lookup, 'type': 'integer'},
+                  'amounts': {'type': 'list',
+                              'schema': {'coerce': lookup,
+                                         'type': 'integer'}},
+                  'other': {'coerce': failing}}
+        v = Validator(schema)
+        document = {'amount': 'one', 'amounts': ['two', 'one']}
+        self.assertDictEqual(
+            self.run_coroutine(v.normalized_async(document)),
+            {'amount': 1, 'amounts': [2, 1]})
+        self.assertFalse(self.run_coroutine(
+            v.validate_async({'amount': 'three'})))
+        self.assertError('amount', ('amount', 'nullable'),
+                         errors.NOT_NULLABLE, False, v_errors=v._errors)
+        self.assertFalse(self.run_coroutine(
+            v.validate_async({'other': 0})))
+        self.assertError('other', ('other', 'coerce'),
+                         errors.COERCION_FAILED, failing, v_errors=v._errors)
+
+    def test_nested_coroutine_coercers(self):
+        import asyncio
+
+        def as_mapping(value):
+            return asyncio.sleep(
+                0, result=dict(x.split('=') for x in value.split(',')))
+
+        def as_integer(value):
+            return asyncio.sleep(0, result=int(value))
+
+        schema = {'options': {'coerce': as_mapping, 'type': 'dict',
+                              'valueschema': {'coerce': as_integer,
+                                              'type': 'integer'}}}
+        v = Validator(schema)
+        self.assertDictEqual(
+            self.run_coroutine(v.normalized_async({'options': 'a=1,b=2'})),
+            {'options': {'a': 1, 'b': 2}})
+
+    def test_max_concurrency(self):
+        from types import coroutine
+        state = {'running': 0, 'peak': 0}
+
+        @coroutine
+        def check(field, value, error):
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+            for _ in range(3):
+                yield
+            state['running'] -= 1
+
+        schema = {'values': {'type': 'list', 'schema': {'validator': check}}}
+        v = Validator(schema)
+        self.assertTrue(self.run_coroutine(
+            v.validate_async({'values': list(range(10))},
+                             max_concurrency=3)))
+        self.assertEqual(state['peak'], 3)
+
+    def test_synchronous_constraints(self):
+        v = Validator(self.schema)
+        document = {'an_integer': 101, 'a_list_of_integers': [1, 'a'],
+                    'a_string': 'x'}
+        self.assertFalse(self.run_coroutine(v.validate_async(document)))
+        async_errors = v._errors
+        self.assertFalse(v.validate(document))
+        self.assertEqual(async_errors, v._errors)
+        self.assertDictEqual(v.errors, self.validator.error_handler(
+            async_errors))
+        self.assertIs(type(v), Validator)
+
+    def test_child_validators_reused(self):
+        from types import coroutine
+
+        class CountingValidator(Validator):
+            instances = 0
+
+            def __init__(self, *args, **kwargs):
+                CountingValidator.instances += 1
+                super(CountingValidator, self).__init__(*args, **kwargs)
+
+        @coroutine
+        def positive(field, value, error):
+            yield
+            if not isinstance(value, int) or value < 0:
+                error(field, 'negative')
+
+        v = CountingValidator({'f': {'anyof': [{'validator': positive},
+                                               {'type': 'string'}]}})
+        self.assertTrue(self.run_coroutine(v.validate_async({'f': 1})))
+        instances = CountingValidator.instances
+        self.assertFalse(self.run_coroutine(v.validate_async({'f': -1})))
+        self.assertTrue(self.run_coroutine(v.validate_async({'f': 'x'})))
+        self.assertEqual(CountingValidator.instances, instances + 1)
+        self.assertFalse(self.run_coroutine(v.validate_async({'f': -2})))
+        self.assertEqual(CountingValidator.instances, instances + 1)
+        self.assertIs(type(v), CountingValidator)
+
+    def test_cooperative_validation(self):
+        import asyncio
+        from types import coroutine
+        schema = {'items': {'type': 'list',
+                            'schema': {'type': 'dict',
+                                       'schema': {'id': {'type': 'integer',
+                                                         'max': 400}}}},
+                  'name': {'type': 'string'}}
+        document = {'items': [{'id': i} for i in range(500)], 'name': 0}
+        v = Validator(schema)
+        self.assertFalse(v.validate(document))
+
+        @coroutine
+        def ticker(state):
+            while not state['done']:
+                state['ticks'] += 1
+                yield
+
+        for kwargs in ({'yield_every': 50}, {'yield_interval': 0}):
+            state = {'ticks': 0, 'done': False}
+            w = Validator(schema)
+            loop = asyncio.new_event_loop()
+            try:
+                task = loop.create_task(ticker(state))
+                result = loop.run_until_complete(
+                    w.validate_async(document, **kwargs))
+                state['done'] = True
+                loop.run_until_complete(task)
+            finally:
+                loop.close()
+            self.assertFalse(result)
+            self.assertGreater(state['ticks'], 5)
+            self.assertEqual(w._errors, v._errors)
+            self.assertDictEqual(w.errors, v.errors)
+
+    def test_validate_batch_async(self):
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        schema = {'id': {'type': 'integer', 'required': True},
+                  'name': {'type': 'string', 'coerce': str}}
+        documents = [{'id': i, 'name': i} for i in range(25)]
+        documents[7] = {'name': 'no id'}
+        documents[11] = 'not a document'
+        v = Validator(schema)
+
+        class AsyncDocuments(object):
+            def __init__(self):
+                self.documents = iter(documents)
+
+            def __aiter__(self):
+                return self
+
+            def __anext__(self):
+                for document in self.documents:
+                    return asyncio.sleep(0, result=document)
+                raise StopAsyncIteration
+
+        for executor, source in ((ThreadPoolExecutor(2), documents),
+                                 (ProcessPoolExecutor(2), AsyncDocuments())):
+            with executor:
+                results = self.collect_async(v.validate_batch_async(
+                    source, executor=executor, max_in_flight=2,
+                    chunk_size=4))
+            self.assertEqual([x.index for x in results], list(range(25)))
+            self.assertEqual([x.index for x in results if not x.valid],
+                             [7, 11])
+            self.assertDictEqual(results[7].errors, {'id': 'required field'})
+            self.assertIsNone(results[11].document)
+            self.assertEqual(results[3].document, {'id': 3, 'name': '3'})
+
+    def test_validate_batch_async_unpicklable(self):
+        from concurrent.futures import ThreadPoolExecutor
+        v = Validator({'id': {'coerce': lambda x: int(x)}})
+        documents = [{'id': str(i)} for i in range(10)]
+        for executor in (None, ThreadPoolExecutor(2)):
+            results = self.collect_async(v.validate_batch_async(
+                documents, executor=executor, chunk_size=3))
+            self.assertEqual([x.document['id'] for x in results],
+                             list(range(10)))
+            if executor is not None:
+                executor.shutdown()
@@ -1,10 +1,16 @@
+from collections import deque
+from itertools import count
 import logging
+import re
+import threading
 
 from .platform import _int_types, _str_type
 
 log = logging.getLogger('cerberus')
 depr_warnings_printed = {}
 
+PATTERN_CACHE_SIZE = 4096
+
 
 def compare_paths_lt(x, y):
     for i in range(min(len(x), len(y))):
@@ -33,3 +39,58 @@ def warn_deprecated(artifact, message):
     if not depr_warnings_printed.get(artifact):
         log.warn(message)
         depr_warnings_printed[artifact] = True
+
+
+class PatternCache(object):
+    """ A bounded, thread-safe cache of compiled regular expressions that
+    match a string completely. When it's full, the least recently used
+    pattern is evicted. """
+
+    # leading global flags must stay at the start of the expression
+    flags = re.compile(r'\(\?[aiLmsux]+\)')
+
+    def __init__(self, maxsize=PATTERN_CACHE_SIZE):
+        self.maxsize = maxsize
+        # the compiled patterns with the tick of their latest use
+        self.patterns = dict()
+        # the uses in order, those that were superseded by a later one of the
+        # same pattern are skipped on eviction
+        self.uses = deque()
+        self.ticks = count()
+        self.lock = threading.Lock()
+
+    def __call__(self, pattern):
+        with self.lock:
+            entry = self.patterns.get(pattern)
+            if entry is not None:
+                self.__use(pattern, entry[1])
+                return entry[1]
+        compiled = self.compile(pattern)
+        with self.lock:
+            if pattern not in self.patterns:
+                while len(self.patterns) >= self.maxsize:
+                    tick, evicted = self.uses.popleft()
+                    if self.patterns.get(evicted, (None,))[0] == tick:
+                        del self.patterns[evicted]
+                self.__use(pattern, compiled)
+        return compiled
+
+    def __use(self, pattern, compiled):
+        tick = next(self.ticks)
+        self.patterns[pattern] = (tick, compiled)
+        self.uses.append((tick, pattern))
+        if len(self.uses) > 2 * self.maxsize:
+            self.uses = deque(sorted((x[0], p)
+                                     for p, x in self.patterns.items()))
+
+    def compile(self, pattern):
+        """ Compiles a pattern with full-match semantics. """
+        flags = self.flags.match(pattern)
+        prefix = flags.group() if flags else ''
+        # a newline ends a trailing comment of a verbose pattern
+        end = '\n' if re.compile(pattern).flags & re.VERBOSE else ''
+        return re.compile(r'{0}(?:{1}{2})\Z'.format(
+            prefix, pattern[len(prefix):], end))
+
+
+compile_pattern = PatternCache()
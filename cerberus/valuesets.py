@@ -0,0 +1,164 @@
+"""
+    Containers for the constraints of the ``allowed``-rule that test the
+    membership of a value without scanning all allowed values.
+
+    The lists of ``allowed``-constraints are indexed with
+    :class:`AllowedValues` that are kept with a prepared schema, the lists
+    themselves are left untouched. Large enumerations can
+    be kept in a sorted file that is memory-mapped by a :class:`FileValueSet`,
+    so that processes share the pages of one file instead of each holding a
+    copy of the values.
+"""
+
+import io
+import mmap
+import os
+import threading
+
+from .platform import _str_type
+
+
+class AllowedValues(list):
+    """ A list of allowed values with a hash index. It compares equal to a
+    list with the same values, so it's transparent to the errors. Values
+    that can't be hashed are compared one by one. """
+
+    def __init__(self, values=()):
+        list.__init__(self, values)
+        self._index()
+
+    def __contains__(self, value):
+        try:
+            if value in self.hashable:
+                return True
+        except TypeError:
+            return list.__contains__(self, value)
+        return bool(self.unhashable) and value in self.unhashable
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+    def _index(self):
+        hashable, unhashable = set(), []
+        for value in self:
+            try:
+                hashable.add(value)
+            except TypeError:
+                unhashable.append(value)
+        self.hashable = frozenset(hashable)
+        self.unhashable = unhashable
+
+
+def _reindexing(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args):
+        result = method(self, *args)
+        self._index()
+        return result
+    wrapper.__name__ = name
+    return wrapper
+
+
+# the index follows changes of the list
+for _name in ('__delitem__', '__delslice__', '__iadd__', '__imul__',
+              '__setitem__', '__setslice__', 'append', 'clear', 'extend',
+              'insert', 'pop', 'remove'):
+    if hasattr(list, _name):
+        setattr(AllowedValues, _name, _reindexing(_name))
+del _name
+
+
+class FileValueSet(object):
+    """ A set of strings in a file with one value per line that is sorted by
+    the values' encoded bytes, as :meth:`write` creates it. The file is
+    memory-mapped with the first membership test and searched by bisection,
+    hence only the touched pages are read and they are shared with other
+    processes that map the same file. Pickled instances only carry the path
+    and map the file again when they're used.
+
+    :param path: The path of the file.
+    :param encoding: The encoding of the values in the file.
+
+    .. versionadded:: 0.10
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self._data = None
+        self._size = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, value):
+        if not isinstance(value, _str_type):
+            return False
+        if not isinstance(value, bytes):
+            value = value.encode(self.encoding)
+        if b'\n' in value:
+            return False
+
+        data, low, high = self._map(), 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            start = data.rfind(b'\n', 0, middle) + 1
+            end = data.find(b'\n', start)
+            if end < 0:
+                end = self._size
+            line = data[start:end]
+            if line < value:
+                low = end + 1
+            elif line > value:
+                high = start
+            else:
+                return True
+        return False
+
+    def __iter__(self):
+        with io.open(self.path, 'rb') as f:
+            for line in f:
+                yield line.rstrip(b'\n').decode(self.encoding)
+
+    def __reduce__(self):
+        return type(self), (self.path, self.encoding)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.path)
+
+    def _map(self):
+        if self._size is None:
+            with self._lock:
+                if self._size is None:
+                    with io.open(self.path, 'rb') as f:
+                        size = os.fstat(f.fileno()).st_size
+                        if size:
+                            self._data = mmap.mmap(f.fileno(), 0,
+                                                   access=mmap.ACCESS_READ)
+                        else:
+                            self._data = b''
+                    self._size = size
+        return self._data
+
+    def close(self):
+        """ Unmaps the file. It's mapped again when it's used. """
+        with self._lock:
+            if self._size:
+                self._data.close()
+            self._data, self._size = None, None
+
+    @classmethod
+    def write(cls, path, values, encoding='utf-8'):
+        """ Writes values to a file in the expected order and returns a
+        :class:`FileValueSet` of it. The values mustn't contain line breaks.
+        """
+        lines = set()
+        for value in values:
+            if not isinstance(value, bytes):
+                value = value.encode(encoding)
+            if b'\n' in value:
+                raise ValueError('A value contains a line break: {0!r}'
+                                 .format(value))
+            lines.add(value)
+        with io.open(path, 'wb') as f:
+            f.write(b'\n'.join(sorted(lines)))
+        return cls(path, encoding)